@@ -1,29 +1,79 @@
 import { NextResponse } from 'next/server';
-import { generateBlogPost, generateHeroImage } from '../../../lib/geminiGenerator';
-import { createStoryblokBlogPost, publishStoryblokBlogPost, uploadImageToStoryblok, getStoryblokBlogPosts, deleteStoryblokBlogPost } from '../../../lib/storyblok';
+import { generateBlogPost, streamBlogPost, generateHeroImage, editContent, briefImagePrompt } from '../../../lib/geminiGenerator';
+import { createStoryblokBlogPost, updateStoryblokBlogPost, upsertStoryblokBlogPost, publishStoryblokBlogPost, uploadGeneratedAsset, getStoryblokBlogPosts, deleteStoryblokBlogPost } from '../../../lib/storyblok';
 import { v4 as uuidv4 } from 'uuid';
 import path from 'path';
-import { validateBlogInput, validateImagePrompt, validateStoryId } from '../../../lib/validation';
+import { validateBlogInput, validateImagePrompt, validateStoryId, validatePriority, validateEditRequest } from '../../../lib/validation';
 import { logger, getUserFriendlyError } from '../../../lib/logger';
+import { getWorkerPoolStats } from '../../../lib/pythonWorkerPool';
+import { getGenerationCache, shouldBypassCache } from '../../../lib/generationCache';
+import { getJobEvents } from '../../../lib/jobEvents';
+import { getJobStore, JOB_STATUSES, IN_FLIGHT_STATUSES } from '../../../lib/jobStore';
+import { getScheduler, QueueFullError } from '../../../lib/scheduler';
+import { runPipeline } from '../../../lib/pipeline';
+import { getStoryblokClient } from '../../../lib/storyblokClient';
+import { getStoryMirror } from '../../../lib/storyMirror';
+import { readBatchRequest, briefKey, BatchInputError } from '../../../lib/batchInput';
+import { getAssetStore } from '../../../lib/assetStore';
+import { getPublishIndex } from '../../../lib/publishIndex';
+import { getMetrics, runWithTrace, newTraceId, currentTrace } from '../../../lib/metrics';
+import { getEditEngine, EditCancelledError } from '../../../lib/editEngine';
+import { Deadline, runWithDeadline, currentDeadline, CancelledError, DeadlineExceededError } from '../../../lib/deadline';
 
-// In-memory storage for job status (in production, use Redis or database)
-const jobStore = new Map();
+// Job records live in the store selected by JOB_STORE (memory, file or redis);
+// the store expires them after JOB_TTL_MS
+const jobStore = getJobStore();
 
-// Cleanup old jobs (older than 1 hour)
-const JOB_EXPIRY_TIME = 60 * 60 * 1000; // 1 hour in milliseconds
+// Upper bounds for all upstream calls made on behalf of one request or job
+const REQUEST_DEADLINE_MS = parseInt(process.env.REQUEST_DEADLINE_MS || '120000', 10);
+const JOB_DEADLINE_MS = parseInt(process.env.JOB_DEADLINE_MS || '600000', 10);
 
-function cleanupOldJobs() {
-  const now = Date.now();
-  for (const [jobId, job] of jobStore.entries()) {
-    const jobTime = new Date(job.startTime).getTime();
-    if (now - jobTime > JOB_EXPIRY_TIME) {
-      jobStore.delete(jobId);
-    }
-  }
+// Deadlines of the jobs running in this process, for DELETE /api/job-status/{id}
+const jobDeadlines = new Map();
+
+// Final SSE event type for a job record, or null while it is still running
+function finalEventType(job) {
+  if (job.status === 'completed') return 'complete';
+  if (job.status === 'failed') return 'failed';
+  if (job.status === 'cancelled') return 'cancelled';
+  return null;
 }
 
-// Run cleanup every 10 minutes
-setInterval(cleanupOldJobs, 10 * 60 * 1000);
+// Applies a partial update to a job and pushes it to /api/job-events subscribers.
+// Progress events carry only the changed fields; the final event carries the whole job.
+// With `ifStatus`, nothing is written (null) unless the job's status is one of them.
+async function updateJob(jobId, patch, { ifStatus } = {}) {
+  const job = await jobStore.update(jobId, patch, { ifStatus });
+  if (!job) return null;
+
+  const type = finalEventType(job) || 'progress';
+  getJobEvents().publish(jobId, type, type === 'progress' ? { status: job.status, ...patch } : job);
+  return job;
+}
+
+const JOB_RECOVERY_INTERVAL = parseInt(process.env.JOB_RECOVERY_INTERVAL_MS || '60000', 10);
+
+// Jobs left queued or running by a process that has stopped (a restart, a
+// deploy, a crashed instance) will never finish. Fail them with a final event
+// so job-status and job-events clients stop waiting. Runs at startup and
+// then periodically, to catch instances that stop while this one runs.
+async function failInterruptedJobs() {
+  const ids = await jobStore.listInterrupted();
+  await Promise.all(ids.map(id => updateJob(id, {
+    status: 'failed',
+    step: 'Interrupted',
+    error: 'Interrupted by a server restart before it finished. Please start it again.',
+    failedTime: new Date().toISOString()
+  }, { ifStatus: IN_FLIGHT_STATUSES })));
+  if (ids.length > 0) logger.warn('Failed jobs interrupted by a restart', { jobs: ids.length });
+}
+
+if (!globalThis.__jobRecovery) {
+  const recover = () => failInterruptedJobs().catch(error => logger.error('Interrupted job recovery failed', error));
+  recover();
+  globalThis.__jobRecovery = setInterval(recover, JOB_RECOVERY_INTERVAL);
+  globalThis.__jobRecovery.unref?.();
+}
 
 // Helper function to extract path segments
 function getPathSegments(request) {
@@ -32,18 +82,58 @@ function getPathSegments(request) {
   return pathSegments;
 }
 
-export async function GET(request) {
+// Endpoint label values for request metrics; anything else is counted as "other"
+const METRIC_ENDPOINTS = new Set([
+  'health', 'metrics', 'blog-posts', 'job-status', 'job-events', 'test', 'generate-blog', 'generate-image',
+  'publish-to-storyblok', 'generate-complete', 'generate-batch', 'publish', 'ai-edit'
+]);
+
+const httpSeconds = getMetrics().histogram(
+  'blogstudio_http_request_duration_seconds',
+  'API handler time until the response starts (streams are not waited for)',
+  ['method', 'endpoint', 'status']
+);
+
+// Runs a handler as its own trace (X-Request-Id, or a new ID) and records its latency
+function traced(method, handler) {
+  return async request => {
+    const traceId = request.headers.get('x-request-id') || newTraceId();
+    const endpoint = getPathSegments(request)[0];
+    const stopTimer = httpSeconds.startTimer({ method, endpoint: METRIC_ENDPOINTS.has(endpoint) ? endpoint : 'other' });
+    const response = await runWithTrace(traceId, () => handler(request));
+    stopTimer({ status: response.status });
+    response.headers.set('X-Request-Id', traceId);
+    return response;
+  };
+}
+
+export const GET = traced('GET', handleGet);
+export const POST = traced('POST', handlePost);
+export const DELETE = traced('DELETE', handleDelete);
+
+async function handleGet(request) {
   try {
     const pathSegments = getPathSegments(request);
     const endpoint = pathSegments[0];
 
     switch (endpoint) {
       case 'health':
-        return NextResponse.json({ status: 'ok', timestamp: new Date().toISOString() });
+        return NextResponse.json({
+          status: 'ok',
+          timestamp: new Date().toISOString(),
+          workers: getWorkerPoolStats(),
+          cache: getGenerationCache().stats(),
+          scheduler: getScheduler().stats(),
+          storyblok: getStoryblokClient().stats(),
+          storyMirror: getStoryMirror().stats(),
+          publishIndex: getPublishIndex().stats(),
+          assets: getAssetStore().stats(),
+          jobs: await getJobCounts()
+        });
         
       case 'blog-posts':
-        // Get all blog posts from Storyblok
-        const posts = await getStoryblokBlogPosts();
+        // List blog posts from the local Storyblok mirror (filters and pagination via query string)
+        const posts = await getStoryblokBlogPosts(parseBlogPostsQuery(request));
         return NextResponse.json(posts);
         
       case 'job-status':
@@ -51,12 +141,18 @@ export async function GET(request) {
         if (!jobId) {
           return NextResponse.json({ error: 'Job ID is required' }, { status: 400 });
         }
-        const job = jobStore.get(jobId);
+        const job = await jobStore.get(jobId);
         if (!job) {
           return NextResponse.json({ error: 'Job not found' }, { status: 404 });
         }
         return NextResponse.json(job);
         
+      case 'job-events':
+        return await handleJobEvents(request, pathSegments[1]);
+        
+      case 'metrics':
+        return handleMetrics(request);
+        
       case 'test':
         return NextResponse.json({ 
           message: 'AI Blog Studio API is working!',
@@ -85,24 +181,32 @@ export async function GET(request) {
   }
 }
 
-export async function POST(request) {
+async function handlePost(request) {
   try {
     const pathSegments = getPathSegments(request);
     const endpoint = pathSegments[0];
-    const body = await request.json();
+    // Batch uploads may be CSV, JSONL or multipart, so that handler reads the body itself
+    const body = endpoint === 'generate-batch' ? null : await request.json();
+    const cacheOptions = { bypassCache: shouldBypassCache(request) };
 
     switch (endpoint) {
       case 'generate-blog':
-        return await handleGenerateBlog(body);
+        if (pathSegments[1] === 'stream') {
+          return await handleGenerateBlogStream(body, cacheOptions, request);
+        }
+        return await withRequestDeadline(request, () => handleGenerateBlog(body, cacheOptions));
         
       case 'generate-image': 
-        return await handleGenerateImage(body);
+        return await withRequestDeadline(request, () => handleGenerateImage(body, cacheOptions));
         
       case 'publish-to-storyblok':
-        return await handlePublishToStoryblok(body);
+        return await withRequestDeadline(request, () => handlePublishToStoryblok(body));
         
       case 'generate-complete':
-        return await handleGenerateCompleteAsync(body);
+        return await handleGenerateCompleteAsync(body, cacheOptions);
+        
+      case 'generate-batch':
+        return await handleGenerateBatch(request, cacheOptions);
         
       case 'publish':
         const storyId = pathSegments[1];
@@ -110,10 +214,14 @@ export async function POST(request) {
         if (!storyValidation.valid) {
           return NextResponse.json({ error: storyValidation.errors[0] }, { status: 400 });
         }
-        return await handlePublishStory(storyValidation.data);
+        return await withRequestDeadline(request, () => handlePublishStory(storyValidation.data));
       
       case 'ai-edit':
-        return await handleAIEdit(body);
+        // Section edits are cancelled by the edit engine itself (see lib/editEngine.js)
+        if (body?.post) {
+          return await handleSectionEdits(body, cacheOptions, request);
+        }
+        return await withRequestDeadline(request, () => handleAIEdit(body, cacheOptions));
         
       default:
         return NextResponse.json({ error: 'Endpoint not found' }, { status: 404 });
@@ -127,12 +235,31 @@ export async function POST(request) {
   }
 }
 
-export async function DELETE(request) {
+// Bounds the upstream calls of a request by REQUEST_DEADLINE_MS and cancels
+// them when the client disconnects; answers 504 when the deadline failed it
+async function withRequestDeadline(request, handler) {
+  const deadline = new Deadline(REQUEST_DEADLINE_MS, request.signal);
+  try {
+    const response = await runWithDeadline(deadline, handler);
+    if (response.status >= 500 && deadline.signal.reason instanceof DeadlineExceededError) {
+      return NextResponse.json({ error: 'The request took too long. Please try again.' }, { status: 504 });
+    }
+    return response;
+  } finally {
+    deadline.dispose();
+  }
+}
+
+async function handleDelete(request) {
   try {
     const pathSegments = getPathSegments(request);
     const endpoint = pathSegments[0];
     const storyId = pathSegments[1];
 
+    if (endpoint === 'job-status' && pathSegments[1]) {
+      return await handleCancelJob(pathSegments[1]);
+    }
+
     if (endpoint === 'blog-posts' && storyId) {
       const storyValidation = validateStoryId(storyId);
       if (!storyValidation.valid) {
@@ -153,7 +280,7 @@ export async function DELETE(request) {
 }
 
 // Handler functions
-async function handleGenerateBlog(body) {
+async function handleGenerateBlog(body, cacheOptions) {
   // Validate and sanitize input
   const validation = validateBlogInput(body);
   if (!validation.valid) {
@@ -172,7 +299,7 @@ async function handleGenerateBlog(body) {
       keywords: keywords || [],
       wordCount: wordCount || 800,
       tone: tone || 'professional'
-    });
+    }, cacheOptions);
 
     return NextResponse.json({ 
       success: true, 
@@ -186,7 +313,59 @@ async function handleGenerateBlog(body) {
   }
 }
 
-async function handleGenerateImage(body) {
+async function handleGenerateBlogStream(body, cacheOptions, request) {
+  // Validate and sanitize input
+  const validation = validateBlogInput(body);
+  if (!validation.valid) {
+    return NextResponse.json({ 
+      error: 'Invalid input',
+      details: validation.errors 
+    }, { status: 400 });
+  }
+
+  // Server-Sent Events when the client asks for them, NDJSON otherwise
+  const useSSE = (request.headers.get('accept') || '').includes('text/event-stream');
+  const encoder = new TextEncoder();
+
+  const stream = new ReadableStream({
+    async start(controller) {
+      const send = (event) => {
+        const data = JSON.stringify(event);
+        try {
+          controller.enqueue(encoder.encode(useSSE ? `event: ${event.type}\ndata: ${data}\n\n` : `${data}\n`));
+        } catch (error) {
+          // Client went away; generation still finishes and warms the cache
+        }
+      };
+
+      // Not tied to the client: a disconnected stream still finishes and warms the cache
+      const deadline = new Deadline(REQUEST_DEADLINE_MS);
+      try {
+        const blogContent = await runWithDeadline(deadline, () => streamBlogPost(validation.data, { ...cacheOptions, onEvent: send }));
+        send({ type: 'done', data: blogContent, id: uuidv4() });
+      } catch (error) {
+        send({ type: 'error', error: `Blog generation failed: ${error.message}` });
+      } finally {
+        deadline.dispose();
+        try {
+          controller.close();
+        } catch (error) {
+          // Already closed by the client
+        }
+      }
+    }
+  });
+
+  return new Response(stream, {
+    headers: {
+      'Content-Type': useSSE ? 'text/event-stream' : 'application/x-ndjson',
+      'Cache-Control': 'no-cache, no-transform',
+      'X-Accel-Buffering': 'no'
+    }
+  });
+}
+
+async function handleGenerateImage(body, cacheOptions) {
   // Validate and sanitize input
   const validation = validateImagePrompt(body.prompt, body.title);
   if (!validation.valid) {
@@ -199,12 +378,14 @@ async function handleGenerateImage(body) {
   const { prompt, title } = validation.data;
 
   try {
-    const result = await generateHeroImage(prompt, title);
+    const result = await generateHeroImage(prompt, title, cacheOptions);
     
     if (result.success) {
       return NextResponse.json({ 
         success: true, 
-        imageUrl: result.imageUrl 
+        imageUrl: result.imageUrl,
+        variants: result.variants?.map(({ buffer, ...variant }) => variant),
+        cached: result.cached || false
       });
     } else {
       return NextResponse.json({ 
@@ -219,42 +400,52 @@ async function handleGenerateImage(body) {
 }
 
 async function handlePublishToStoryblok(body) {
-  const { blogData, imageUrl } = body;
+  const { blogData, imageUrl, storyId } = body;
   
   if (!blogData || !blogData.title) {
     return NextResponse.json({ 
       error: 'Blog data with title is required' 
     }, { status: 400 });
   }
+  if (storyId !== undefined && storyId !== null) {
+    const storyValidation = validateStoryId(storyId);
+    if (!storyValidation.valid) {
+      return NextResponse.json({ error: storyValidation.errors[0] }, { status: 400 });
+    }
+  }
 
   try {
     let storyblokImageUrl = '';
     
-    // Upload image to Storyblok if provided
+    // Upload image to Storyblok if provided (skipped when this content was uploaded before)
     if (imageUrl) {
-      const imagePath = path.join('public', imageUrl.replace(/^\//, ''));
-      const filename = `blog-hero-${Date.now()}.png`;
+      const filename = `blog-hero-${path.basename(imageUrl)}`;
       
-      const uploadResult = await uploadImageToStoryblok(imagePath, filename);
+      const uploadResult = await uploadGeneratedAsset(imageUrl, filename);
       if (uploadResult.success) {
         storyblokImageUrl = uploadResult.url;
       }
     }
     
-    // Create the blog post in Storyblok
+    // Create the story, or update the one this post was written to before
     const storyData = {
       ...blogData,
       heroImage: storyblokImageUrl
     };
     
-    const createResult = await createStoryblokBlogPost(storyData);
+    const result = await upsertStoryblokBlogPost(storyData, { storyId });
     
-    if (createResult.success) {
+    if (result.success) {
+      const asset = imageUrl && await getAssetStore().findByUrl(imageUrl);
+      if (asset) await getAssetStore().ref(asset.hash, `story:${result.storyId}`);
       return NextResponse.json({ 
         success: true, 
-        storyId: createResult.storyId,
-        story: createResult.story,
-        message: 'Blog post created in Storyblok successfully'
+        storyId: result.storyId,
+        story: result.story,
+        unchanged: result.unchanged || false,
+        message: result.unchanged
+          ? 'Blog post is already up to date in Storyblok'
+          : 'Blog post saved to Storyblok successfully'
       });
     } else {
       return NextResponse.json({ 
@@ -268,30 +459,49 @@ async function handlePublishToStoryblok(body) {
   }
 }
 
-async function handleGenerateCompleteAsync(body) {
+async function handleGenerateCompleteAsync(body, cacheOptions) {
   // Validate and sanitize input
   const validation = validateBlogInput(body);
-  if (!validation.valid) {
+  const priorityValidation = validatePriority(body.priority);
+  if (!validation.valid || !priorityValidation.valid) {
     return NextResponse.json({ 
       error: 'Invalid input',
-      details: validation.errors 
+      details: [...(validation.errors || []), ...(priorityValidation.errors || [])]
     }, { status: 400 });
   }
+  const priority = priorityValidation.data;
 
   // Create a job ID and return it immediately
   const jobId = uuidv4();
   
   // Initialize job status
-  jobStore.set(jobId, {
+  const job = await jobStore.create({
     id: jobId,
-    status: 'started',
+    status: 'queued',
     progress: 0,
-    step: 'Initializing blog generation...',
+    step: 'Waiting in queue...',
+    priority,
     startTime: new Date().toISOString()
   });
 
-  // Start the async process (don't await it)
-  processCompleteGeneration(jobId, validation.data);
+  // Queue the job (don't await it); the scheduler bounds how many run at once
+  try {
+    getScheduler().submit(
+      jobId,
+      () => processCompleteGeneration(jobId, validation.data, { ...cacheOptions, priority }),
+      { priority, onPosition: reportQueuePosition(jobId) }
+    ).catch(error => {
+      if (!(error instanceof CancelledError)) logger.error('Generation job crashed', error, { jobId });
+    });
+  } catch (error) {
+    if (!(error instanceof QueueFullError)) throw error;
+    await jobStore.delete(jobId);
+    return NextResponse.json({
+      error: 'Too many blog generations in progress. Please try again shortly.',
+      retryAfter: error.retryAfter
+    }, { status: 429, headers: { 'Retry-After': String(error.retryAfter) } });
+  }
+  getJobEvents().publish(jobId, 'progress', job);
 
   // Return job ID immediately
   return NextResponse.json({
@@ -301,132 +511,654 @@ async function handleGenerateCompleteAsync(body) {
   });
 }
 
-async function processCompleteGeneration(jobId, formData) {
-  const { title, topic, keywords, wordCount, tone } = formData;
-  let blogContent = null;
-  let imageUrl = '';
-  let storyblokResult = null;
-  const errors = [];
-  
+// Keeps a queued job's position in the scheduler queue visible through job-status
+function reportQueuePosition(jobId) {
+  return position => {
+    if (position > 0) {
+      updateJob(jobId, { queuePosition: position, step: `Waiting in queue (position ${position})...` });
+    }
+  };
+}
+
+const BATCH_CONCURRENCY = parseInt(process.env.BATCH_CONCURRENCY || '2', 10);
+
+async function handleGenerateBatch(request, cacheOptions) {
+  let input;
   try {
-    // Update progress: Step 1
-    jobStore.set(jobId, {
-      ...jobStore.get(jobId),
-      status: 'processing',
-      progress: 20,
-      step: 'Generating blog content with GPT-5...'
-    });
+    input = await readBatchRequest(request);
+  } catch (error) {
+    if (!(error instanceof BatchInputError)) throw error;
+    return NextResponse.json({ error: error.message }, { status: 400 });
+  }
+  const priorityValidation = validatePriority(input.priority);
+  if (!priorityValidation.valid) {
+    return NextResponse.json({ error: 'Invalid input', details: priorityValidation.errors }, { status: 400 });
+  }
+  const priority = priorityValidation.data;
 
-    try {
-      blogContent = await generateBlogPost({
-        title,
-        topic,
-        keywords: keywords || [],
-        wordCount: wordCount || 800,
-        tone: tone || 'professional'
-      });
-    } catch (blogError) {
-      errors.push({ step: 'blog_generation', error: blogError.message });
-      throw new Error('Blog generation failed: ' + blogError.message);
+  // Validate every brief; identical briefs are generated once and share the result
+  const items = [];
+  const invalid = [];
+  const itemsByKey = new Map();
+  input.briefs.forEach((brief, index) => {
+    const validation = validateBlogInput(brief && typeof brief === 'object' ? brief : {});
+    if (!validation.valid) {
+      invalid.push({ index, errors: validation.errors });
+      return;
     }
+    const key = briefKey(validation.data);
+    if (itemsByKey.has(key)) {
+      itemsByKey.get(key).duplicates.push(index);
+      return;
+    }
+    const item = { index, jobId: uuidv4(), data: validation.data, duplicates: [] };
+    itemsByKey.set(key, item);
+    items.push(item);
+  });
 
-    // Update progress: Step 2
-    jobStore.set(jobId, {
-      ...jobStore.get(jobId),
-      progress: 50,
-      step: 'Creating hero image...'
-    });
+  if (items.length === 0) {
+    return NextResponse.json({ error: 'No valid briefs in the batch', details: invalid }, { status: 400 });
+  }
 
-    if (blogContent.imagePrompt) {
-      try {
-        const imageResult = await generateHeroImage(blogContent.imagePrompt, blogContent.title);
-        if (imageResult.success) {
-          imageUrl = imageResult.imageUrl;
-        } else {
-          errors.push({ step: 'image_generation', error: imageResult.error });
+  const batchId = uuidv4();
+  const counts = {
+    total: input.briefs.length,
+    unique: items.length,
+    duplicates: input.briefs.length - items.length - invalid.length,
+    invalid: invalid.length,
+    queued: items.length,
+    processing: 0,
+    completed: 0,
+    failed: 0,
+    cancelled: 0
+  };
+  const startTime = new Date().toISOString();
+
+  // The batch and each of its jobs are ordinary job records, so job-status and
+  // job-events work for both
+  await jobStore.create({
+    id: batchId,
+    type: 'batch',
+    status: 'processing',
+    progress: 0,
+    step: `Generating ${items.length} blog posts...`,
+    counts,
+    items: items.map(({ index, jobId, duplicates }) => ({ index, jobId, duplicates })),
+    invalid,
+    startTime
+  });
+  await Promise.all(items.map(item => jobStore.create({
+    id: item.jobId,
+    batchId,
+    status: 'queued',
+    progress: 0,
+    step: 'Queued in batch...',
+    priority,
+    startTime
+  })));
+
+  const encoder = new TextEncoder();
+  let unsubscribe = () => {};
+  const stream = new ReadableStream({
+    start(controller) {
+      const send = (line) => {
+        try {
+          controller.enqueue(encoder.encode(JSON.stringify(line) + '\n'));
+        } catch (error) {
+          // Client went away; the batch keeps running and stays visible via job-status
+          unsubscribe();
         }
-      } catch (imageError) {
-        errors.push({ step: 'image_generation', error: imageError.message });
-        // Continue without image - not critical
-      }
+      };
+
+      send({ type: 'batch', batchId, counts, invalid });
+      unsubscribe = getJobEvents().subscribe(batchId, 0, event => {
+        if (event.type === 'item') {
+          send({ type: 'result', ...event.data });
+        } else if (event.type === 'progress' && event.data.counts) {
+          send({ type: 'progress', counts: event.data.counts, progress: event.data.progress });
+        } else if (event.type === 'complete' || event.type === 'failed' || event.type === 'cancelled') {
+          send({ type: 'done', batchId, status: event.data.status, counts: event.data.counts });
+          unsubscribe();
+          try {
+            controller.close();
+          } catch (error) {
+            // Already closed by the client
+          }
+        }
+      });
+    },
+    cancel() {
+      unsubscribe();
     }
+  });
 
-    // Update progress: Step 3
-    jobStore.set(jobId, {
-      ...jobStore.get(jobId),
-      progress: 80,
-      step: 'Publishing to Storyblok CMS...'
-    });
-    
+  runBatch(batchId, items, counts, { ...cacheOptions, priority })
+    .catch(error => logger.error('Batch generation crashed', error, { batchId }));
+
+  return new Response(stream, {
+    headers: {
+      'Content-Type': 'application/x-ndjson',
+      'Cache-Control': 'no-cache, no-transform',
+      'X-Accel-Buffering': 'no'
+    }
+  });
+}
+
+// Hands a job to the scheduler, waiting for queue room instead of failing the batch
+async function submitWhenRoom(jobId, task, priority) {
+  for (;;) {
     try {
-      let storyblokImageUrl = '';
-      
-      if (imageUrl) {
-        const imagePath = path.join('public', imageUrl.replace(/^\//, ''));
-        const filename = `blog-hero-${Date.now()}.png`;
-        
+      return await getScheduler().submit(jobId, task, { priority, onPosition: reportQueuePosition(jobId) });
+    } catch (error) {
+      if (!(error instanceof QueueFullError)) throw error;
+      await new Promise(resolve => setTimeout(resolve, Math.min(error.retryAfter * 1000, 5000)));
+    }
+  }
+}
+
+// Feeds the batch into the shared scheduler a few jobs at a time, so a large
+// batch never floods the queue ahead of interactive requests. Storyblok writes
+// go through the scheduler's rate-limited storyblok stage like any other job.
+async function runBatch(batchId, items, counts, options) {
+  const results = [];
+  let next = 0;
+  let done = 0;
+
+  async function lane() {
+    while (next < items.length) {
+      const item = items[next++];
+      counts.queued--;
+      counts.processing++;
+      // Once the batch is cancelled, its record keeps the counts the cancel wrote
+      await updateJob(batchId, { counts: { ...counts } }, { ifStatus: IN_FLIGHT_STATUSES });
+
+      // Items of a cancelled batch are marked cancelled before their turn comes
+      if ((await jobStore.get(item.jobId))?.status !== 'cancelled') {
         try {
-          const uploadResult = await uploadImageToStoryblok(imagePath, filename);
-          if (uploadResult.success) {
-            storyblokImageUrl = uploadResult.url;
-          }
-        } catch (uploadError) {
-          errors.push({ step: 'image_upload', error: uploadError.message });
-          // Continue with local image URL
+          await submitWhenRoom(item.jobId, () => processCompleteGeneration(item.jobId, item.data, options), options.priority);
+        } catch (error) {
+          if (!(error instanceof CancelledError)) logger.error('Batch item crashed', error, { batchId, jobId: item.jobId });
         }
       }
-      
-      const storyData = {
-        ...blogContent,
-        heroImage: storyblokImageUrl
+
+      const job = await jobStore.get(item.jobId);
+      const status = ['completed', 'cancelled'].includes(job?.status) ? job.status : 'failed';
+      const result = {
+        jobId: item.jobId,
+        status,
+        title: job?.result?.blogContent?.title || item.data.title,
+        storyId: job?.result?.storyblokResult?.storyId,
+        imageUrl: job?.result?.imageUrl || undefined,
+        partialSuccess: job?.result?.partialSuccess || undefined,
+        errors: job?.result?.errors,
+        error: job?.error
       };
-      
-      storyblokResult = await createStoryblokBlogPost(storyData);
-    } catch (storyblokError) {
-      errors.push({ step: 'storyblok_publish', error: storyblokError.message });
+      counts.processing--;
+      counts[status]++;
+      done++;
+
+      [item.index, ...item.duplicates].forEach(index => {
+        const entry = { index, ...result, duplicateOf: index === item.index ? undefined : item.index };
+        results.push(entry);
+        getJobEvents().publish(batchId, 'item', entry);
+      });
+      await updateJob(batchId, {
+        counts: { ...counts },
+        progress: Math.round((done / items.length) * 100),
+        step: `${done} of ${items.length} blog posts done`
+      }, { ifStatus: IN_FLIGHT_STATUSES });
+    }
+  }
+
+  await Promise.all(Array.from({ length: Math.min(BATCH_CONCURRENCY, items.length) }, lane));
+
+  const summary = {
+    progress: 100,
+    step: counts.failed > 0 ? `Batch finished with ${counts.failed} failed` : 'Batch complete!',
+    counts: { ...counts },
+    results: results.sort((a, b) => a.index - b.index),
+    completedTime: new Date().toISOString()
+  };
+  // A batch cancelled meanwhile (on any instance) stays cancelled but still gets its results
+  if (!await updateJob(batchId, { status: 'completed', ...summary }, { ifStatus: IN_FLIGHT_STATUSES })) {
+    await updateJob(batchId, summary, { ifStatus: ['cancelled'] });
+  }
+}
+
+// Stages of the complete flow. The hero image is prompted from the brief, so
+// it is generated and uploaded while the text is written; the story is created
+// as a draft as soon as the text is ready and patched with the image at the end.
+const COMPLETE_STAGE_LABELS = {
+  blog_generation: 'Blog content written',
+  image_generation: 'Hero image created',
+  image_upload: 'Hero image uploaded to Storyblok',
+  storyblok_publish: 'Draft created in Storyblok CMS',
+  hero_image_update: 'Hero image attached to the story'
+};
+
+// Each job is its own trace (ID = job ID), so its spans, including the Python
+// worker's sub-timings, are saved with the job record. Its deadline bounds every
+// upstream call the job makes and is what DELETE /api/job-status/{id} cancels.
+async function processCompleteGeneration(jobId, formData, cacheOptions = {}) {
+  const deadline = new Deadline(JOB_DEADLINE_MS);
+  jobDeadlines.set(jobId, deadline);
+  try {
+    return await runWithDeadline(deadline, () => runWithTrace(jobId, () => runCompleteGeneration(jobId, formData, cacheOptions)));
+  } finally {
+    deadline.dispose();
+    jobDeadlines.delete(jobId);
+  }
+}
+
+/**
+ * Cancels a queued or running job (for a batch, every job of it). Running jobs
+ * stop their upstream calls; a job running on another instance is marked
+ * cancelled and stops at its next stage boundary. The cancelled status is only
+ * written while a job is still queued or running, so a job that finishes in
+ * the meantime keeps its result.
+ */
+async function handleCancelJob(jobId) {
+  const job = await jobStore.get(jobId);
+  if (!job) {
+    return NextResponse.json({ error: 'Job not found' }, { status: 404 });
+  }
+  if (finalEventType(job)) {
+    return NextResponse.json({ error: `Job already ${job.status}`, status: job.status }, { status: 409 });
+  }
+
+  const cancelledTime = new Date().toISOString();
+  if (job.type === 'batch') {
+    // Items still queued or running all end cancelled; runBatch records the same counts once its lanes stop
+    const { queued = 0, processing = 0, cancelled = 0 } = job.counts || {};
+    const batch = await updateJob(jobId, {
+      status: 'cancelled',
+      step: 'Batch cancelled',
+      counts: { ...job.counts, queued: 0, processing: 0, cancelled: cancelled + queued + processing },
+      cancelledTime
+    }, { ifStatus: IN_FLIGHT_STATUSES });
+    if (!batch) return alreadyFinished(jobId);
+  }
+
+  const jobIds = job.type === 'batch' ? job.items.map(item => item.jobId) : [jobId];
+  const results = await Promise.all(jobIds.map(async id => {
+    const item = await updateJob(id, { status: 'cancelled', step: 'Cancelled', cancelledTime }, { ifStatus: IN_FLIGHT_STATUSES });
+    if (!item) return false;
+    getScheduler().cancel(id);
+    jobDeadlines.get(id)?.cancel(new CancelledError('Job cancelled'));
+    return true;
+  }));
+  if (job.type !== 'batch' && !results[0]) return alreadyFinished(jobId);
+
+  return NextResponse.json({ success: true, jobId, status: 'cancelled' });
+}
+
+// The job reached a final status between the read and the cancel
+async function alreadyFinished(jobId) {
+  const job = await jobStore.get(jobId);
+  if (!job) {
+    return NextResponse.json({ error: 'Job not found' }, { status: 404 });
+  }
+  return NextResponse.json({ error: `Job already ${job.status}`, status: job.status }, { status: 409 });
+}
+
+async function runCompleteGeneration(jobId, formData, cacheOptions) {
+  const { title, topic, keywords, wordCount, tone } = formData;
+  const log = logger.child({ jobId });
+  const storyblokStage = getScheduler().stage('storyblok');
+  const assetStore = getAssetStore();
+  const storyblokOptions = { priority: cacheOptions.priority };
+  let blogContent = null;
+  let imageUrl = '';
+  let imageVariants = [];
+  let storyblokResult = null;
+  let errors = [];
+  const stageTimings = {};
+  let finishedStages = 0;
+  
+  try {
+    const started = await updateJob(jobId, {
+      status: 'processing',
+      queuePosition: 0,
+      progress: 10,
+      step: 'Generating blog content and hero image...'
+    }, { ifStatus: IN_FLIGHT_STATUSES });
+    if (!started) throw new CancelledError('Job cancelled');
+
+    const pipeline = await runPipeline({
+      blog_generation: {
+        run: async () => {
+          blogContent = await generateBlogPost({
+            title,
+            topic,
+            keywords: keywords || [],
+            wordCount: wordCount || 800,
+            tone: tone || 'professional'
+          }, cacheOptions);
+          return blogContent;
+        }
+      },
+      image_generation: {
+        run: async () => {
+          const imageResult = await generateHeroImage(briefImagePrompt({ title, topic, tone }), title, cacheOptions);
+          if (!imageResult.success) throw new Error(imageResult.error);
+          imageUrl = imageResult.imageUrl;
+          // Keep the files for as long as the job record points at them
+          await Promise.all(imageResult.variants.map(variant => assetStore.ref(variant.hash, `job:${jobId}`, { ttl: jobStore.ttl })));
+          return imageResult;
+        }
+      },
+      image_upload: {
+        deps: ['image_generation'],
+        run: async ({ image_generation: image }) => {
+          // Only the variant the story references goes to Storyblok; the others
+          // stay local. A fresh variant is uploaded from memory, a cached one
+          // from its file, and content already in Storyblok is not uploaded again.
+          const { buffer, ...primary } = image.variants.find(variant => variant.url === imageUrl);
+          const uploadResult = await storyblokStage.run(
+            () => uploadGeneratedAsset(primary.url, `blog-hero-${path.basename(primary.url)}`, buffer),
+            storyblokOptions
+          );
+          if (!uploadResult.success) throw new Error(uploadResult.error);
+          imageVariants = image.variants.map(({ buffer, ...variant }) =>
+            variant.url === imageUrl ? { ...variant, storyblokUrl: uploadResult.url } : variant
+          );
+          return { success: true, url: uploadResult.url, hash: primary.hash };
+        }
+      },
+      storyblok_publish: {
+        deps: ['blog_generation'],
+        run: async () => {
+          storyblokResult = await storyblokStage.run(() => createStoryblokBlogPost({ ...blogContent, heroImage: '' }), storyblokOptions);
+          return storyblokResult;
+        }
+      },
+      hero_image_update: {
+        deps: ['storyblok_publish', 'image_upload'],
+        run: async ({ storyblok_publish: draft, image_upload: upload }) => {
+          storyblokResult = await storyblokStage.run(
+            () => updateStoryblokBlogPost(draft.story, { hero_image: upload.url }),
+            storyblokOptions
+          );
+          await assetStore.ref(upload.hash, `story:${draft.storyId}`);
+          return storyblokResult;
+        }
+      }
+    }, {
+      onStageDone: async (stage, timing) => {
+        stageTimings[stage] = timing;
+        let patch = { stageTimings };
+        if (timing.status === 'completed') {
+          finishedStages++;
+          patch = {
+            progress: 10 + Math.round((finishedStages / Object.keys(COMPLETE_STAGE_LABELS).length) * 85),
+            step: `${COMPLETE_STAGE_LABELS[stage]}...`,
+            stageTimings
+          };
+        } else {
+          log.warn('Generation stage did not complete', { stage, status: timing.status });
+        }
+        // Refused once the job is no longer running, e.g. cancelled through
+        // another instance: stop the remaining stages here as well
+        if (!await updateJob(jobId, patch, { ifStatus: IN_FLIGHT_STATUSES })) {
+          currentDeadline().cancel(new CancelledError('Job cancelled'));
+        }
+      }
+    });
+
+    errors = pipeline.errors;
+    if (!storyblokResult && pipeline.timings.storyblok_publish?.status === 'failed') {
       storyblokResult = { 
         success: false, 
         error: 'Storyblok integration failed but content generated successfully' 
       };
     }
+    // Cancelled or out of time: the stages stopped where they were
+    if (currentDeadline().signal.aborted) {
+      throw currentDeadline().signal.reason;
+    }
+    if (pipeline.timings.blog_generation.status !== 'completed') {
+      throw new Error('Blog generation failed: ' + errors.find(e => e.step === 'blog_generation').error);
+    }
 
     // Complete the job with partial results if needed
     const hasContent = blogContent !== null;
     const status = hasContent ? 'completed' : 'failed';
+    log.info('Generation job finished', { status, durationMs: pipeline.duration, failedStages: errors.length });
     
-    jobStore.set(jobId, {
-      ...jobStore.get(jobId),
+    await updateJob(jobId, {
       status: status,
       progress: 100,
       step: hasContent ? 'Complete! Blog post ready.' : 'Failed to generate content',
+      stageTimings,
+      durationMs: pipeline.duration,
+      trace: currentTrace().spans,
       result: {
         blogContent,
         imageUrl,
+        imageVariants,
         storyblokResult,
         errors: errors.length > 0 ? errors : undefined,
         partialSuccess: hasContent && errors.length > 0
       },
       completedTime: new Date().toISOString()
-    });
+    }, { ifStatus: IN_FLIGHT_STATUSES });
 
   } catch (error) {
-    // Mark job as failed with any partial results
-    jobStore.set(jobId, {
-      ...jobStore.get(jobId),
-      status: 'failed',
+    const cancelled = error instanceof CancelledError;
+    if (cancelled) {
+      log.info('Generation job cancelled');
+    } else {
+      log.error('Generation job failed', error);
+    }
+    // Mark job as failed (or cancelled) with any partial results
+    await updateJob(jobId, {
+      status: cancelled ? 'cancelled' : 'failed',
+      ...(cancelled && { step: 'Cancelled' }),
       error: error.message,
+      stageTimings,
+      trace: currentTrace().spans,
       result: {
         blogContent,
         imageUrl,
+        imageVariants,
         storyblokResult,
         errors: errors,
         partialSuccess: blogContent !== null
       },
-      failedTime: new Date().toISOString()
+      [cancelled ? 'cancelledTime' : 'failedTime']: new Date().toISOString()
+    }, {
+      // A cancelled job keeps its status and gains the partial results; a
+      // job finished elsewhere in the meantime is left alone
+      ifStatus: cancelled ? [...IN_FLIGHT_STATUSES, 'cancelled'] : IN_FLIGHT_STATUSES
     });
   }
 }
 
+function parseBlogPostsQuery(request) {
+  const params = new URL(request.url).searchParams;
+  return {
+    slug: params.get('slug') || undefined,
+    tag: params.get('tag') || undefined,
+    status: params.get('status') || undefined,
+    page: parseInt(params.get('page') || '1', 10) || 1,
+    perPage: parseInt(params.get('per_page') || '100', 10) || 100,
+    cursor: params.get('cursor') || undefined,
+    refresh: params.get('refresh') === 'true' || request.headers.get('cache-control')?.includes('no-cache')
+  };
+}
+
+async function getJobCounts() {
+  const counts = await Promise.all(JOB_STATUSES.map(status => jobStore.countByStatus(status)));
+  return Object.fromEntries(JOB_STATUSES.map((status, i) => [status, counts[i]]));
+}
+
+// Copies the counters and gauges that components keep in their own stats()
+function collectComponentMetrics(metrics) {
+  const cacheEvents = metrics.counter('blogstudio_cache_events_total', 'Cache lookups and writes by outcome', ['cache', 'event']);
+  const cacheSize = metrics.gauge('blogstudio_cache_size', 'Cache size', ['cache', 'unit']);
+  const generation = getGenerationCache().stats();
+  ['hits', 'misses', 'memoryHits', 'diskHits', 'writes', 'evictions', 'bypassed'].forEach(event => {
+    cacheEvents.set({ cache: 'generation', event }, generation[event]);
+  });
+  cacheSize.set({ cache: 'generation', unit: 'entries' }, generation.entries);
+  cacheSize.set({ cache: 'generation', unit: 'bytes' }, generation.bytes);
+
+  const assets = getAssetStore().stats();
+  ['stored', 'deduplicated', 'uploadsSkipped', 'deleted'].forEach(event => {
+    cacheEvents.set({ cache: 'assets', event }, assets[event]);
+  });
+  cacheSize.set({ cache: 'assets', unit: 'entries' }, assets.assets);
+  cacheSize.set({ cache: 'assets', unit: 'bytes' }, assets.bytes);
+  cacheSize.set({ cache: 'story_mirror', unit: 'entries' }, getStoryMirror().stats().stories);
+
+  const publishes = metrics.counter('blogstudio_story_writes_total', 'Story creates and updates, and publishes skipped as unchanged', ['outcome']);
+  const publishIndex = getPublishIndex().stats();
+  ['created', 'updated', 'unchanged'].forEach(outcome => publishes.set({ outcome }, publishIndex[outcome]));
+
+  const queueDepth = metrics.gauge('blogstudio_queue_depth', 'Work waiting for a slot', ['queue']);
+  const queueActive = metrics.gauge('blogstudio_queue_active', 'Work holding a slot', ['queue']);
+  const scheduler = getScheduler().stats();
+  queueDepth.set({ queue: 'jobs' }, scheduler.queued);
+  queueActive.set({ queue: 'jobs' }, scheduler.active);
+  Object.entries(scheduler.stages).forEach(([name, stage]) => {
+    queueDepth.set({ queue: `stage_${name}` }, stage.waiting);
+    queueActive.set({ queue: `stage_${name}` }, stage.active);
+  });
+
+  const workers = getWorkerPoolStats();
+  if (workers) {
+    queueDepth.set({ queue: 'python_worker' }, workers.queued);
+    queueActive.set({ queue: 'python_worker' }, workers.workers.filter(worker => worker.state === 'busy').length);
+    metrics.counter('blogstudio_worker_restarts_total', 'Python worker restarts', [])
+      .set({}, workers.workers.reduce((sum, worker) => sum + worker.restarts, 0));
+  }
+
+  const retries = metrics.counter('blogstudio_upstream_retries_total', 'Retried upstream requests', ['upstream', 'operation']);
+  Object.entries(getStoryblokClient().stats()).forEach(([operation, endpoint]) => {
+    retries.set({ upstream: 'storyblok', operation }, endpoint.retries);
+  });
+}
+
+/**
+ * Prometheus scrape endpoint. Set METRICS_TOKEN to require "Authorization: Bearer <token>".
+ */
+function handleMetrics(request) {
+  const token = process.env.METRICS_TOKEN;
+  if (token && request.headers.get('authorization') !== `Bearer ${token}`) {
+    return NextResponse.json({ error: 'Unauthorized' }, { status: 401 });
+  }
+  const metrics = getMetrics();
+  collectComponentMetrics(metrics);
+  return new NextResponse(metrics.render(), {
+    headers: { 'Content-Type': 'text/plain; version=0.0.4; charset=utf-8' }
+  });
+}
+
+async function handleJobEvents(request, jobId) {
+  if (!jobId) {
+    return NextResponse.json({ error: 'Job ID is required' }, { status: 400 });
+  }
+  const job = await jobStore.get(jobId);
+  if (!job) {
+    return NextResponse.json({ error: 'Job not found' }, { status: 404 });
+  }
+
+  // EventSource sends Last-Event-ID on reconnect; the query param covers manual resumes
+  const lastEventId = parseInt(
+    request.headers.get('last-event-id') || new URL(request.url).searchParams.get('lastEventId') || '0',
+    10
+  ) || 0;
+
+  const events = getJobEvents();
+  const encoder = new TextEncoder();
+  let cleanup = () => {};
+
+  const stream = new ReadableStream({
+    start(controller) {
+      let closed = false;
+      let unsubscribe = () => {};
+      let heartbeat = null;
+
+      const write = (text) => {
+        if (closed) return;
+        try {
+          controller.enqueue(encoder.encode(text));
+        } catch (error) {
+          cleanup();
+        }
+      };
+
+      cleanup = () => {
+        if (closed) return;
+        closed = true;
+        clearInterval(heartbeat);
+        unsubscribe();
+        try {
+          controller.close();
+        } catch (error) {
+          // Already closed by the client
+        }
+      };
+
+      const send = (event) => {
+        write(`id: ${event.id}\nevent: ${event.type}\ndata: ${JSON.stringify(event.data)}\n\n`);
+        if (event.type === 'complete' || event.type === 'failed' || event.type === 'cancelled') {
+          cleanup();
+        }
+      };
+
+      write('retry: 2000\n\n');
+
+      if (finalEventType(job) && !events.isFinished(jobId)) {
+        // Event history already dropped; answer from the job record
+        write(`event: ${finalEventType(job)}\ndata: ${JSON.stringify(job)}\n\n`);
+        cleanup();
+        return;
+      }
+
+      if (!events.hasChannel(jobId)) {
+        // The job runs on another instance: relay its changes from the shared store
+        let last = JSON.stringify(job);
+        write(`event: snapshot\ndata: ${last}\n\n`);
+        const relay = setInterval(async () => {
+          const latest = await jobStore.get(jobId).catch(() => null);
+          if (!latest) {
+            cleanup();
+            return;
+          }
+          const serialized = JSON.stringify(latest);
+          if (serialized === last) return;
+          last = serialized;
+          write(`event: ${finalEventType(latest) || 'progress'}\ndata: ${serialized}\n\n`);
+          if (finalEventType(latest)) cleanup();
+        }, 1000);
+        unsubscribe = () => clearInterval(relay);
+      } else {
+        unsubscribe = events.subscribe(jobId, lastEventId, send);
+      }
+      if (closed) {
+        unsubscribe();
+        return;
+      }
+
+      heartbeat = setInterval(() => write(': keepalive\n\n'), 15000);
+      request.signal?.addEventListener('abort', cleanup);
+    },
+    cancel() {
+      cleanup();
+    }
+  });
+
+  return new Response(stream, {
+    headers: {
+      'Content-Type': 'text/event-stream',
+      'Cache-Control': 'no-cache, no-transform',
+      'Connection': 'keep-alive',
+      'X-Accel-Buffering': 'no'
+    }
+  });
+}
+
 async function handlePublishStory(storyId) {
   try {
     const result = await publishStoryblokBlogPost(storyId);
@@ -449,8 +1181,10 @@ async function handlePublishStory(storyId) {
   }
 }
 
-async function handleAIEdit(body) {
-  const { prompt, sectionId } = body;
+// Free-form prompt without a post (older clients)
+async function handleAIEdit(body, cacheOptions) {
+  // A JSON body of null is valid JSON but carries no prompt
+  const { prompt } = body || {};
   
   if (!prompt) {
     return NextResponse.json({ 
@@ -460,52 +1194,11 @@ async function handleAIEdit(body) {
 
   try {
     // Use Gemini to regenerate the content
-    const { exec } = await import('child_process');
-    const { promisify } = await import('util');
-    const execPromise = promisify(exec);
-    
-    const timestamp = Date.now();
-    const scriptPath = `/tmp/ai_edit_${timestamp}.py`;
-    
-    const pythonScript = `
-import google.generativeai as genai
-import os
-
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-model = genai.GenerativeModel('gemini-2.0-flash-exp')
-
-prompt = """${prompt.replace(/"/g, '\\"').replace(/\n/g, '\\n')}
-
-Only return the improved content, nothing else. No explanations, no markdown formatting, just the pure text."""
-
-response = model.generate_content(prompt)
-print(response.text)
-`;
-
-    const fs = await import('fs');
-    fs.writeFileSync(scriptPath, pythonScript);
-
-    const env = {
-      ...process.env,
-      GEMINI_API_KEY: process.env.GEMINI_API_KEY
-    };
-
-    const pythonPath = process.env.PYTHON_PATH || 'python3';
-    const { stdout, stderr } = await execPromise(`${pythonPath} ${scriptPath}`, { 
-      env, 
-      cwd: process.cwd(),
-      timeout: 30000 
-    });
-
-    fs.unlinkSync(scriptPath);
-
-    if (stderr && !stderr.includes('WARNING')) {
-      throw new Error(stderr);
-    }
+    const content = await editContent(prompt, cacheOptions);
 
     return NextResponse.json({
       success: true,
-      content: stdout.trim()
+      content
     });
 
   } catch (error) {
@@ -513,4 +1206,71 @@ print(response.text)
       error: `AI edit failed: ${error.message}` 
     }, { status: 500 });
   }
+}
+
+/**
+ * Section-scoped edits of a post, streamed back as NDJSON, one line per section:
+ *   { type: 'section', sectionId, content }
+ *   { type: 'superseded' | 'cancelled', sectionId }
+ *   { type: 'error', sectionId, error }
+ * followed by { type: 'done' }. Closing the request cancels its edits.
+ */
+async function handleSectionEdits(body, cacheOptions, request) {
+  const validation = validateEditRequest(body);
+  if (!validation.valid) {
+    return NextResponse.json({ 
+      error: 'Invalid input',
+      details: validation.errors 
+    }, { status: 400 });
+  }
+
+  const { post, edits } = validation.data;
+  // Without a document ID, edits are only batched within this request
+  const documentId = validation.data.documentId || uuidv4();
+  const engine = getEditEngine();
+  const abort = new AbortController();
+  request.signal?.addEventListener('abort', () => abort.abort());
+  const encoder = new TextEncoder();
+
+  const stream = new ReadableStream({
+    async start(controller) {
+      const send = (event) => {
+        try {
+          controller.enqueue(encoder.encode(JSON.stringify(event) + '\n'));
+        } catch (error) {
+          // Client went away; its edits are cancelled through `abort`
+        }
+      };
+
+      await Promise.all(edits.map(async edit => {
+        const { sectionId } = edit;
+        try {
+          const content = await engine.edit(documentId, post, edit, { ...cacheOptions, signal: abort.signal });
+          send({ type: 'section', sectionId, content });
+        } catch (error) {
+          send(error instanceof EditCancelledError
+            ? { type: error.reason, sectionId }
+            : { type: 'error', sectionId, error: `AI edit failed: ${error.message}` });
+        }
+      }));
+
+      send({ type: 'done' });
+      try {
+        controller.close();
+      } catch (error) {
+        // Already closed by the client
+      }
+    },
+    cancel() {
+      abort.abort();
+    }
+  });
+
+  return new Response(stream, {
+    headers: {
+      'Content-Type': 'application/x-ndjson',
+      'Cache-Control': 'no-cache, no-transform',
+      'X-Accel-Buffering': 'no'
+    }
+  });
 }
\ No newline at end of file
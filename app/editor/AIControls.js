@@ -1,6 +1,6 @@
 'use client';
 
-import { useState } from 'react';
+import { useState, useRef, useEffect } from 'react';
 import { motion } from 'framer-motion';
 import {
   Sparkles,
@@ -12,23 +12,43 @@ import {
   Maximize2,
   Smile,
   Briefcase,
-  Loader2
+  Loader2,
+  X
 } from 'lucide-react';
 import { Button } from '@/components/ui/button';
 import { Textarea } from '@/components/ui/textarea';
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@/components/ui/select';
 
+// Writes revised text back into the post without mutating the previous state
+function applySectionContent(post, sectionId, content) {
+  if (sectionId === 'intro') return { ...post, introduction: content };
+  if (sectionId === 'conclusion') return { ...post, conclusion: content };
+  if (sectionId === 'title') return { ...post, title: content };
+  const sections = [...post.sections];
+  sections[sectionId] = { ...sections[sectionId], content };
+  return { ...post, sections };
+}
+
 export default function AIControls({ blogData, setBlogData, editingSection, setEditingSection }) {
   const [aiCommand, setAiCommand] = useState('');
-  const [processing, setProcessing] = useState(false);
+  // sectionId -> action of the edit in flight for that section
+  const [pendingEdits, setPendingEdits] = useState({});
+  // One ID per editor session, so edits of several sections share model calls
+  const documentId = useRef(null);
+  const controllers = useRef(new Map());
 
-  const getSectionContent = (sectionId) => {
-    if (sectionId === 'intro') return blogData.introduction;
-    if (sectionId === 'conclusion') return blogData.conclusion;
-    if (sectionId === 'title') return blogData.title;
-    if (typeof sectionId === 'number') return blogData.sections[sectionId].content;
-    return '';
-  };
+  useEffect(() => {
+    documentId.current = crypto.randomUUID?.() || `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+    const inFlight = controllers.current;
+    return () => inFlight.forEach(controller => controller.abort());
+  }, []);
+
+  const processing = editingSection !== null && editingSection in pendingEdits;
+  const otherPending = Object.keys(pendingEdits).filter(id => String(id) !== String(editingSection)).length;
+
+  const actionIcon = (action, Icon) => (pendingEdits[editingSection] === action
+    ? <Loader2 className="h-3.5 w-3.5 mr-2 animate-spin" />
+    : <Icon className="h-3.5 w-3.5 mr-2" />);
 
   const getSectionLabel = (sectionId) => {
     if (sectionId === 'intro') return 'Introduction';
@@ -38,81 +58,86 @@ export default function AIControls({ blogData, setBlogData, editingSection, setE
     return 'Unknown';
   };
 
+  const finishEdit = (sectionId, controller) => {
+    if (controllers.current.get(sectionId) !== controller) return;
+    controllers.current.delete(sectionId);
+    setPendingEdits(prev => {
+      const { [sectionId]: _, ...rest } = prev;
+      return rest;
+    });
+  };
+
+  const cancelEdit = (sectionId) => {
+    const controller = controllers.current.get(sectionId);
+    if (!controller) return;
+    controller.abort();
+    finishEdit(sectionId, controller);
+  };
+
   const handleAIRegenerate = async (action) => {
     if (editingSection === null) {
       alert('Please select a section to edit first');
       return;
     }
-
-    setProcessing(true);
-    const content = getSectionContent(editingSection);
-    
-    let prompt = '';
-    switch(action) {
-      case 'regenerate':
-        prompt = `Rewrite this content to make it better while keeping the same meaning:\n\n${content}`;
-        break;
-      case 'shorter':
-        prompt = `Make this content more concise (about 50% shorter) while keeping key points:\n\n${content}`;
-        break;
-      case 'longer':
-        prompt = `Expand this content with more details, examples, and explanations:\n\n${content}`;
-        break;
-      case 'casual':
-        prompt = `Rewrite this in a casual, friendly tone:\n\n${content}`;
-        break;
-      case 'professional':
-        prompt = `Rewrite this in a professional, formal tone:\n\n${content}`;
-        break;
-      case 'seo':
-        prompt = `Optimize this content for SEO with relevant keywords:\n\n${content}`;
-        break;
-      case 'custom':
-        if (!aiCommand.trim()) {
-          alert('Please enter a custom command');
-          setProcessing(false);
-          return;
-        }
-        prompt = `${aiCommand}\n\nCurrent content:\n${content}`;
-        break;
+    if (action === 'custom' && !aiCommand.trim()) {
+      alert('Please enter a custom command');
+      return;
     }
 
+    // A new edit of the same section replaces the one in flight
+    const sectionId = editingSection;
+    controllers.current.get(sectionId)?.abort();
+    const controller = new AbortController();
+    controllers.current.set(sectionId, controller);
+    setPendingEdits(prev => ({ ...prev, [sectionId]: action }));
+
     try {
-      // Call Gemini AI to regenerate
+      // Only the section and a summary of the post reach the model; the
+      // server streams the revised section back as soon as it is ready
       const response = await fetch('/api/ai-edit', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
+        signal: controller.signal,
         body: JSON.stringify({
-          prompt: prompt,
-          sectionId: editingSection
+          documentId: documentId.current,
+          post: blogData,
+          sectionId,
+          action,
+          instruction: action === 'custom' ? aiCommand : ''
         })
       });
 
-      const result = await response.json();
-      
-      if (result.success) {
-        // Update the section with new content
-        setBlogData(prev => {
-          const updated = { ...prev };
-          if (editingSection === 'intro') {
-            updated.introduction = result.content;
-          } else if (editingSection === 'conclusion') {
-            updated.conclusion = result.content;
-          } else if (editingSection === 'title') {
-            updated.title = result.content;
-          } else if (typeof editingSection === 'number') {
-            updated.sections[editingSection].content = result.content;
+      if (!response.ok || !response.body) {
+        const data = await response.json().catch(() => ({}));
+        throw new Error(data.details?.join(', ') || data.error || `HTTP ${response.status}`);
+      }
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        lines.filter(line => line.trim()).forEach(line => {
+          const event = JSON.parse(line);
+          if (event.type === 'section') {
+            setBlogData(prev => applySectionContent(prev, event.sectionId, event.content));
+            if (action === 'custom') setAiCommand('');
+          } else if (event.type === 'error') {
+            throw new Error(event.error);
           }
-          return updated;
         });
-        setAiCommand('');
-      } else {
-        throw new Error(result.error || 'AI edit failed');
       }
     } catch (error) {
-      alert('AI editing failed: ' + error.message);
+      if (error.name !== 'AbortError') {
+        alert('AI editing failed: ' + error.message);
+      }
     } finally {
-      setProcessing(false);
+      finishEdit(sectionId, controller);
     }
   };
 
@@ -150,6 +175,22 @@ export default function AIControls({ blogData, setBlogData, editingSection, setE
           <p className="text-sm text-purple-700 font-medium">
             {getSectionLabel(editingSection)}
           </p>
+          {processing && (
+            <Button
+              variant="ghost"
+              size="sm"
+              onClick={() => cancelEdit(editingSection)}
+              className="mt-2 px-2 text-purple-600 hover:text-purple-700"
+            >
+              <X className="h-3.5 w-3.5 mr-1" />
+              Cancel AI edit
+            </Button>
+          )}
+          {otherPending > 0 && (
+            <p className="text-xs text-purple-500 mt-1">
+              {otherPending} other {otherPending === 1 ? 'section is' : 'sections are'} being edited
+            </p>
+          )}
         </motion.div>
       ) : (
         <div className="bg-gray-50 border border-gray-200 rounded-lg p-4 text-center">
@@ -170,10 +211,9 @@ export default function AIControls({ blogData, setBlogData, editingSection, setE
               variant="outline"
               size="sm"
               onClick={() => handleAIRegenerate('regenerate')}
-              disabled={processing}
               className="w-full"
             >
-              <RefreshCw className="h-3.5 w-3.5 mr-2" />
+              {actionIcon('regenerate', RefreshCw)}
               Regenerate
             </Button>
 
@@ -181,10 +221,9 @@ export default function AIControls({ blogData, setBlogData, editingSection, setE
               variant="outline"
               size="sm"
               onClick={() => handleAIRegenerate('seo')}
-              disabled={processing}
               className="w-full"
             >
-              <TrendingUp className="h-3.5 w-3.5 mr-2" />
+              {actionIcon('seo', TrendingUp)}
               SEO Optimize
             </Button>
 
@@ -192,10 +231,9 @@ export default function AIControls({ blogData, setBlogData, editingSection, setE
               variant="outline"
               size="sm"
               onClick={() => handleAIRegenerate('shorter')}
-              disabled={processing}
               className="w-full"
             >
-              <Minimize2 className="h-3.5 w-3.5 mr-2" />
+              {actionIcon('shorter', Minimize2)}
               Make Shorter
             </Button>
 
@@ -203,10 +241,9 @@ export default function AIControls({ blogData, setBlogData, editingSection, setE
               variant="outline"
               size="sm"
               onClick={() => handleAIRegenerate('longer')}
-              disabled={processing}
               className="w-full"
             >
-              <Maximize2 className="h-3.5 w-3.5 mr-2" />
+              {actionIcon('longer', Maximize2)}
               Make Longer
             </Button>
           </div>
@@ -219,10 +256,9 @@ export default function AIControls({ blogData, setBlogData, editingSection, setE
                 variant="outline"
                 size="sm"
                 onClick={() => handleAIRegenerate('casual')}
-                disabled={processing}
                 className="w-full"
               >
-                <Smile className="h-3.5 w-3.5 mr-2" />
+                {actionIcon('casual', Smile)}
                 Casual
               </Button>
 
@@ -230,10 +266,9 @@ export default function AIControls({ blogData, setBlogData, editingSection, setE
                 variant="outline"
                 size="sm"
                 onClick={() => handleAIRegenerate('professional')}
-                disabled={processing}
                 className="w-full"
               >
-                <Briefcase className="h-3.5 w-3.5 mr-2" />
+                {actionIcon('professional', Briefcase)}
                 Professional
               </Button>
             </div>
@@ -246,16 +281,15 @@ export default function AIControls({ blogData, setBlogData, editingSection, setE
               placeholder="e.g., 'Add code examples' or 'Make it more technical'..."
               value={aiCommand}
               onChange={(e) => setAiCommand(e.target.value)}
-              disabled={processing}
               rows={3}
               className="mb-2"
             />
             <Button
               onClick={() => handleAIRegenerate('custom')}
-              disabled={processing || !aiCommand.trim()}
+              disabled={!aiCommand.trim()}
               className="w-full bg-gradient-to-r from-purple-600 to-blue-600 hover:from-purple-700 hover:to-blue-700"
             >
-              {processing ? (
+              {pendingEdits[editingSection] === 'custom' ? (
                 <>
                   <Loader2 className="h-4 w-4 mr-2 animate-spin" />
                   AI Processing...
@@ -277,7 +311,7 @@ export default function AIControls({ blogData, setBlogData, editingSection, setE
         <ul className="text-xs text-blue-700 space-y-1">
           <li>• Hover over any section to see edit options</li>
           <li>• Use custom commands for specific changes</li>
-          <li>• All changes are instant and AI-powered</li>
+          <li>• Edit several sections in a row: the edits are processed together</li>
           <li>• Click "Publish" when ready to go live</li>
         </ul>
       </div>
@@ -4,7 +4,7 @@ import { motion } from 'framer-motion';
 import { Eye, Sparkles, Edit } from 'lucide-react';
 import { useState } from 'react';
 
-export default function BlogPreview({ blogData, imageUrl, onSectionEdit, editingSection, onSectionUpdate }) {
+export default function BlogPreview({ blogData, imageUrl, streaming = false, onSectionEdit, editingSection, onSectionUpdate }) {
   const [hoveredSection, setHoveredSection] = useState(null);
 
   const SectionWrapper = ({ id, children, label }) => {
@@ -55,6 +55,21 @@ export default function BlogPreview({ blogData, imageUrl, onSectionEdit, editing
     );
   };
 
+  // Placeholder for parts of a streamed post that haven't arrived yet
+  const PendingBlock = ({ label }) => (
+    <div className="mb-12 animate-pulse">
+      <div className="text-sm text-purple-600 font-medium mb-3 flex items-center gap-2">
+        <Sparkles className="h-4 w-4" />
+        {label}
+      </div>
+      <div className="space-y-2">
+        <div className="h-4 bg-gray-200 rounded w-full" />
+        <div className="h-4 bg-gray-200 rounded w-11/12" />
+        <div className="h-4 bg-gray-200 rounded w-4/5" />
+      </div>
+    </div>
+  );
+
   return (
     <div className="bg-white rounded-xl shadow-lg overflow-hidden">
       {/* Article Header */}
@@ -103,11 +118,15 @@ export default function BlogPreview({ blogData, imageUrl, onSectionEdit, editing
       {/* Article Content */}
       <article className="prose prose-lg max-w-none p-12">
         {/* Introduction */}
-        <SectionWrapper id="intro" label="Introduction">
-          <div className="text-xl leading-relaxed text-gray-700 mb-12 first-letter:text-5xl first-letter:font-bold first-letter:text-purple-600 first-letter:float-left first-letter:mr-2 first-letter:mt-1">
-            {blogData.introduction}
-          </div>
-        </SectionWrapper>
+        {blogData.introduction === undefined && streaming ? (
+          <PendingBlock label="Writing introduction..." />
+        ) : (
+          <SectionWrapper id="intro" label="Introduction">
+            <div className="text-xl leading-relaxed text-gray-700 mb-12 first-letter:text-5xl first-letter:font-bold first-letter:text-purple-600 first-letter:float-left first-letter:mr-2 first-letter:mt-1">
+              {blogData.introduction}
+            </div>
+          </SectionWrapper>
+        )}
 
         {/* Main Sections */}
         {blogData.sections?.map((section, index) => (
@@ -124,15 +143,22 @@ export default function BlogPreview({ blogData, imageUrl, onSectionEdit, editing
           </SectionWrapper>
         ))}
 
+        {/* Sections still being written */}
+        {streaming && blogData.introduction !== undefined && blogData.conclusion === undefined && (
+          <PendingBlock label={`Writing section ${(blogData.sections?.length || 0) + 1}...`} />
+        )}
+
         {/* Conclusion */}
-        <SectionWrapper id="conclusion" label="Conclusion">
-          <div className="bg-gradient-to-r from-purple-50 to-blue-50 border-l-4 border-purple-600 p-8 rounded-r-lg">
-            <h2 className="text-2xl font-bold text-gray-900 mb-4">Conclusion</h2>
-            <div className="text-gray-700 leading-relaxed whitespace-pre-wrap">
-              {blogData.conclusion}
+        {blogData.conclusion !== undefined && (
+          <SectionWrapper id="conclusion" label="Conclusion">
+            <div className="bg-gradient-to-r from-purple-50 to-blue-50 border-l-4 border-purple-600 p-8 rounded-r-lg">
+              <h2 className="text-2xl font-bold text-gray-900 mb-4">Conclusion</h2>
+              <div className="text-gray-700 leading-relaxed whitespace-pre-wrap">
+                {blogData.conclusion}
+              </div>
             </div>
-          </div>
-        </SectionWrapper>
+          </SectionWrapper>
+        )}
 
         {/* SEO Meta Description */}
         <div className="mt-12 p-6 bg-gray-50 rounded-lg border border-gray-200">
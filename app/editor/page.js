@@ -20,6 +20,7 @@ import { Button } from "@/components/ui/button";
 import { useRouter, useSearchParams } from 'next/navigation';
 import BlogPreview from './BlogPreview';
 import AIControls from './AIControls';
+import { trackJob } from '@/lib/jobTracker';
 
 export default function VisualEditor() {
   const router = useRouter();
@@ -28,43 +29,111 @@ export default function VisualEditor() {
   
   const [blogData, setBlogData] = useState(null);
   const [imageUrl, setImageUrl] = useState('');
+  // Story this post was saved to, so publishing again updates it instead of creating a copy
+  const [storyId, setStoryId] = useState(null);
   const [loading, setLoading] = useState(true);
   const [saving, setSaving] = useState(false);
   const [previewMode, setPreviewMode] = useState('desktop'); // desktop, tablet, mobile
   const [editingSection, setEditingSection] = useState(null);
   const [showAIPanel, setShowAIPanel] = useState(true);
+  const [streaming, setStreaming] = useState(false);
+
+  // Applies one incremental event from /api/generate-blog/stream
+  const applyStreamEvent = (event) => {
+    if (event.type === 'field') {
+      setBlogData(prev => ({ ...prev, [event.field]: event.value }));
+    } else if (event.type === 'section') {
+      setBlogData(prev => {
+        const sections = [...(prev.sections || [])];
+        sections[event.index] = event.section;
+        return { ...prev, sections };
+      });
+    } else if (event.type === 'done') {
+      setBlogData(event.data);
+    } else if (event.type === 'error') {
+      throw new Error(event.error);
+    }
+  };
+
+  // Streams a fresh draft straight into the preview, section by section
+  const streamBlogDraft = async (brief) => {
+    setBlogData({ title: brief.title, sections: [] });
+    setStreaming(true);
+    setLoading(false);
+
+    try {
+      const response = await fetch('/api/generate-blog/stream', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(brief)
+      });
+
+      if (!response.ok || !response.body) {
+        const data = await response.json().catch(() => ({}));
+        throw new Error(data.error || `HTTP ${response.status}`);
+      }
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        lines.filter(line => line.trim()).forEach(line => applyStreamEvent(JSON.parse(line)));
+      }
+    } catch (error) {
+      console.error('Error streaming blog draft:', error);
+      alert('Failed to generate blog draft: ' + error.message);
+      router.push('/');
+    } finally {
+      setStreaming(false);
+    }
+  };
 
   // Fetch blog data from job result
   useEffect(() => {
     const fetchBlogData = async () => {
       if (!jobId) {
-        // If no job ID, redirect to home
+        // A brief in the URL starts a streamed draft; otherwise go back home
+        const title = searchParams.get('title');
+        const topic = searchParams.get('topic');
+        if (title && topic) {
+          streamBlogDraft({
+            title,
+            topic,
+            keywords: searchParams.get('keywords') || '',
+            wordCount: parseInt(searchParams.get('wordCount') || '800', 10),
+            tone: searchParams.get('tone') || 'professional'
+          });
+          return;
+        }
         router.push('/');
         return;
       }
 
       try {
-        const response = await fetch(`/api/job-status/${jobId}`);
-        const data = await response.json();
+        // Waits on /api/job-events while the job is still running
+        const job = await trackJob(jobId, { pollInterval: 2000, timeout: 5 * 60 * 1000 });
         
-        if (response.status === 404) {
+        if (job.result?.blogContent) {
+          setBlogData(job.result.blogContent);
+          setImageUrl(job.result.imageUrl || '');
+          setStoryId(job.result.storyblokResult?.storyId || null);
+          setLoading(false);
+        } else {
+          throw new Error('Blog generation failed');
+        }
+      } catch (error) {
+        if (error.status === 404) {
           // Job not found - expired or server restarted
           alert('⚠️ Blog data not found. This happens when:\n\n1. The job is older than 1 hour (expired)\n2. The server was restarted\n\nPlease generate a new blog from the homepage.');
           router.push('/');
           return;
         }
-        
-        if (data.status === 'completed' && data.result?.blogContent) {
-          setBlogData(data.result.blogContent);
-          setImageUrl(data.result.imageUrl || '');
-          setLoading(false);
-        } else if (data.status === 'failed') {
-          throw new Error('Blog generation failed');
-        } else {
-          // Still processing, wait and retry
-          setTimeout(fetchBlogData, 2000);
-        }
-      } catch (error) {
         console.error('Error fetching blog data:', error);
         alert('Failed to load blog data. Please generate a new blog from the homepage.');
         router.push('/');
@@ -94,13 +163,14 @@ export default function VisualEditor() {
       const response = await fetch('/api/publish-to-storyblok', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ blogData })
+        body: JSON.stringify({ blogData, imageUrl: imageUrl || undefined, storyId })
       });
       
       const result = await response.json();
       
       if (result.success) {
-        alert('🎉 Published to Storyblok successfully!');
+        setStoryId(result.storyId);
+        alert(result.unchanged ? 'Already up to date in Storyblok.' : '🎉 Published to Storyblok successfully!');
       } else {
         throw new Error(result.error);
       }
@@ -193,7 +263,7 @@ export default function VisualEditor() {
               <Button
                 size="sm"
                 onClick={handlePublish}
-                disabled={saving}
+                disabled={saving || streaming}
                 className="bg-gradient-to-r from-purple-600 to-blue-600 hover:from-purple-700 hover:to-blue-700"
               >
                 {saving ? (
@@ -246,6 +316,7 @@ export default function VisualEditor() {
             <BlogPreview
               blogData={blogData}
               imageUrl={imageUrl}
+              streaming={streaming}
               onSectionEdit={setEditingSection}
               editingSection={editingSection}
               onSectionUpdate={handleSectionUpdate}
@@ -36,6 +36,7 @@ import { Badge } from "@/components/ui/badge";
 import { Progress } from "@/components/ui/progress";
 import { Alert, AlertDescription } from "@/components/ui/alert";
 import { Separator } from "@/components/ui/separator";
+import { trackJob } from '@/lib/jobTracker';
 
 export default function AIBlogStudio() {
   const [formData, setFormData] = useState({
@@ -118,47 +119,21 @@ export default function AIBlogStudio() {
       console.log('🆔 Job ID:', jobId);
       setCurrentJobId(jobId);
 
-      // Step 2: Poll for job status
-      let completed = false;
-      let attempts = 0;
-      const maxAttempts = 120; // 2 minutes max (120 * 1 second)
-
-      while (!completed && attempts < maxAttempts) {
-        await new Promise(resolve => setTimeout(resolve, 1000)); // Wait 1 second
-        attempts++;
-
-        try {
-          const statusResponse = await fetch(`/api/job-status/${jobId}`);
-          const statusData = await statusResponse.json();
-          
+      // Step 2: Follow job progress (server-sent events, polling as fallback)
+      const finalJob = await trackJob(jobId, {
+        onUpdate: (statusData) => {
           console.log('📊 Job status:', statusData);
-
-          if (statusResponse.ok) {
-            setProgress(statusData.progress || 0);
-            setCurrentStep(statusData.step || 'Processing...');
-
-            if (statusData.status === 'completed') {
-              console.log('✅ Job completed successfully');
-              setGeneratedContent(statusData.result);
-              setSuccess('Blog post generated and published successfully!');
-              setActiveTab('preview');
-              setProgress(100);
-              setCurrentStep('Complete! Your blog post is ready.');
-              completed = true;
-            } else if (statusData.status === 'failed') {
-              throw new Error(statusData.error || 'Generation failed');
-            }
-          } else {
-            console.warn('⚠️ Status check failed:', statusData);
-          }
-        } catch (statusError) {
-          console.warn('⚠️ Status polling error:', statusError);
+          setProgress(statusData.progress || 0);
+          setCurrentStep(statusData.step || 'Processing...');
         }
-      }
+      });
 
-      if (!completed) {
-        throw new Error('Generation timed out. Please try again.');
-      }
+      console.log('✅ Job completed successfully');
+      setGeneratedContent(finalJob.result);
+      setSuccess('Blog post generated and published successfully!');
+      setActiveTab('preview');
+      setProgress(100);
+      setCurrentStep('Complete! Your blog post is ready.');
 
     } catch (err) {
       console.error('❌ Generation error:', err);
@@ -170,6 +145,18 @@ export default function AIBlogStudio() {
     }
   };
 
+  const openStreamingDraft = () => {
+    // The editor streams the post in section by section (no image or Storyblok step)
+    const params = new URLSearchParams({
+      title: formData.title,
+      topic: formData.topic,
+      keywords: formData.keywords,
+      wordCount: String(formData.wordCount),
+      tone: formData.tone
+    });
+    window.location.href = `/editor?${params.toString()}`;
+  };
+
   const copyToClipboard = async (text) => {
     try {
       await navigator.clipboard.writeText(text);
@@ -461,6 +448,14 @@ export default function AIBlogStudio() {
                     <p className="text-xs text-muted-foreground mt-3">
                       This will generate content, create a hero image, and publish to Storyblok
                     </p>
+                    <button
+                      type="button"
+                      onClick={openStreamingDraft}
+                      disabled={isGenerating || !formData.title.trim() || !formData.topic.trim()}
+                      className="text-xs text-purple-600 hover:text-purple-700 hover:underline mt-2 disabled:opacity-50 disabled:no-underline"
+                    >
+                      Or stream a text-only draft straight into the AI Visual Editor →
+                    </button>
                   </div>
                 </div>
               </LiquidGlassCard>
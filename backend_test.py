@@ -8,12 +8,23 @@ Tests all backend endpoints comprehensively including:
 - Complete generation flow
 - Storyblok CMS integration
 - Error handling scenarios
+
+Benchmark mode drives concurrent load at the API and reports throughput,
+latency percentiles and error rates per endpoint:
+    python backend_test.py bench --stub --concurrency 8 --requests 40 --output bench.json
+    python backend_test.py bench --stub --baseline bench-baseline.json --threshold 0.2
 """
 
+import argparse
 import requests
 import json
+import subprocess
+import sys
+import threading
 import time
 import os
+import signal
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 # Get the base URL from environment or use local for testing
@@ -483,6 +494,325 @@ class BlogStudioTester:
         
         return test_results
 
+
+BENCH_ENDPOINTS = ['generate-blog', 'generate-complete', 'blog-posts', 'ai-edit']
+
+# Fixed inputs so runs are repeatable
+BENCH_BRIEFS = [
+    {
+        "title": f"Benchmark Post {i}",
+        "topic": f"Load testing the blog generation pipeline, scenario {i}",
+        "keywords": ["benchmark", "latency", f"scenario-{i}"],
+        "wordCount": 800,
+        "tone": ["professional", "casual", "friendly"][i % 3]
+    }
+    for i in range(10)
+]
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = max(1, int(round(pct / 100.0 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class BlogStudioBenchmark(BlogStudioTester):
+    """Concurrent load test over the main endpoints, one endpoint at a time"""
+
+    def __init__(self, base_url=BASE_URL, concurrency=4, rate=0, requests_per_endpoint=20,
+                 endpoints=BENCH_ENDPOINTS, use_cache=False, timeout=120):
+        super().__init__()
+        self.api_base = f"{base_url}/api"
+        self.concurrency = concurrency
+        self.rate = rate
+        self.requests_per_endpoint = requests_per_endpoint
+        self.endpoints = endpoints
+        self.timeout = timeout
+        if not use_cache:
+            # Measure real generations rather than generation-cache hits
+            self.session.headers['Cache-Control'] = 'no-cache'
+        self.local = threading.local()
+        self.pace_lock = threading.Lock()
+        self.next_slot = 0.0
+
+    def thread_session(self):
+        """requests.Session is not thread-safe, so each worker thread gets its own"""
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+            self.local.session.headers.update(self.session.headers)
+        return self.local.session
+
+    def pace(self):
+        """Spaces request starts to at most `rate` per second across all threads"""
+        if not self.rate:
+            return
+        with self.pace_lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + 1.0 / self.rate
+        time.sleep(max(0.0, slot - now))
+
+    def check(self, response, expected=200):
+        if response.status_code != expected:
+            raise RuntimeError(f"HTTP {response.status_code}")
+        return response.json()
+
+    def call_generate_blog(self, i):
+        data = self.check(self.thread_session().post(
+            f"{self.api_base}/generate-blog", json=BENCH_BRIEFS[i % len(BENCH_BRIEFS)], timeout=self.timeout))
+        if not data.get('success'):
+            raise RuntimeError(data.get('error', 'generation failed'))
+
+    def call_generate_complete(self, i):
+        """Starts a job and waits for it to finish; latency covers the whole job"""
+        session = self.thread_session()
+        data = self.check(session.post(
+            f"{self.api_base}/generate-complete", json=BENCH_BRIEFS[i % len(BENCH_BRIEFS)], timeout=30))
+        job_id = data['jobId']
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            job = self.check(session.get(f"{self.api_base}/job-status/{job_id}", timeout=10))
+            if job['status'] == 'completed':
+                return
+            if job['status'] == 'failed':
+                raise RuntimeError(job.get('error', 'job failed'))
+            if job['status'] == 'cancelled':
+                raise RuntimeError(job.get('error', 'job cancelled'))
+            time.sleep(0.2)
+        raise RuntimeError('job did not finish in time')
+
+    def call_blog_posts(self, i):
+        data = self.check(self.thread_session().get(f"{self.api_base}/blog-posts", timeout=self.timeout))
+        if 'stories' not in data:
+            raise RuntimeError(data.get('error', 'no stories in response'))
+
+    def call_ai_edit(self, i):
+        prompt = f"Rewrite this paragraph to be more concise (variant {i % 10}): Benchmarks help catch regressions early."
+        data = self.check(self.thread_session().post(
+            f"{self.api_base}/ai-edit", json={"prompt": prompt}, timeout=self.timeout))
+        if not data.get('success'):
+            raise RuntimeError(data.get('error', 'edit failed'))
+
+    def timed(self, call, i):
+        self.pace()
+        started = time.perf_counter()
+        try:
+            call(i)
+            return time.perf_counter() - started, None
+        except Exception as e:
+            return time.perf_counter() - started, str(e)
+
+    def run_endpoint(self, endpoint):
+        call = getattr(self, 'call_' + endpoint.replace('-', '_'))
+        self.next_slot = 0.0
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            samples = list(pool.map(lambda i: self.timed(call, i), range(self.requests_per_endpoint)))
+        wall = time.perf_counter() - started
+
+        latencies = [latency * 1000 for latency, error in samples if error is None]
+        errors = [error for _, error in samples if error is not None]
+        summary = {
+            'requests': len(samples),
+            'errors': len(errors),
+            'errorRate': round(len(errors) / len(samples), 4) if samples else 0,
+            'throughput': round(len(latencies) / wall, 3) if wall > 0 else 0,
+            'meanMs': round(sum(latencies) / len(latencies), 1) if latencies else None,
+            'p50Ms': percentile(latencies, 50),
+            'p95Ms': percentile(latencies, 95),
+            'p99Ms': percentile(latencies, 99),
+            'maxMs': max(latencies) if latencies else None,
+            'durationS': round(wall, 3),
+            'sampleErrors': sorted(set(errors))[:5]
+        }
+        for key in ('p50Ms', 'p95Ms', 'p99Ms', 'maxMs'):
+            if summary[key] is not None:
+                summary[key] = round(summary[key], 1)
+        return summary
+
+    def run(self):
+        print("🚀 Benchmarking AI Blog Studio API")
+        print(f"📍 Target: {self.api_base} | concurrency {self.concurrency} | "
+              f"{self.requests_per_endpoint} requests per endpoint | rate {self.rate or 'unlimited'}/s")
+        print("=" * 60)
+        report = {
+            'meta': {
+                'timestamp': datetime.now().isoformat(),
+                'apiBase': self.api_base,
+                'concurrency': self.concurrency,
+                'rate': self.rate,
+                'requestsPerEndpoint': self.requests_per_endpoint
+            },
+            'endpoints': {}
+        }
+        for endpoint in self.endpoints:
+            print(f"\n⏱️  {endpoint}...")
+            summary = self.run_endpoint(endpoint)
+            report['endpoints'][endpoint] = summary
+            print(f"   {summary['throughput']} req/s | p50 {summary['p50Ms']}ms | p95 {summary['p95Ms']}ms | "
+                  f"p99 {summary['p99Ms']}ms | errors {summary['errors']}/{summary['requests']}")
+            for error in summary['sampleErrors']:
+                print(f"   ⚠️ {error}")
+        return report
+
+
+def compare_to_baseline(report, baseline, threshold=0.2, error_threshold=0.02):
+    """Regressions against a saved report: slower percentiles or lower throughput
+    by more than `threshold` (a fraction), or an error rate up by more than `error_threshold`"""
+    regressions = []
+    for endpoint, current in report['endpoints'].items():
+        previous = baseline.get('endpoints', {}).get(endpoint)
+        if not previous:
+            continue
+        for key in ('p50Ms', 'p95Ms', 'p99Ms'):
+            if current[key] is not None and previous.get(key) and current[key] > previous[key] * (1 + threshold):
+                regressions.append(f"{endpoint} {key}: {previous[key]} -> {current[key]}")
+        if previous.get('throughput') and current['throughput'] < previous['throughput'] * (1 - threshold):
+            regressions.append(f"{endpoint} throughput: {previous['throughput']} -> {current['throughput']} req/s")
+        if current['errorRate'] > previous.get('errorRate', 0) + error_threshold:
+            regressions.append(f"{endpoint} errorRate: {previous.get('errorRate', 0)} -> {current['errorRate']}")
+    return regressions
+
+
+class LocalStub:
+    """Runs the app against offline stand-ins: the stub Gemini/Imagen backend of the
+    Python worker (GEMINI_BACKEND=stub) and scripts/storyblok-mock.mjs, each with a
+    fixed latency, so benchmark runs are deterministic and need no network"""
+
+    def __init__(self, port=3100, mock_port=4110, latency_ms=50, storyblok_latency_ms=30,
+                 seed_stories=200, server_cmd=None):
+        self.port = port
+        self.mock_port = mock_port
+        self.latency_ms = latency_ms
+        self.storyblok_latency_ms = storyblok_latency_ms
+        self.seed_stories = seed_stories
+        self.server_cmd = server_cmd or f"npx next dev --hostname 127.0.0.1 --port {port}"
+        self.processes = []
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        root = os.path.dirname(os.path.abspath(__file__))
+        self.processes.append(subprocess.Popen(
+            ['node', '--no-warnings', 'scripts/storyblok-mock.mjs', '--port', str(self.mock_port),
+             '--latency', str(self.storyblok_latency_ms), '--seed', str(self.seed_stories)],
+            cwd=root, stdout=subprocess.DEVNULL, start_new_session=True))
+        env = {
+            **os.environ,
+            'GEMINI_BACKEND': 'stub',
+            'GEMINI_STUB_LATENCY_MS': str(self.latency_ms),
+            'GENERATION_CACHE_DISK': 'false',
+            # The stubs have no quotas; keep the scheduler's API rate limits out of the numbers
+            'GEMINI_TEXT_RATE_PER_MIN': '100000',
+            'GEMINI_IMAGE_RATE_PER_MIN': '100000',
+            'STORYBLOK_RATE_PER_MIN': '100000',
+            'STORYBLOK_API_URL': f"http://127.0.0.1:{self.mock_port}/v1",
+            'NEXT_PUBLIC_STORYBLOK_SPACE_ID': os.environ.get('NEXT_PUBLIC_STORYBLOK_SPACE_ID', 'bench'),
+            'STORYBLOK_MANAGEMENT_TOKEN': os.environ.get('STORYBLOK_MANAGEMENT_TOKEN', 'bench-token')
+        }
+        # Own process group, so stopping it also stops what the shell started
+        self.processes.append(subprocess.Popen(self.server_cmd, shell=True, cwd=root, env=env,
+                                               stdout=subprocess.DEVNULL, start_new_session=True))
+        self.wait_until_ready()
+        return self
+
+    def wait_until_ready(self, timeout=180):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if any(process.poll() is not None for process in self.processes):
+                break
+            try:
+                if requests.get(f"{self.base_url}/api/health", timeout=5).status_code == 200:
+                    return
+            except requests.RequestException:
+                pass
+            time.sleep(1)
+        self.__exit__(None, None, None)
+        raise RuntimeError(f"Local stub server did not become ready on {self.base_url}")
+
+    def __exit__(self, *exc):
+        for process in reversed(self.processes):
+            try:
+                os.killpg(process.pid, signal.SIGTERM)
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        self.processes = []
+
+
+def run_benchmark(args):
+    def benchmark(base_url):
+        return BlogStudioBenchmark(
+            base_url=base_url,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            requests_per_endpoint=args.requests,
+            endpoints=args.endpoints.split(','),
+            use_cache=args.use_cache
+        ).run()
+
+    if args.stub:
+        with LocalStub(port=args.stub_port, latency_ms=args.stub_latency,
+                       storyblok_latency_ms=args.storyblok_latency, server_cmd=args.server_cmd) as stub:
+            report = benchmark(stub.base_url)
+        report['meta']['stub'] = {'geminiLatencyMs': args.stub_latency, 'storyblokLatencyMs': args.storyblok_latency}
+    else:
+        report = benchmark(args.base_url)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📝 Results written to {args.output}")
+
+    if args.baseline and os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(report, json.load(f), args.threshold, args.error_threshold)
+        if regressions:
+            print(f"\n❌ REGRESSIONS against {args.baseline} (threshold {args.threshold:.0%}):")
+            for regression in regressions:
+                print(f"  • {regression}")
+            return 1
+        print(f"\n✅ No regressions against {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📌 Baseline saved to {args.baseline}")
+    return 0
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='AI Blog Studio backend tests and benchmarks')
+    commands = parser.add_subparsers(dest='command')
+    bench = commands.add_parser('bench', help='Concurrent load test with latency percentiles')
+    bench.add_argument('--base-url', default=BASE_URL)
+    bench.add_argument('--endpoints', default=','.join(BENCH_ENDPOINTS),
+                       help='Comma-separated subset of: ' + ', '.join(BENCH_ENDPOINTS))
+    bench.add_argument('--concurrency', type=int, default=4)
+    bench.add_argument('--requests', type=int, default=20, help='Requests per endpoint')
+    bench.add_argument('--rate', type=float, default=0, help='Max request starts per second (0 = unlimited)')
+    bench.add_argument('--use-cache', action='store_true', help='Allow generation cache hits')
+    bench.add_argument('--output', help='Write the JSON report here')
+    bench.add_argument('--baseline', help='Compare with this report (or create it when missing)')
+    bench.add_argument('--save-baseline', action='store_true', help='Overwrite the baseline with this run')
+    bench.add_argument('--threshold', type=float, default=0.2, help='Allowed latency/throughput regression (fraction)')
+    bench.add_argument('--error-threshold', type=float, default=0.02, help='Allowed error rate increase')
+    bench.add_argument('--stub', action='store_true', help='Start the app against the offline Gemini/Storyblok stubs')
+    bench.add_argument('--stub-port', type=int, default=3100)
+    bench.add_argument('--stub-latency', type=int, default=50, help='Stub Gemini/Imagen latency (ms)')
+    bench.add_argument('--storyblok-latency', type=int, default=30, help='Storyblok mock latency (ms)')
+    bench.add_argument('--server-cmd', help='Command that starts the app on --stub-port (default: next dev)')
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    if args.command == 'bench':
+        sys.exit(run_benchmark(args))
     tester = BlogStudioTester()
     results = tester.run_all_tests()
\ No newline at end of file
@@ -0,0 +1,317 @@
+import crypto from 'crypto';
+import fs from 'fs';
+import path from 'path';
+import { logger } from './logger';
+
+/**
+ * Content-addressed store for generated assets (hero image variants)
+ *
+ * Files are named after the SHA-256 of their bytes, so identical images are
+ * stored once and concurrent writes can never collide. A small JSON index
+ * keeps per-asset metadata: prompt hash, size, created/last-referenced times,
+ * the Storyblok asset it was uploaded as, and who references it:
+ *   job:<id>    expires with the job record (JOB_TTL_MS)
+ *   story:<id>  held until the story is deleted
+ *
+ * A periodic sweep deletes unreferenced assets once they have not been
+ * referenced for ASSET_STORE_MAX_AGE_MS, and evicts the least recently
+ * referenced unreferenced assets while the store is over ASSET_STORE_MAX_BYTES.
+ * Files written before the store existed (image_<timestamp>.png) are left alone.
+ */
+
+const DEFAULT_OPTIONS = {
+  dir: path.join(process.cwd(), 'public', 'generated'),
+  urlPrefix: '/generated',
+  indexPath: process.env.ASSET_STORE_INDEX || path.join(process.cwd(), '.cache', 'assets', 'index.json'),
+  maxBytes: parseInt(process.env.ASSET_STORE_MAX_BYTES || String(500 * 1024 * 1024), 10),
+  maxAge: parseInt(process.env.ASSET_STORE_MAX_AGE_MS || String(7 * 24 * 60 * 60 * 1000), 10),
+  // Fresh assets are not evicted for size before their first reference can land
+  gracePeriod: 10 * 60 * 1000,
+  sweepInterval: parseInt(process.env.ASSET_STORE_GC_INTERVAL_MS || String(60 * 60 * 1000), 10)
+};
+
+const log = logger.child({ component: 'asset-store' });
+const ASSET_FILE = /^([0-9a-f]{64})\.\w+$/;
+
+export function contentHash(buffer) {
+  return crypto.createHash('sha256').update(buffer).digest('hex');
+}
+
+export async function writeFileAtomic(filePath, data) {
+  const tempPath = `${filePath}.${process.pid}.${crypto.randomBytes(4).toString('hex')}.tmp`;
+  try {
+    await fs.promises.writeFile(tempPath, data);
+    await fs.promises.rename(tempPath, filePath);
+  } catch (error) {
+    await fs.promises.rm(tempPath, { force: true }).catch(() => {});
+    throw error;
+  }
+}
+
+export class AssetStore {
+  constructor(options = {}) {
+    this.options = { ...DEFAULT_OPTIONS, ...options };
+    this.assets = new Map();
+    this.writes = new Map(); // hash -> in-flight put
+    this.loading = null;
+    this.persisting = null;
+    this.dirty = false;
+    this.sweeper = null;
+    this.counters = { stored: 0, deduplicated: 0, uploadsSkipped: 0, sweeps: 0, deleted: 0, freedBytes: 0 };
+  }
+
+  load() {
+    if (!this.loading) {
+      this.loading = fs.promises.readFile(this.options.indexPath, 'utf8')
+        .then(text => {
+          JSON.parse(text).assets.forEach(asset => this.assets.set(asset.hash, asset));
+        })
+        .catch(error => {
+          if (error.code !== 'ENOENT') log.warn('Asset index unreadable, starting empty', { error });
+        });
+    }
+    return this.loading;
+  }
+
+  /**
+   * Writes the index atomically. Calls made while a write is in flight are
+   * coalesced into one follow-up write.
+   */
+  persist() {
+    this.dirty = true;
+    if (!this.persisting) {
+      this.persisting = (async () => {
+        while (this.dirty) {
+          this.dirty = false;
+          try {
+            await fs.promises.mkdir(path.dirname(this.options.indexPath), { recursive: true });
+            await writeFileAtomic(this.options.indexPath, JSON.stringify({ assets: [...this.assets.values()] }));
+          } catch (error) {
+            log.error('Asset index write failed', error);
+          }
+        }
+      })().finally(() => { this.persisting = null; });
+    }
+    return this.persisting;
+  }
+
+  filePath(asset) {
+    return path.join(this.options.dir, `${asset.hash}.${asset.ext}`);
+  }
+
+  url(asset) {
+    return `${this.options.urlPrefix}/${asset.hash}.${asset.ext}`;
+  }
+
+  /**
+   * Whether the asset's file is still on disk (it may have been deleted by hand)
+   */
+  async hasFile(asset) {
+    try {
+      await fs.promises.access(this.filePath(asset));
+      return true;
+    } catch {
+      return false;
+    }
+  }
+
+  /**
+   * Stores `buffer` (once per distinct content) and returns its index record
+   */
+  async put(buffer, { ext = 'png', mimeType = 'image/png', promptHash = null } = {}) {
+    await this.load();
+    const hash = contentHash(buffer);
+    const existing = this.assets.get(hash);
+
+    // writes is checked again after the file check, so two puts never write the same file
+    const stored = existing && !this.writes.has(hash) && await this.hasFile(existing);
+    if (stored || this.writes.has(hash)) {
+      const asset = stored ? existing : await this.writes.get(hash);
+      asset.lastReferencedAt = Date.now();
+      this.counters.deduplicated++;
+      this.persist();
+      return asset;
+    }
+
+    const write = this.write(hash, buffer, { ext, mimeType, promptHash }, existing);
+    this.writes.set(hash, write);
+    try {
+      return await write;
+    } finally {
+      this.writes.delete(hash);
+    }
+  }
+
+  async write(hash, buffer, { ext, mimeType, promptHash }, existing) {
+    const now = Date.now();
+    const asset = {
+      hash,
+      ext,
+      mimeType,
+      size: buffer.length,
+      promptHash,
+      createdAt: now,
+      lastReferencedAt: now,
+      storyblokAssetId: existing?.storyblokAssetId ?? null,
+      storyblokUrl: existing?.storyblokUrl ?? null,
+      refs: existing?.refs || {}
+    };
+    await fs.promises.mkdir(this.options.dir, { recursive: true });
+    await writeFileAtomic(this.filePath(asset), buffer);
+    this.assets.set(hash, asset);
+    this.counters.stored++;
+    this.persist();
+    return asset;
+  }
+
+  async get(hash) {
+    await this.load();
+    return this.assets.get(hash) || null;
+  }
+
+  /**
+   * Looks an asset up by its public URL (/generated/<hash>.<ext>)
+   */
+  async findByUrl(url = '') {
+    const match = path.basename(url).match(ASSET_FILE);
+    return match ? this.get(match[1]) : null;
+  }
+
+  /**
+   * Records that `owner` uses the asset. With `ttl` the reference lapses on
+   * its own (job records expire); without it, it lasts until released.
+   */
+  async ref(hash, owner, { ttl } = {}) {
+    const asset = await this.get(hash);
+    if (!asset) return null;
+    asset.refs[owner] = ttl ? Date.now() + ttl : null;
+    asset.lastReferencedAt = Date.now();
+    this.persist();
+    return asset;
+  }
+
+  /**
+   * Drops every reference held by `owner` (e.g. a deleted story)
+   */
+  async release(owner) {
+    await this.load();
+    let released = 0;
+    this.assets.forEach(asset => {
+      if (owner in asset.refs) {
+        delete asset.refs[owner];
+        asset.lastReferencedAt = Date.now();
+        released++;
+      }
+    });
+    if (released > 0) this.persist();
+    return released;
+  }
+
+  /**
+   * Remembers the Storyblok asset an upload produced, so the same content is
+   * never uploaded twice
+   */
+  async recordUpload(hash, { id, url }) {
+    const asset = await this.get(hash);
+    if (!asset) return;
+    asset.storyblokAssetId = id ?? null;
+    asset.storyblokUrl = url;
+    this.persist();
+  }
+
+  noteSkippedUpload() {
+    this.counters.uploadsSkipped++;
+  }
+
+  isReferenced(asset, now = Date.now()) {
+    return Object.entries(asset.refs).some(([owner, expiresAt]) => {
+      if (expiresAt === null || expiresAt > now) return true;
+      delete asset.refs[owner];
+      return false;
+    });
+  }
+
+  async deleteAsset(asset) {
+    this.assets.delete(asset.hash);
+    await fs.promises.rm(this.filePath(asset), { force: true });
+    this.counters.deleted++;
+    this.counters.freedBytes += asset.size;
+  }
+
+  /**
+   * Deletes expired unreferenced assets, then evicts unreferenced ones (least
+   * recently referenced first) until the store fits in maxBytes
+   */
+  async sweep() {
+    await this.load();
+    const now = Date.now();
+    const { maxAge, maxBytes, gracePeriod } = this.options;
+    const deletedBefore = this.counters.deleted;
+
+    const unreferenced = [];
+    let totalBytes = 0;
+    for (const asset of [...this.assets.values()]) {
+      if (this.isReferenced(asset, now)) {
+        totalBytes += asset.size;
+      } else if (now - asset.lastReferencedAt > maxAge) {
+        await this.deleteAsset(asset);
+      } else {
+        totalBytes += asset.size;
+        unreferenced.push(asset);
+      }
+    }
+
+    unreferenced.sort((a, b) => a.lastReferencedAt - b.lastReferencedAt);
+    for (const asset of unreferenced) {
+      if (totalBytes <= maxBytes) break;
+      if (now - asset.lastReferencedAt < gracePeriod) continue;
+      await this.deleteAsset(asset);
+      totalBytes -= asset.size;
+    }
+
+    this.counters.sweeps++;
+    const deleted = this.counters.deleted - deletedBefore;
+    this.persist();
+    if (deleted > 0) {
+      log.info('Asset store sweep removed assets', { deleted, remainingBytes: totalBytes });
+    }
+    if (totalBytes > maxBytes) {
+      log.warn('Asset store is over its limit with referenced assets only', { bytes: totalBytes, maxBytes });
+    }
+    return { deleted, bytes: totalBytes };
+  }
+
+  startSweeper() {
+    if (this.sweeper || !this.options.sweepInterval) return;
+    this.sweeper = setInterval(() => {
+      this.sweep().catch(error => log.error('Asset store sweep failed', error));
+    }, this.options.sweepInterval);
+    this.sweeper.unref?.();
+  }
+
+  stopSweeper() {
+    clearInterval(this.sweeper);
+    this.sweeper = null;
+  }
+
+  stats() {
+    let bytes = 0;
+    let referenced = 0;
+    this.assets.forEach(asset => {
+      bytes += asset.size;
+      if (this.isReferenced(asset)) referenced++;
+    });
+    return { ...this.counters, assets: this.assets.size, referenced, bytes, maxBytes: this.options.maxBytes };
+  }
+}
+
+/**
+ * Returns the process-wide asset store (with its GC sweeper running)
+ */
+export function getAssetStore() {
+  if (!globalThis.__assetStore) {
+    globalThis.__assetStore = new AssetStore();
+    globalThis.__assetStore.startSweeper();
+  }
+  return globalThis.__assetStore;
+}
@@ -0,0 +1,178 @@
+/**
+ * Input parsing for POST /api/generate-batch
+ *
+ * Briefs can arrive as a JSON array (or { briefs, priority }), as CSV or
+ * JSONL in the request body, or as an uploaded .csv/.jsonl/.json file in a
+ * multipart form. Every format is turned into plain brief objects that are
+ * then validated one by one with validateBlogInput.
+ */
+
+export const MAX_BATCH_SIZE = parseInt(process.env.BATCH_MAX_BRIEFS || '200', 10);
+
+const CSV_COLUMNS = {
+  title: 'title',
+  topic: 'topic',
+  keywords: 'keywords',
+  wordcount: 'wordCount',
+  word_count: 'wordCount',
+  tone: 'tone'
+};
+
+export class BatchInputError extends Error {
+  constructor(message) {
+    super(message);
+    this.name = 'BatchInputError';
+  }
+}
+
+/**
+ * Parses RFC 4180 CSV (quoted fields, doubled quotes, CRLF) into row arrays
+ */
+export function parseCsvRows(text) {
+  const rows = [];
+  let row = [];
+  let field = '';
+  let quoted = false;
+
+  for (let i = 0; i < text.length; i++) {
+    const char = text[i];
+    if (quoted) {
+      if (char === '"' && text[i + 1] === '"') {
+        field += '"';
+        i++;
+      } else if (char === '"') {
+        quoted = false;
+      } else {
+        field += char;
+      }
+    } else if (char === '"') {
+      quoted = true;
+    } else if (char === ',') {
+      row.push(field);
+      field = '';
+    } else if (char === '\n' || char === '\r') {
+      if (char === '\r' && text[i + 1] === '\n') i++;
+      row.push(field);
+      rows.push(row);
+      row = [];
+      field = '';
+    } else {
+      field += char;
+    }
+  }
+  if (field !== '' || row.length > 0) {
+    row.push(field);
+    rows.push(row);
+  }
+  return rows.filter(cells => cells.some(cell => cell.trim() !== ''));
+}
+
+/**
+ * CSV with a header row (title, topic, keywords, wordCount, tone) -> briefs.
+ * Keywords may be separated by commas (inside quotes) or semicolons.
+ */
+export function parseCsvBriefs(text) {
+  const [header, ...rows] = parseCsvRows(text.replace(/^\uFEFF/, ''));
+  if (!header) return [];
+
+  const columns = header.map(name => CSV_COLUMNS[name.trim().toLowerCase()]);
+  if (!columns.includes('title') || !columns.includes('topic')) {
+    throw new BatchInputError('CSV header must include title and topic columns');
+  }
+
+  return rows.map(cells => {
+    const brief = {};
+    columns.forEach((column, i) => {
+      if (column && cells[i] !== undefined && cells[i].trim() !== '') {
+        brief[column] = column === 'keywords' ? cells[i].replace(/;/g, ',') : cells[i].trim();
+      }
+    });
+    return brief;
+  });
+}
+
+export function parseJsonLinesBriefs(text) {
+  return text.split(/\r?\n/).filter(line => line.trim()).map((line, i) => {
+    try {
+      return JSON.parse(line);
+    } catch {
+      throw new BatchInputError(`Line ${i + 1} is not valid JSON`);
+    }
+  });
+}
+
+function parseJsonBriefs(text) {
+  let body;
+  try {
+    body = JSON.parse(text);
+  } catch {
+    throw new BatchInputError('Request body is not valid JSON');
+  }
+  if (Array.isArray(body)) return { briefs: body };
+  if (body && Array.isArray(body.briefs)) return { briefs: body.briefs, priority: body.priority };
+  throw new BatchInputError('Expected an array of briefs or { "briefs": [...] }');
+}
+
+function parseByFormat(format, text) {
+  switch (format) {
+    case 'csv':
+      return { briefs: parseCsvBriefs(text) };
+    case 'jsonl':
+      return { briefs: parseJsonLinesBriefs(text) };
+    default:
+      return parseJsonBriefs(text);
+  }
+}
+
+function formatFromContentType(contentType = '') {
+  if (contentType.includes('csv')) return 'csv';
+  if (contentType.includes('ndjson') || contentType.includes('jsonl') || contentType.includes('json-seq')) return 'jsonl';
+  return 'json';
+}
+
+function formatFromFilename(name = '') {
+  if (/\.csv$/i.test(name)) return 'csv';
+  if (/\.(jsonl|ndjson)$/i.test(name)) return 'jsonl';
+  return 'json';
+}
+
+/**
+ * Reads the briefs (and optional priority) from a batch request
+ */
+export async function readBatchRequest(request) {
+  const contentType = request.headers.get('content-type') || '';
+  let parsed;
+
+  if (contentType.includes('multipart/form-data')) {
+    const form = await request.formData();
+    const file = form.get('file');
+    if (!file || typeof file === 'string') {
+      throw new BatchInputError('Upload the briefs as a "file" field (.csv, .jsonl or .json)');
+    }
+    parsed = parseByFormat(formatFromFilename(file.name), await file.text());
+    parsed.priority = parsed.priority ?? form.get('priority') ?? undefined;
+  } else {
+    parsed = parseByFormat(formatFromContentType(contentType), await request.text());
+  }
+
+  if (parsed.briefs.length === 0) {
+    throw new BatchInputError('No briefs found in the request');
+  }
+  if (parsed.briefs.length > MAX_BATCH_SIZE) {
+    throw new BatchInputError(`A batch can contain at most ${MAX_BATCH_SIZE} briefs`);
+  }
+  return parsed;
+}
+
+/**
+ * Identity of a validated brief, used to run identical briefs only once
+ */
+export function briefKey({ title, topic, keywords = [], wordCount, tone }) {
+  return JSON.stringify([
+    title.trim().toLowerCase(),
+    topic.trim().toLowerCase(),
+    [...keywords].map(k => k.toLowerCase()).sort(),
+    wordCount,
+    tone
+  ]);
+}
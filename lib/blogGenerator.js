@@ -1,7 +1,9 @@
 import { exec } from 'child_process';
 import { promisify } from 'util';
+import { logger } from './logger';
 
 const execPromise = promisify(exec);
+const log = logger.child({ component: 'blog-generator' });
 
 /**
  * Generates a structured blog post using GPT-5
@@ -156,14 +158,14 @@ asyncio.run(generate_blog())
     // Use configurable Python path or fallback to system python3
     const pythonPath = process.env.PYTHON_PATH || 'python3';
     
-    console.log('Generating blog post with GPT-5...');
+    log.debug('Generating blog post with GPT-5');
     const { stdout, stderr } = await execPromise(`${pythonPath} ${scriptPath}`, { env, cwd: process.cwd() });
     
     // Clean up the temporary script
     fs.unlinkSync(scriptPath);
     
     if (stderr && !stderr.includes('WARNING')) {
-      console.error('Blog generation error:', stderr);
+      log.error('Blog generation error', undefined, { stderr });
       throw new Error(`Blog generation failed: ${stderr}`);
     }
     
@@ -171,15 +173,15 @@ asyncio.run(generate_blog())
     const blogContent = JSON.parse(stdout);
     
     if (blogContent.error) {
-      console.log('Blog generation completed with fallback content');
+      log.warn('Blog generation completed with fallback content', { reason: blogContent.error });
     } else {
-      console.log('Blog post generated successfully');
+      log.info('Blog post generated');
     }
     
     return blogContent;
     
   } catch (error) {
-    console.error('Blog generation error:', error);
+    log.error('Blog generation error', error);
     
     // Return fallback content
     return {
@@ -284,7 +286,7 @@ asyncio.run(generate_image())
     // Use configurable Python path or fallback to system python3
     const pythonPath = process.env.PYTHON_PATH || 'python3';
     
-    console.log('Generating hero image...');
+    log.debug('Generating hero image');
     const { stdout, stderr } = await execPromise(`${pythonPath} ${scriptPath}`, { env, cwd: process.cwd() });
     
     // Clean up the temporary script
@@ -303,23 +305,23 @@ asyncio.run(generate_image())
         
         // Validate file size (should be reasonable for an image, max 10MB)
         if (fileSizeInMB > 10) {
-          console.error(`Image file too large: ${fileSizeInMB.toFixed(2)}MB`);
+          log.error('Image file too large', undefined, { bytes: stats.size });
           return { success: false, error: 'Generated image file is too large' };
         }
         
-        console.log('Hero image generated successfully');
+        log.info('Hero image generated', { imageUrl });
         return { success: true, imageUrl };
       } else {
-        console.error('Image file was not created at expected location');
+        log.error('Image file was not created at expected location', undefined, { path: fullPath });
         return { success: false, error: 'Image file not found after generation' };
       }
     } else {
-      console.error('Image generation failed:', stderr || stdout);
+      log.error('Image generation failed', undefined, { output: stderr || stdout });
       return { success: false, error: stderr || stdout || 'Unknown error' };
     }
     
   } catch (error) {
-    console.error('Image generation error:', error);
+    log.error('Image generation error', error);
     return { success: false, error: error.message };
   }
 }
\ No newline at end of file
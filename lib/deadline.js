@@ -0,0 +1,209 @@
+import { AsyncLocalStorage } from 'async_hooks';
+import { getMetrics } from './metrics';
+
+/**
+ * Deadlines, cancellation and hedged calls for upstream work
+ *
+ * A Deadline is an AbortSignal that fires when its time is up or when it is
+ * cancelled (DELETE /api/job-status/{id}, a client that disconnects).
+ * runWithDeadline(deadline, fn) makes it the current deadline for everything
+ * fn does asynchronously, like runWithTrace does for trace IDs. The worker
+ * pool, the scheduler's stages and the Storyblok client pick it up on their
+ * own: calls waiting for a slot or already running are aborted with it.
+ *
+ * hedged() starts a second attempt of a slow call once the first has taken
+ * longer than GEMINI_HEDGE_AFTER (a number of milliseconds, or "p95" for the
+ * 95th percentile of recent calls of the same operation). The first attempt
+ * to succeed wins and the other is cancelled.
+ */
+
+const HEDGE_AFTER = process.env.GEMINI_HEDGE_AFTER || 'off';
+const LATENCY_SAMPLES = 200;
+// Below this many samples a percentile says little, so p95 hedging waits
+const MIN_HEDGE_SAMPLES = 20;
+
+const hedgesTotal = getMetrics().counter('blogstudio_hedged_calls_total', 'Calls that started a second attempt, by which attempt won', ['operation', 'outcome']);
+
+export class DeadlineExceededError extends Error {
+  constructor(ms) {
+    super(`Deadline of ${ms}ms exceeded`);
+    this.name = 'DeadlineExceededError';
+  }
+}
+
+export class CancelledError extends Error {
+  constructor(message = 'Cancelled') {
+    super(message);
+    this.name = 'CancelledError';
+  }
+}
+
+/**
+ * True for the reasons a Deadline aborts with, which callers should pass on
+ * instead of answering with fallback content
+ */
+export function isAbortError(error) {
+  return error instanceof DeadlineExceededError || error instanceof CancelledError;
+}
+
+export class Deadline {
+  /**
+   * `ms` from now, or never when ms is 0. Aborting `parent` cancels it too.
+   */
+  constructor(ms, parent = null) {
+    this.ms = ms;
+    this.expiresAt = ms > 0 ? Date.now() + ms : Infinity;
+    this.controller = new AbortController();
+    if (ms > 0) {
+      this.timer = setTimeout(() => this.controller.abort(new DeadlineExceededError(ms)), ms);
+      this.timer.unref?.();
+    }
+    if (parent) {
+      this.onParentAbort = () => this.cancel(new CancelledError('Request aborted'));
+      if (parent.aborted) this.onParentAbort();
+      else parent.addEventListener('abort', this.onParentAbort, { once: true });
+      this.parent = parent;
+    }
+  }
+
+  get signal() {
+    return this.controller.signal;
+  }
+
+  /**
+   * Milliseconds left before it expires (Infinity without a time limit)
+   */
+  remaining() {
+    return Math.max(0, this.expiresAt - Date.now());
+  }
+
+  cancel(reason = new CancelledError()) {
+    this.dispose();
+    this.controller.abort(reason);
+  }
+
+  /**
+   * Stops the timer once the work it bounds is over
+   */
+  dispose() {
+    clearTimeout(this.timer);
+    this.parent?.removeEventListener('abort', this.onParentAbort);
+  }
+}
+
+// Stored on globalThis like the trace storage, so dev reloads keep one context
+const deadlineStorage = globalThis.__deadlineStorage || (globalThis.__deadlineStorage = new AsyncLocalStorage());
+
+export function runWithDeadline(deadline, fn) {
+  return deadlineStorage.run(deadline, fn);
+}
+
+/**
+ * The current deadline, or null outside one
+ */
+export function currentDeadline() {
+  return deadlineStorage.getStore() || null;
+}
+
+/**
+ * `signal` combined with the current deadline's signal
+ */
+export function withDeadlineSignal(signal) {
+  const deadline = currentDeadline();
+  if (!deadline) return signal;
+  return signal ? AbortSignal.any([signal, deadline.signal]) : deadline.signal;
+}
+
+/**
+ * Resolves after `ms`, or rejects with the reason of `signal` as soon as it aborts
+ */
+export function sleep(ms, signal) {
+  if (signal?.aborted) return Promise.reject(signal.reason);
+  return new Promise((resolve, reject) => {
+    const onAbort = () => {
+      clearTimeout(timer);
+      reject(signal.reason);
+    };
+    const timer = setTimeout(() => {
+      signal?.removeEventListener('abort', onAbort);
+      resolve();
+    }, ms);
+    signal?.addEventListener('abort', onAbort, { once: true });
+  });
+}
+
+function percentile(sorted, p) {
+  if (sorted.length === 0) return 0;
+  return sorted[Math.min(sorted.length - 1, Math.floor((p / 100) * sorted.length))];
+}
+
+// Recent successful durations per operation, for p95 hedging
+const latencies = new Map();
+
+function recordLatency(operation, ms) {
+  let samples = latencies.get(operation);
+  if (!samples) {
+    samples = [];
+    latencies.set(operation, samples);
+  }
+  samples.push(ms);
+  if (samples.length > LATENCY_SAMPLES) samples.shift();
+}
+
+/**
+ * Milliseconds after which `operation` gets a second attempt, or 0 for none
+ */
+export function hedgeDelay(operation, setting = HEDGE_AFTER) {
+  if (setting === 'p95') {
+    const samples = latencies.get(operation) || [];
+    return samples.length < MIN_HEDGE_SAMPLES ? 0 : percentile([...samples].sort((a, b) => a - b), 95);
+  }
+  return parseInt(setting, 10) || 0;
+}
+
+/**
+ * Runs `attempt(signal)` and, if it is still running after the hedge delay,
+ * a second one. Resolves with the first success and aborts the other
+ * attempt; rejects once every attempt started has failed.
+ */
+export function hedged(operation, attempt, { delay = hedgeDelay(operation) } = {}) {
+  return new Promise((resolve, reject) => {
+    const controllers = [];
+    let pending = 0;
+    let settled = false;
+    let firstError = null;
+    let timer = null;
+
+    const launch = () => {
+      const controller = new AbortController();
+      const index = controllers.push(controller) - 1;
+      const started = performance.now();
+      pending++;
+      Promise.resolve().then(() => attempt(controller.signal)).then(value => {
+        if (settled) return;
+        settled = true;
+        clearTimeout(timer);
+        recordLatency(operation, performance.now() - started);
+        if (controllers.length > 1) hedgesTotal.inc({ operation, outcome: index === 0 ? 'first' : 'second' });
+        controllers.forEach(other => other !== controller && other.abort(new CancelledError('Another attempt finished first')));
+        resolve(value);
+      }, error => {
+        if (settled) return;
+        firstError = firstError || error;
+        if (--pending > 0) return;
+        settled = true;
+        clearTimeout(timer);
+        if (controllers.length > 1) hedgesTotal.inc({ operation, outcome: 'failed' });
+        reject(firstError);
+      });
+    };
+
+    launch();
+    if (delay > 0) {
+      timer = setTimeout(() => {
+        if (!settled && !currentDeadline()?.signal.aborted) launch();
+      }, delay);
+      timer.unref?.();
+    }
+  });
+}
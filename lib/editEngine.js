@@ -0,0 +1,269 @@
+import { getWorkerPool } from './pythonWorkerPool';
+import { getGenerationCache, cacheKey } from './generationCache';
+import { IncrementalBlogParser } from './incrementalJson';
+import { getScheduler } from './scheduler';
+import { TEXT_MODEL } from './geminiGenerator';
+import { getMetrics } from './metrics';
+import { logger } from './logger';
+
+/**
+ * Section-scoped AI edits for the visual editor
+ *
+ * - An edit sends the model its target section plus a compact summary of the
+ *   post (title, meta description, section headings), never the whole post.
+ * - Edits of one document are merged into one model call that answers with
+ *   a JSON object keyed by edit ID. A batch is queued for the text stage
+ *   EDIT_BATCH_WINDOW_MS after its first edit, and keeps taking edits until
+ *   it gets a slot (or holds EDIT_BATCH_MAX), so edits waiting behind a busy
+ *   stage go out together. Only edits sent with the same summary of the post
+ *   share a call, so each result is cached under the context it was
+ *   actually written with. The output is streamed, and each edit resolves
+ *   as soon as its value has been parsed.
+ * - A newer edit of the same section supersedes the older one. A batch whose
+ *   edits have all been superseded or cancelled is aborted in the worker,
+ *   which closes the upstream stream.
+ * - Finished edits are cached like other generations (same section text,
+ *   instruction and context give the same result).
+ */
+
+const DEFAULT_OPTIONS = {
+  batchWindow: parseInt(process.env.EDIT_BATCH_WINDOW_MS || '40', 10),
+  maxBatch: parseInt(process.env.EDIT_BATCH_MAX || '6', 10),
+  contextChars: parseInt(process.env.EDIT_CONTEXT_MAX_CHARS || '600', 10),
+  timeout: 30000
+};
+
+const INSTRUCTIONS = {
+  regenerate: 'Rewrite this to make it better while keeping the same meaning.',
+  shorter: 'Make this more concise (about 50% shorter) while keeping the key points.',
+  longer: 'Expand this with more details, examples and explanations.',
+  casual: 'Rewrite this in a casual, friendly tone.',
+  professional: 'Rewrite this in a professional, formal tone.',
+  seo: 'Optimize this for SEO with relevant keywords, without keyword stuffing.'
+};
+
+const log = logger.child({ component: 'edit-engine' });
+
+const metrics = getMetrics();
+const editsTotal = metrics.counter('blogstudio_section_edits_total', 'Section edits by outcome', ['outcome']);
+const batchSize = metrics.histogram('blogstudio_section_edit_batch_size', 'Section edits merged into one model call', [], [1, 2, 3, 4, 6, 8, 10]);
+const promptChars = metrics.histogram('blogstudio_section_edit_prompt_chars', 'Section text, instructions and context sent per model call', [], [250, 500, 1000, 2000, 4000, 8000, 16000]);
+
+export class EditCancelledError extends Error {
+  constructor(reason) {
+    super(reason === 'superseded' ? 'Superseded by a newer edit of the same section' : 'Edit cancelled');
+    this.name = 'EditCancelledError';
+    this.reason = reason;
+  }
+}
+
+/**
+ * The text a section ID ('title', 'intro', 'conclusion' or an index) refers to
+ */
+export function sectionText(post, sectionId) {
+  if (sectionId === 'title') return { label: 'Title', content: post.title };
+  if (sectionId === 'intro') return { label: 'Introduction', content: post.introduction };
+  if (sectionId === 'conclusion') return { label: 'Conclusion', content: post.conclusion };
+  const section = post.sections[sectionId];
+  return { label: `Section ${sectionId + 1}: ${section.heading}`, content: section.content };
+}
+
+/**
+ * Compact description of the whole post that goes along with every edit
+ */
+export function summarizePost(post, maxChars = DEFAULT_OPTIONS.contextChars) {
+  const summary = post.metaDescription || (post.introduction.match(/^.*?[.!?](\s|$)/)?.[0] || '').trim();
+  const lines = [`Title: ${post.title}`];
+  if (summary) lines.push(`Summary: ${summary}`);
+  if (post.sections.length > 0) lines.push(`Sections: ${post.sections.map(section => section.heading).join(' | ')}`);
+  const text = lines.join('\n');
+  return text.length > maxChars ? `${text.slice(0, maxChars - 3)}...` : text;
+}
+
+export class EditEngine {
+  constructor(options = {}) {
+    this.options = { ...DEFAULT_OPTIONS, ...options };
+    this.collecting = new Map(); // documentId + context -> batch not yet started, still accepting edits
+    this.latest = new Map();     // documentId:sectionId -> newest unsettled edit
+    this.nextId = 1;
+  }
+
+  /**
+   * Edits one section of `post` and resolves with the revised text. Rejects
+   * with EditCancelledError when a newer edit of the same section arrives
+   * first or `signal` is aborted.
+   */
+  edit(documentId, post, { sectionId, action, instruction = '' }, { signal, bypassCache = false, priority = 0 } = {}) {
+    const { label, content } = sectionText(post, sectionId);
+    const context = summarizePost(post, this.options.contextChars);
+    const text = [INSTRUCTIONS[action], instruction].filter(Boolean).join(' ') +
+      (sectionId === 'title' ? ' Return a single headline.' : '');
+
+    const edit = {
+      id: `e${this.nextId++}`,
+      slot: `${documentId}:${sectionId}`,
+      label,
+      content,
+      instruction: text,
+      context,
+      key: cacheKey('section-edit', TEXT_MODEL, { label, content, instruction: text, context }),
+      priority,
+      settled: false,
+      batch: null
+    };
+    const result = new Promise((resolve, reject) => {
+      edit.resolve = resolve;
+      edit.reject = reject;
+    });
+
+    const previous = this.latest.get(edit.slot);
+    if (previous) this.cancel(previous, 'superseded');
+    this.latest.set(edit.slot, edit);
+
+    if (signal?.aborted) {
+      this.cancel(edit, 'cancelled');
+      return result;
+    }
+    signal?.addEventListener('abort', () => this.cancel(edit, 'cancelled'), { once: true });
+
+    this.lookup(documentId, edit, bypassCache).catch(error => this.fail(edit, error));
+    return result;
+  }
+
+  async lookup(documentId, edit, bypassCache) {
+    const cached = bypassCache ? null : await getGenerationCache().get(edit.key);
+    if (edit.settled) return;
+    if (cached) {
+      this.settle(edit, cached.content, 'cached');
+    } else {
+      this.enqueue(documentId, edit);
+    }
+  }
+
+  enqueue(documentId, edit) {
+    const batchKey = `${documentId}\n${edit.context}`;
+    let batch = this.collecting.get(batchKey);
+    if (!batch) {
+      batch = { batchKey, context: edit.context, edits: [], controller: new AbortController(), dispatched: false, started: false };
+      batch.timer = setTimeout(() => this.dispatch(batch), this.options.batchWindow);
+      this.collecting.set(batchKey, batch);
+    }
+    edit.batch = batch;
+    batch.edits.push(edit);
+    if (batch.edits.length >= this.options.maxBatch) {
+      this.close(batch);
+      this.dispatch(batch);
+    }
+  }
+
+  // Later edits of the same document and context start a new batch
+  close(batch) {
+    if (this.collecting.get(batch.batchKey) === batch) this.collecting.delete(batch.batchKey);
+  }
+
+  // Queues the batch for a text-stage slot; it still takes edits until it gets one
+  dispatch(batch) {
+    if (batch.dispatched) return;
+    clearTimeout(batch.timer);
+    batch.dispatched = true;
+    if (batch.edits.length === 0) {
+      this.close(batch);
+      return;
+    }
+    this.run(batch);
+  }
+
+  async run(batch) {
+    const { signal } = batch.controller;
+    const { context } = batch;
+    let edits = [];
+    const byId = new Map();
+    const parser = new IncrementalBlogParser();
+    const receive = (id, content) => {
+      const edit = byId.get(id);
+      if (!edit || edit.settled || typeof content !== 'string') return;
+      getGenerationCache().set(edit.key, { content: content.trim() });
+      this.settle(edit, content.trim(), 'completed');
+    };
+
+    try {
+      const result = await getScheduler().stage('text').run(() => {
+        // Everything may have been cancelled while waiting for a slot
+        if (signal.aborted) throw signal.reason;
+        this.close(batch);
+        batch.started = true;
+        edits = batch.edits.filter(edit => !edit.settled);
+        edits.forEach(edit => byId.set(edit.id, edit));
+        batchSize.observe({}, edits.length);
+        promptChars.observe({}, edits.reduce((total, edit) => total + edit.content.length + edit.instruction.length, context.length));
+        return getWorkerPool().run('edit_batch', {
+          context,
+          edits: edits.map(({ id, label, instruction, content }) => ({ id, label, instruction, content }))
+        }, {
+          timeout: this.options.timeout,
+          signal,
+          onEvent: message => {
+            if (message.event !== 'chunk') return;
+            parser.push(message.text).forEach(event => event.type === 'field' && receive(event.field, event.value));
+          }
+        });
+      }, { priority: Math.max(...batch.edits.map(edit => edit.priority)), signal });
+
+      Object.entries(result.edits).forEach(([id, content]) => receive(id, content));
+      edits.forEach(edit => this.fail(edit, new Error('The model returned no text for this section')));
+    } catch (error) {
+      if (!signal.aborted) log.warn('Section edit batch failed', { edits: edits.length, error });
+      edits.forEach(edit => this.fail(edit, error));
+    }
+  }
+
+  settle(edit, content, outcome) {
+    if (!this.finish(edit, outcome)) return;
+    edit.resolve(content);
+  }
+
+  fail(edit, error) {
+    if (!this.finish(edit, 'failed')) return;
+    edit.reject(error);
+  }
+
+  /**
+   * Cancels an edit; aborts its model call once no edit in the batch is
+   * still waiting for it
+   */
+  cancel(edit, reason) {
+    if (!this.finish(edit, reason)) return;
+    edit.reject(new EditCancelledError(reason));
+
+    const batch = edit.batch;
+    if (!batch) return;
+    if (!batch.started) {
+      batch.edits = batch.edits.filter(other => other !== edit);
+      // Nothing left to send: give up the place in the text stage's line
+      if (batch.dispatched && batch.edits.length === 0) {
+        this.close(batch);
+        batch.controller.abort(new EditCancelledError(reason));
+      }
+    } else if (batch.edits.every(other => other.settled)) {
+      batch.controller.abort(new EditCancelledError(reason));
+    }
+  }
+
+  finish(edit, outcome) {
+    if (edit.settled) return false;
+    edit.settled = true;
+    if (this.latest.get(edit.slot) === edit) this.latest.delete(edit.slot);
+    editsTotal.inc({ outcome });
+    return true;
+  }
+}
+
+/**
+ * Returns the process-wide edit engine
+ */
+export function getEditEngine() {
+  if (!globalThis.__editEngine) {
+    globalThis.__editEngine = new EditEngine();
+  }
+  return globalThis.__editEngine;
+}
@@ -1,7 +1,18 @@
-import { exec } from 'child_process';
-import { promisify } from 'util';
+import { getWorkerPool } from './pythonWorkerPool';
+import { getGenerationCache, cacheKey } from './generationCache';
+import { IncrementalBlogParser } from './incrementalJson';
+import { getScheduler } from './scheduler';
+import { createImageVariants, primaryVariant } from './imageVariants';
+import { getAssetStore } from './assetStore';
+import { generateLongFormPost, shouldUseLongForm } from './longForm';
+import { span } from './metrics';
+import { hedged, isAbortError } from './deadline';
+import { logger } from './logger';
 
-const execPromise = promisify(exec);
+export const TEXT_MODEL = process.env.GEMINI_TEXT_MODEL || 'gemini-2.0-flash-exp';
+export const IMAGE_MODEL = process.env.GEMINI_IMAGE_MODEL || 'imagen-3.0-generate-001';
+
+const log = logger.child({ component: 'gemini' });
 
 /**
  * Generates a structured blog post using Google Gemini AI
@@ -12,282 +23,248 @@ export async function generateBlogPost({
   keywords = [],
   wordCount = 800,
   tone = 'professional'
-}) {
+}, { bypassCache = false, priority = 0 } = {}) {
   try {
-    const timestamp = Date.now();
-    const scriptPath = `/tmp/blog_gen_gemini_${timestamp}.py`;
-    
-    // Escape quotes in strings for Python
-    const escapeForPython = (str) => str.replace(/"/g, '\\"').replace(/\n/g, '\\n');
-    
-    // Build the Python script for Gemini
-    const pythonScript = `
-import json
-import os
-import sys
-
-try:
-    import google.generativeai as genai
-    
-    # Get API key from environment
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        raise ValueError("No GEMINI_API_KEY found in environment variables")
+    const params = { title, topic, keywords, wordCount, tone };
+    const { value: blogContent, cached } = await getGenerationCache().getOrCompute(
+      cacheKey('blog', TEXT_MODEL, params),
+      async () => {
+        if (shouldUseLongForm(wordCount)) {
+          log.debug('Generating long-form blog post from an outline', { model: TEXT_MODEL, wordCount });
+          try {
+            return await generateLongFormPost(params, { priority });
+          } catch (error) {
+            if (isAbortError(error)) throw error;
+            log.warn('Long-form generation failed, falling back to a single call', { error });
+          }
+        }
+        log.debug('Generating blog post with Google Gemini AI', { model: TEXT_MODEL });
+        return hedged('blog', signal => getScheduler().stage('text').run(
+          () => getWorkerPool().run('blog', params, { signal }),
+          { priority, signal }
+        ));
+      },
+      // Never cache fallback content or posts with placeholder sections
+      { bypass: bypassCache, isCacheable: content => !content.error && !content.partialFailures }
+    );
+    
+    if (cached) {
+      log.debug('Blog post served from generation cache');
+    } else if (blogContent.error) {
+      log.warn('Blog generation completed with fallback content', { reason: blogContent.error });
+    } else if (blogContent.partialFailures) {
+      log.warn('Blog post generated with failed sections', { failures: blogContent.partialFailures.length });
+    } else {
+      log.info('Blog post generated with Google Gemini AI', { model: TEXT_MODEL });
+    }
     
-    # Configure Gemini
-    genai.configure(api_key=api_key)
+    return blogContent;
     
-    # Create the model - using gemini-2.0-flash-exp for best performance
-    model = genai.GenerativeModel('gemini-2.0-flash-exp')
+  } catch (error) {
+    // A cancelled or timed-out job must not finish with canned content
+    if (isAbortError(error)) throw error;
+    log.error('Blog generation error', error);
     
-    # Create a structured prompt
-    prompt = """Create a well-structured blog post with the following details:
-
-Title: "${escapeForPython(title)}"
-Main Topic: ${escapeForPython(topic)}
-Keywords to include: ${keywords.join(', ')}
-Approximate word count: ${wordCount} words
-Tone: ${tone}
-
-Please structure the blog post with the following sections:
-1. Introduction (compelling hook and overview)
-2. 3-4 Main sections with descriptive subheadings
-3. Conclusion (key takeaways and call-to-action)
-
-Format the response as a JSON object with this exact structure:
-{
-  "title": "The final optimized title",
-  "introduction": "Engaging introduction text...",
-  "sections": [
-    {
-      "heading": "Section 1 Heading",
-      "content": "Section 1 content..."
-    },
-    {
-      "heading": "Section 2 Heading",
-      "content": "Section 2 content..."
-    }
-  ],
-  "conclusion": "Strong conclusion text...",
-  "metaDescription": "A 150-160 character SEO meta description",
-  "imagePrompt": "A detailed prompt for generating a hero image for this blog post"
+    // Return fallback content
+    return fallbackBlogPost(title, topic);
+  }
 }
 
-Make sure the content is engaging, informative, and optimized for SEO without keyword stuffing.
-Each section should be substantial (150-250 words) and provide real value.
-Include the imagePrompt field with a detailed description for creating a relevant hero image.
-Only return the JSON object, nothing else."""
-    
-    # Generate content
-    response = model.generate_content(prompt)
-    response_text = response.text
-    
-    # Extract JSON from response (handle markdown code blocks)
-    if "\`\`\`json" in response_text:
-        json_text = response_text.split("\`\`\`json")[1].split("\`\`\`")[0].strip()
-    elif "\`\`\`" in response_text:
-        # Try to find JSON between any code blocks
-        parts = response_text.split("\`\`\`")
-        for part in parts:
-            part = part.strip()
-            if part.startswith('json'):
-                json_text = part[4:].strip()
-                break
-            elif part.startswith('{'):
-                json_text = part
-                break
-        else:
-            json_text = response_text
-    else:
-        json_text = response_text.strip()
-    
-    # Parse and output
-    blog_content = json.loads(json_text)
-    
-    # Validate required fields
-    required_fields = ["title", "introduction", "sections", "conclusion", "metaDescription"]
-    for field in required_fields:
-        if field not in blog_content:
-            raise ValueError(f"Missing required field: {field}")
-    
-    print(json.dumps(blog_content))
-    
-except Exception as e:
-    # Fallback content on error
-    error_content = {
-        "error": str(e),
-        "title": "${escapeForPython(title)}",
-        "introduction": "We apologize, but we encountered an issue generating the full content. Please try again.",
-        "sections": [
-            {
-                "heading": "Content Generation Issue",
-                "content": "The AI content generation encountered an error. Please try again in a few moments."
-            }
-        ],
-        "conclusion": "Thank you for your patience. Please try generating this content again.",
-        "metaDescription": "Information about ${escapeForPython(topic)}",
-        "imagePrompt": "Abstract professional image related to ${escapeForPython(topic)}"
+/**
+ * Streams a blog post from Google Gemini AI.
+ * `onEvent` receives each top-level field and each section as soon as it has
+ * been parsed from the model output; the complete post is returned at the end.
+ */
+export async function streamBlogPost({
+  title,
+  topic,
+  keywords = [],
+  wordCount = 800,
+  tone = 'professional'
+}, { onEvent = () => {}, bypassCache = false } = {}) {
+  const params = { title, topic, keywords, wordCount, tone };
+  const cache = getGenerationCache();
+  const key = cacheKey('blog', TEXT_MODEL, params);
+  
+  try {
+    if (!bypassCache) {
+      const cached = await cache.get(key);
+      if (cached) {
+        log.debug('Blog post served from generation cache');
+        replayBlogEvents(cached, onEvent);
+        return cached;
+      }
     }
-    print(json.dumps(error_content))
-`;
-    
-    // Write the script
-    const fs = await import('fs');
-    fs.writeFileSync(scriptPath, pythonScript);
-    
-    // Execute with Python from venv
-    const env = {
-      ...process.env,
-      GEMINI_API_KEY: process.env.GEMINI_API_KEY
-    };
-    
-    const pythonPath = process.env.PYTHON_PATH || 'python3';
     
-    console.log('Generating blog post with Google Gemini AI (gemini-2.0-flash-exp)...');
-    const { stdout, stderr } = await execPromise(`${pythonPath} ${scriptPath}`, { env, cwd: process.cwd() });
-    
-    // Clean up
-    fs.unlinkSync(scriptPath);
-    
-    if (stderr && !stderr.includes('WARNING')) {
-      console.error('Blog generation error:', stderr);
-      throw new Error(`Blog generation failed: ${stderr}`);
+    let blogContent = null;
+    if (shouldUseLongForm(wordCount)) {
+      log.debug('Generating long-form blog post from an outline', { model: TEXT_MODEL, wordCount });
+      try {
+        blogContent = await generateLongFormPost(params, { onEvent });
+      } catch (error) {
+        if (isAbortError(error)) throw error;
+        log.warn('Long-form generation failed, falling back to a single call', { error });
+      }
     }
     
-    const blogContent = JSON.parse(stdout);
+    if (!blogContent) {
+      log.debug('Streaming blog post with Google Gemini AI', { model: TEXT_MODEL });
+      const parser = new IncrementalBlogParser();
+      blogContent = await getScheduler().stage('text').run(() => getWorkerPool().run('blog', { ...params, stream: true }, {
+        onEvent: message => {
+          if (message.event === 'chunk') {
+            parser.push(message.text).forEach(onEvent);
+          }
+        }
+      }));
+    }
     
     if (blogContent.error) {
-      console.log('Blog generation completed with fallback content:', blogContent.error);
+      log.warn('Blog generation completed with fallback content', { reason: blogContent.error });
+    } else if (blogContent.partialFailures) {
+      log.warn('Blog post generated with failed sections', { failures: blogContent.partialFailures.length });
     } else {
-      console.log('Blog post generated successfully with Google Gemini AI');
+      await cache.set(key, blogContent);
     }
     
     return blogContent;
     
   } catch (error) {
-    console.error('Blog generation error:', error);
-    
-    // Return fallback content
-    return {
-      title: title,
-      introduction: `This is a comprehensive guide to ${topic}. In this article, we'll explore the key concepts, best practices, and actionable insights to help you understand and implement effective strategies.`,
-      sections: [
-        {
-          heading: "Understanding the Fundamentals",
-          content: `When it comes to ${topic}, it's essential to start with a solid foundation. The key principles involve understanding the core concepts and how they apply to real-world scenarios. This foundational knowledge will serve as the building blocks for more advanced techniques.`
-        },
-        {
-          heading: "Best Practices and Implementation",
-          content: `Successful implementation of ${topic} requires following proven best practices. These time-tested approaches have been refined through experience and research, providing a reliable framework for achieving optimal results.`
-        },
-        {
-          heading: "Advanced Techniques",
-          content: `Once you've mastered the basics, you can explore more advanced techniques that will set you apart. These sophisticated approaches require a deeper understanding but offer significant advantages for those willing to invest the time.`
-        }
-      ],
-      conclusion: `In conclusion, ${topic} offers numerous opportunities for growth and success. By understanding the fundamentals, implementing best practices, and exploring advanced techniques, you'll be well-equipped to achieve your goals.`,
-      metaDescription: `Comprehensive guide to ${topic}. Learn fundamentals, best practices, and advanced techniques.`,
-      imagePrompt: `Professional, clean illustration representing ${topic}, modern design, business-focused, high quality, 16:9 aspect ratio`
-    };
+    if (isAbortError(error)) throw error;
+    log.error('Blog generation error', error);
+    return fallbackBlogPost(title, topic);
   }
 }
 
+/**
+ * Emits the incremental events for an already complete blog post
+ */
+function replayBlogEvents(blogContent, onEvent) {
+  Object.entries(blogContent).forEach(([field, value]) => {
+    if (field === 'sections') {
+      (value || []).forEach((section, index) => onEvent({ type: 'section', index, section }));
+    } else {
+      onEvent({ type: 'field', field, value });
+    }
+  });
+}
+
+/**
+ * Canned content used when the model call fails entirely
+ */
+function fallbackBlogPost(title, topic) {
+  return {
+    title: title,
+    introduction: `This is a comprehensive guide to ${topic}. In this article, we'll explore the key concepts, best practices, and actionable insights to help you understand and implement effective strategies.`,
+    sections: [
+      {
+        heading: "Understanding the Fundamentals",
+        content: `When it comes to ${topic}, it's essential to start with a solid foundation. The key principles involve understanding the core concepts and how they apply to real-world scenarios. This foundational knowledge will serve as the building blocks for more advanced techniques.`
+      },
+      {
+        heading: "Best Practices and Implementation",
+        content: `Successful implementation of ${topic} requires following proven best practices. These time-tested approaches have been refined through experience and research, providing a reliable framework for achieving optimal results.`
+      },
+      {
+        heading: "Advanced Techniques",
+        content: `Once you've mastered the basics, you can explore more advanced techniques that will set you apart. These sophisticated approaches require a deeper understanding but offer significant advantages for those willing to invest the time.`
+      }
+    ],
+    conclusion: `In conclusion, ${topic} offers numerous opportunities for growth and success. By understanding the fundamentals, implementing best practices, and exploring advanced techniques, you'll be well-equipped to achieve your goals.`,
+    metaDescription: `Comprehensive guide to ${topic}. Learn fundamentals, best practices, and advanced techniques.`,
+    imagePrompt: `Professional, clean illustration representing ${topic}, modern design, business-focused, high quality, 16:9 aspect ratio`
+  };
+}
+
+/**
+ * Builds a hero image prompt from the brief alone, so the image can be
+ * generated while the blog text is still being written
+ */
+export function briefImagePrompt({ title, topic, tone = 'professional' }) {
+  return `Professional, clean hero illustration for a ${tone} blog post titled "${title}" about ${topic}, modern design, high quality, no text, 16:9 aspect ratio`;
+}
+
 /**
  * Generates a hero image using Google Imagen API (Gemini)
  * Creates AI-generated images from text prompts
  */
-export async function generateHeroImage(imagePrompt, title = '') {
+export async function generateHeroImage(imagePrompt, title = '', { bypassCache = false, priority = 0 } = {}) {
   try {
-    const timestamp = Date.now();
-    const scriptPath = `/tmp/image_imagen_${timestamp}.py`;
-    const outputPath = `public/generated/image_${timestamp}.png`;
-    
-    // Ensure output directory exists
-    const fs = await import('fs');
-    const path = await import('path');
-    const outputDir = path.join(process.cwd(), 'public', 'generated');
-    if (!fs.existsSync(outputDir)) {
-      fs.mkdirSync(outputDir, { recursive: true });
+    const cache = getGenerationCache();
+    const key = cacheKey('image', IMAGE_MODEL, { prompt: imagePrompt });
+    const store = getAssetStore();
+    
+    // Reuse a previous image for the same prompt as long as its files are still stored
+    if (!bypassCache) {
+      const cached = await cache.get(key);
+      const stored = cached?.variants && await Promise.all(cached.variants.map(async variant => {
+        const asset = await store.findByUrl(variant.url);
+        return Boolean(asset) && store.hasFile(asset);
+      }));
+      if (stored && stored.every(Boolean)) {
+        log.debug('Hero image served from generation cache');
+        return { success: true, ...cached, cached: true };
+      }
     }
     
-    // Create Python script using Google Imagen API
-    const pythonScript = `
-from google import genai
-from google.genai import types
-import os
-import base64
-
-try:
-    # Initialize Gemini client
-    client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
-    
-    # Image prompt from blog content
-    prompt = """${imagePrompt.replace(/"/g, '\\"')}"""
-    
-    # Generate image using Imagen 3
-    response = client.models.generate_images(
-        model='imagen-3.0-generate-001',
-        prompt=prompt,
-        config=types.GenerateImagesConfig(
-            number_of_images=1,
-            aspect_ratio="16:9",
-        )
-    )
-    
-    # Get first generated image
-    generated_image = response.generated_images[0]
-    image_bytes = generated_image.image.image_bytes
-    
-    # Save image
-    output_path = "${path.join(process.cwd(), outputPath).replace(/\\/g, '/')}"
-    with open(output_path, 'wb') as f:
-        f.write(image_bytes)
-    
-    print("SUCCESS: Image generated and saved")
-    
-except Exception as e:
-    print(f"ERROR: {str(e)}")
-`;
-    
-    fs.writeFileSync(scriptPath, pythonScript);
-    
-    const env = {
-      ...process.env,
-      GEMINI_API_KEY: process.env.GEMINI_API_KEY
-    };
-    const pythonPath = process.env.PYTHON_PATH || 'python3';
-    
-    console.log('Generating hero image with Google Imagen...');
-    const { stdout, stderr } = await execPromise(`${pythonPath} ${scriptPath}`, { 
-      env, 
-      cwd: process.cwd(),
+    log.debug('Generating hero image with Google Imagen', { model: IMAGE_MODEL });
+    const image = await getScheduler().stage('image').run(() => getWorkerPool().run('image', {
+      prompt: imagePrompt
+    }, {
       timeout: 30000  // Imagen takes longer than Unsplash
+    }), { priority });
+    
+    // Encode the responsive variants in memory; only the finished variants touch the disk,
+    // stored by content hash so identical images are kept once
+    const original = Buffer.from(image.data, 'base64');
+    const variants = await span('image.variants', () => createImageVariants(original));
+    const promptHash = key.split(':')[1];
+    await span('image.store', () => Promise.all(variants.map(async variant => {
+      const asset = await store.put(variant.buffer, { ext: variant.format, mimeType: variant.mimeType, promptHash });
+      variant.hash = asset.hash;
+      variant.url = store.url(asset);
+    })));
+    
+    const imageUrl = primaryVariant(variants).url;
+    log.info('Hero image generated with Google Imagen', {
+      variants: variants.length,
+      originalBytes: original.length,
+      variantBytes: () => variants.reduce((total, variant) => total + variant.size, 0)
     });
     
-    fs.unlinkSync(scriptPath);
+    const result = {
+      imageUrl: imageUrl,
+      source: 'Google Imagen 3',
+      originalSize: original.length,
+      variants: variants.map(({ buffer, ...variant }) => variant)
+    };
+    await cache.set(key, result);
     
-    if (stdout.includes('SUCCESS')) {
-      const imageUrl = `/generated/image_${timestamp}.png`;
-      console.log('Hero image generated successfully with Google Imagen');
-      
-      return {
-        success: true,
-        imageUrl: imageUrl,
-        source: 'Google Imagen 3'
-      };
-    } else {
-      console.error('Image generation failed:', stderr || stdout);
-      return {
-        success: false,
-        error: stderr || stdout || 'Unknown error'
-      };
-    }
+    // The buffers let the publish step upload without reading the files back
+    return { success: true, ...result, variants };
     
   } catch (error) {
-    console.error('Image generation error:', error);
+    // Cancelled or out of time: let the caller stop instead of reporting a failed image
+    if (isAbortError(error)) throw error;
+    log.error('Image generation error', error);
     return {
       success: false,
       error: error.message
     };
   }
 }
+
+/**
+ * Rewrites a piece of content with Gemini according to an edit prompt
+ */
+export async function editContent(prompt, { bypassCache = false } = {}) {
+  const { value } = await getGenerationCache().getOrCompute(
+    cacheKey('edit', TEXT_MODEL, { prompt }),
+    () => hedged('edit', signal => getScheduler().stage('text').run(
+      () => getWorkerPool().run('edit', { prompt }, { timeout: 30000, signal }),
+      { signal }
+    )),
+    { bypass: bypassCache }
+  );
+  return value.content;
+}
@@ -0,0 +1,300 @@
+import crypto from 'crypto';
+import fs from 'fs';
+import path from 'path';
+import { logger } from './logger';
+
+/**
+ * Content-addressed cache for generation results
+ *
+ * Keys are a SHA-256 of the normalized, sanitized inputs plus the model name.
+ * Lookups hit an in-memory LRU tier first (bounded by entry count and bytes,
+ * with TTL), then a disk tier of JSON files under GENERATION_CACHE_DIR.
+ *
+ * Each disk entry file carries its expiry as mtime and its last use as atime
+ * (both set explicitly, whatever the mount options). A periodic sweep deletes
+ * expired files, then the least recently used ones while the disk tier is
+ * over GENERATION_CACHE_DISK_MAX_BYTES, using nothing but stat().
+ */
+
+const log = logger.child({ component: 'generation-cache' });
+
+const DEFAULT_OPTIONS = {
+  ttl: parseInt(process.env.GENERATION_CACHE_TTL_MS || String(24 * 60 * 60 * 1000), 10),
+  maxEntries: parseInt(process.env.GENERATION_CACHE_MAX_ENTRIES || '500', 10),
+  maxBytes: parseInt(process.env.GENERATION_CACHE_MAX_BYTES || String(50 * 1024 * 1024), 10),
+  dir: process.env.GENERATION_CACHE_DIR || path.join(process.cwd(), '.cache', 'generation'),
+  disk: process.env.GENERATION_CACHE_DISK !== 'false',
+  diskMaxBytes: parseInt(process.env.GENERATION_CACHE_DISK_MAX_BYTES || String(500 * 1024 * 1024), 10),
+  sweepInterval: parseInt(process.env.GENERATION_CACHE_SWEEP_INTERVAL_MS || String(60 * 60 * 1000), 10)
+};
+
+// Temp files older than this were left by a write that never finished
+const STALE_TEMP_AGE = 60 * 60 * 1000;
+
+/**
+ * Normalizes a value so equivalent inputs hash identically:
+ * object keys are sorted and strings have their whitespace collapsed
+ */
+function normalize(value) {
+  if (typeof value === 'string') {
+    return value.trim().replace(/\s+/g, ' ');
+  }
+  if (Array.isArray(value)) {
+    return value.map(normalize);
+  }
+  if (value && typeof value === 'object') {
+    return Object.keys(value)
+      .sort()
+      .filter(key => value[key] !== undefined)
+      .reduce((acc, key) => {
+        acc[key] = normalize(value[key]);
+        return acc;
+      }, {});
+  }
+  return value;
+}
+
+/**
+ * Builds a cache key for a generation request
+ */
+export function cacheKey(namespace, model, input) {
+  const payload = JSON.stringify([namespace, model, normalize(input)]);
+  return `${namespace}:${crypto.createHash('sha256').update(payload).digest('hex')}`;
+}
+
+/**
+ * True when the request asks to skip cached results (Cache-Control: no-cache / no-store)
+ */
+export function shouldBypassCache(request) {
+  const cacheControl = request?.headers?.get?.('cache-control') || '';
+  return /\b(no-cache|no-store)\b/i.test(cacheControl);
+}
+
+export class GenerationCache {
+  constructor(options = {}) {
+    this.options = { ...DEFAULT_OPTIONS, ...options };
+    this.memory = new Map();
+    this.bytes = 0;
+    this.diskBytes = 0;
+    this.sweeper = null;
+    this.counters = {
+      hits: 0,
+      misses: 0,
+      memoryHits: 0,
+      diskHits: 0,
+      writes: 0,
+      evictions: 0,
+      bypassed: 0,
+      diskExpired: 0,
+      diskEvictions: 0
+    };
+  }
+
+  async get(key) {
+    const entry = this.memory.get(key);
+    if (entry) {
+      if (entry.expiresAt > Date.now()) {
+        // Re-insert to mark as most recently used
+        this.memory.delete(key);
+        this.memory.set(key, entry);
+        this.counters.hits++;
+        this.counters.memoryHits++;
+        return entry.value;
+      }
+      this.deleteFromMemory(key);
+    }
+
+    const diskEntry = await this.readFromDisk(key);
+    if (diskEntry) {
+      this.setInMemory(key, diskEntry.value, diskEntry.expiresAt);
+      this.counters.hits++;
+      this.counters.diskHits++;
+      return diskEntry.value;
+    }
+
+    this.counters.misses++;
+    return undefined;
+  }
+
+  async set(key, value, ttl = this.options.ttl) {
+    const expiresAt = Date.now() + ttl;
+    this.setInMemory(key, value, expiresAt);
+    this.counters.writes++;
+    await this.writeToDisk(key, value, expiresAt);
+  }
+
+  async delete(key) {
+    this.deleteFromMemory(key);
+    if (this.options.disk) {
+      await fs.promises.rm(this.diskPath(key), { force: true });
+    }
+  }
+
+  /**
+   * Returns the cached value for `key`, or computes and stores it.
+   * `isCacheable(value)` can reject results (e.g. fallback content) from being stored.
+   */
+  async getOrCompute(key, compute, { bypass = false, isCacheable = () => true } = {}) {
+    if (bypass) {
+      this.counters.bypassed++;
+    } else {
+      const cached = await this.get(key);
+      if (cached !== undefined) {
+        return { value: cached, cached: true };
+      }
+    }
+
+    const value = await compute();
+    if (isCacheable(value)) {
+      await this.set(key, value);
+    }
+    return { value, cached: false };
+  }
+
+  setInMemory(key, value, expiresAt) {
+    const size = Buffer.byteLength(JSON.stringify(value));
+    if (size > this.options.maxBytes) return;
+
+    this.deleteFromMemory(key);
+    this.memory.set(key, { value, expiresAt, size });
+    this.bytes += size;
+
+    // Map iteration order is insertion order, so the first key is least recently used
+    while (this.memory.size > this.options.maxEntries || this.bytes > this.options.maxBytes) {
+      this.deleteFromMemory(this.memory.keys().next().value);
+      this.counters.evictions++;
+    }
+  }
+
+  deleteFromMemory(key) {
+    const entry = this.memory.get(key);
+    if (entry) {
+      this.bytes -= entry.size;
+      this.memory.delete(key);
+    }
+  }
+
+  diskPath(key) {
+    const [namespace, hash] = key.split(':');
+    return path.join(this.options.dir, namespace, hash.slice(0, 2), `${hash}.json`);
+  }
+
+  async readFromDisk(key) {
+    if (!this.options.disk) return null;
+    const filePath = this.diskPath(key);
+    try {
+      const entry = JSON.parse(await fs.promises.readFile(filePath, 'utf8'));
+      if (entry.expiresAt > Date.now()) {
+        // Mark as recently used for the sweep
+        fs.promises.utimes(filePath, new Date(), new Date(entry.expiresAt)).catch(() => {});
+        return entry;
+      }
+      await fs.promises.rm(filePath, { force: true });
+    } catch (error) {
+      if (error.code !== 'ENOENT') {
+        log.error('Generation cache read failed', error);
+      }
+    }
+    return null;
+  }
+
+  async writeToDisk(key, value, expiresAt) {
+    if (!this.options.disk) return;
+    const filePath = this.diskPath(key);
+    const tempPath = `${filePath}.${process.pid}.${Date.now()}.tmp`;
+    try {
+      await fs.promises.mkdir(path.dirname(filePath), { recursive: true });
+      await fs.promises.writeFile(tempPath, JSON.stringify({ key, expiresAt, value }));
+      await fs.promises.utimes(tempPath, new Date(), new Date(expiresAt));
+      await fs.promises.rename(tempPath, filePath);
+    } catch (error) {
+      log.error('Generation cache write failed', error);
+      await fs.promises.rm(tempPath, { force: true }).catch(() => {});
+    }
+  }
+
+  /**
+   * Deletes expired disk entries, then evicts the least recently used ones
+   * until the disk tier fits in diskMaxBytes
+   */
+  async sweep() {
+    if (!this.options.disk) return { deleted: 0, bytes: 0 };
+    const now = Date.now();
+    let names;
+    try {
+      names = await fs.promises.readdir(this.options.dir, { recursive: true });
+    } catch (error) {
+      if (error.code === 'ENOENT') return { deleted: 0, bytes: 0 };
+      throw error;
+    }
+
+    const entries = [];
+    let totalBytes = 0;
+    let deleted = 0;
+    for (const name of names) {
+      const filePath = path.join(this.options.dir, name);
+      const isTemp = name.endsWith('.tmp');
+      if (!isTemp && !name.endsWith('.json')) continue;
+      const stat = await fs.promises.stat(filePath).catch(() => null);
+      if (!stat?.isFile()) continue;
+      if (isTemp ? now - stat.mtimeMs > STALE_TEMP_AGE : stat.mtimeMs <= now) {
+        await fs.promises.rm(filePath, { force: true });
+        if (!isTemp) this.counters.diskExpired++;
+        deleted++;
+      } else if (!isTemp) {
+        entries.push({ filePath, size: stat.size, usedAt: stat.atimeMs });
+        totalBytes += stat.size;
+      }
+    }
+
+    entries.sort((a, b) => a.usedAt - b.usedAt);
+    for (const entry of entries) {
+      if (totalBytes <= this.options.diskMaxBytes) break;
+      await fs.promises.rm(entry.filePath, { force: true });
+      totalBytes -= entry.size;
+      this.counters.diskEvictions++;
+      deleted++;
+    }
+
+    this.diskBytes = totalBytes;
+    if (deleted > 0) {
+      log.info('Generation cache sweep removed disk entries', { deleted, remainingBytes: totalBytes });
+    }
+    return { deleted, bytes: totalBytes };
+  }
+
+  startSweeper() {
+    if (this.sweeper || !this.options.disk || !this.options.sweepInterval) return;
+    this.sweeper = setInterval(() => {
+      this.sweep().catch(error => log.error('Generation cache sweep failed', error));
+    }, this.options.sweepInterval);
+    this.sweeper.unref?.();
+  }
+
+  stopSweeper() {
+    clearInterval(this.sweeper);
+    this.sweeper = null;
+  }
+
+  stats() {
+    const lookups = this.counters.hits + this.counters.misses;
+    return {
+      ...this.counters,
+      hitRate: lookups > 0 ? Number((this.counters.hits / lookups).toFixed(3)) : 0,
+      entries: this.memory.size,
+      bytes: this.bytes,
+      diskBytes: this.diskBytes
+    };
+  }
+}
+
+/**
+ * Returns the process-wide generation cache (with its disk sweeper running)
+ */
+export function getGenerationCache() {
+  if (!globalThis.__generationCache) {
+    globalThis.__generationCache = new GenerationCache();
+    globalThis.__generationCache.startSweeper();
+  }
+  return globalThis.__generationCache;
+}
@@ -0,0 +1,137 @@
+import { Worker } from 'worker_threads';
+import { logger } from './logger';
+import { targetWidths } from './pngCodec';
+
+/**
+ * Responsive, compressed variants of a generated hero image, built in memory
+ *
+ * sharp is not a dependency of the app. Opt in with `yarn add sharp` (the
+ * package Next.js uses for image optimisation): every width is then encoded
+ * as AVIF and WebP, plus a palette-quantised PNG fallback at full width.
+ * Without it, the PNG codec in lib/pngCodec.js produces palette-quantised
+ * PNGs at every width, on a worker thread (lib/pngVariantWorker.js) so the
+ * encoding does not block requests.
+ */
+
+const WIDTHS = (process.env.IMAGE_VARIANT_WIDTHS || '640,1024,1536').split(',').map(Number).filter(Boolean);
+const FORMATS = (process.env.IMAGE_VARIANT_FORMATS || 'webp,avif').split(',').map(format => format.trim()).filter(Boolean);
+
+const MIME_TYPES = { avif: 'image/avif', webp: 'image/webp', png: 'image/png' };
+const SHARP_OPTIONS = {
+  avif: { quality: 50, effort: 4 },
+  webp: { quality: 78, effort: 4 },
+  png: { compressionLevel: 9, palette: true, quality: 90 }
+};
+
+const log = logger.child({ component: 'image-variants' });
+
+let sharpModule;
+
+async function loadSharp() {
+  if (sharpModule === undefined) {
+    try {
+      sharpModule = (await import(/* webpackIgnore: true */ 'sharp')).default;
+    } catch (error) {
+      sharpModule = null;
+      log.info('sharp is not installed; hero images get PNG variants only');
+    }
+  }
+  return sharpModule;
+}
+
+function variant(format, width, height, buffer) {
+  return { format, width, height, mimeType: MIME_TYPES[format], size: buffer.length, buffer };
+}
+
+async function sharpVariants(sharp, input, widths, formats) {
+  const { width: originalWidth } = await sharp(input).metadata();
+  const jobs = targetWidths(originalWidth, widths).flatMap(width =>
+    formats.filter(format => format !== 'png').map(format => ({ format, width }))
+  );
+  jobs.push({ format: 'png', width: originalWidth });
+
+  return Promise.all(jobs.map(async ({ format, width }) => {
+    const { data, info } = await sharp(input)
+      .resize({ width, withoutEnlargement: true })
+      [format](SHARP_OPTIONS[format])
+      .toBuffer({ resolveWithObject: true });
+    return variant(format, info.width, info.height, data);
+  }));
+}
+
+/**
+ * One worker thread for PNG encoding, started on first use. Requests are
+ * matched to replies by ID; if the thread dies, its pending requests fail and
+ * the next request starts a new one.
+ */
+class PngWorker {
+  constructor() {
+    this.worker = null;
+    this.pending = new Map();
+    this.nextId = 1;
+  }
+
+  start() {
+    const worker = new Worker(new URL('./pngVariantWorker.js', import.meta.url));
+    worker.unref();
+    worker.on('message', ({ id, variants, error }) => {
+      const request = this.pending.get(id);
+      if (!request) return;
+      this.pending.delete(id);
+      if (this.pending.size === 0) worker.unref();
+      if (error) request.reject(new Error(error));
+      else request.resolve(variants);
+    });
+    const fail = error => {
+      if (this.worker === worker) this.worker = null;
+      this.pending.forEach(request => request.reject(error));
+      this.pending.clear();
+    };
+    worker.on('error', fail);
+    worker.on('exit', code => fail(new Error(`PNG worker exited with code ${code}`)));
+    this.worker = worker;
+  }
+
+  run(input, widths) {
+    if (!this.worker) this.start();
+    // Keep the process alive only while a request is in flight
+    this.worker.ref();
+    return new Promise((resolve, reject) => {
+      const id = this.nextId++;
+      this.pending.set(id, { resolve, reject });
+      this.worker.postMessage({ id, input, widths });
+    });
+  }
+}
+
+async function pngVariants(input, widths) {
+  if (!globalThis.__pngWorker) globalThis.__pngWorker = new PngWorker();
+  try {
+    const variants = await globalThis.__pngWorker.run(input, widths);
+    return variants.map(({ width, height, buffer }) => variant('png', width, height, Buffer.from(buffer.buffer, buffer.byteOffset, buffer.byteLength)));
+  } catch (error) {
+    log.warn('Keeping hero image as is', { reason: error.message });
+    return [variant('png', null, null, input)];
+  }
+}
+
+/**
+ * Builds the variants of a PNG image. Each variant is
+ * { format, width, height, mimeType, size, buffer }.
+ */
+export async function createImageVariants(input, { widths = WIDTHS, formats = FORMATS } = {}) {
+  const sharp = await loadSharp();
+  const variants = sharp
+    ? await sharpVariants(sharp, input, widths, formats)
+    : await pngVariants(input, widths);
+  return variants.sort((a, b) => (a.width || 0) - (b.width || 0));
+}
+
+/**
+ * The variant to use where a single URL is needed: the widest WebP when
+ * there is one (supported everywhere), otherwise the widest PNG
+ */
+export function primaryVariant(variants) {
+  const widest = format => variants.filter(v => v.format === format).sort((a, b) => (b.width || 0) - (a.width || 0))[0];
+  return widest('webp') || widest('png') || variants[variants.length - 1];
+}
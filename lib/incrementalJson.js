@@ -0,0 +1,160 @@
+/**
+ * Incremental parser for streamed blog post JSON
+ *
+ * Model output arrives in arbitrary text chunks, often wrapped in a ```json
+ * code fence. The parser skips everything before the first `{` and after the
+ * matching `}`, and reports each top-level field and each `sections[]` entry
+ * as soon as its closing token has been seen.
+ */
+export class IncrementalBlogParser {
+  constructor() {
+    this.buffer = '';
+    this.pos = 0;
+    this.stack = [];
+    this.started = false;
+    this.done = false;
+    this.inString = false;
+    this.escape = false;
+    this.state = 'key';        // key | colon | value | container | primitive | comma
+    this.key = null;
+    this.keyStart = -1;
+    this.valueStart = -1;
+    this.objectStart = -1;
+    this.elementStart = -1;
+    this.sectionIndex = 0;
+  }
+
+  /**
+   * Feeds a chunk of model output and returns the events it completed:
+   *   { type: 'field', field, value }
+   *   { type: 'section', index, section }
+   */
+  push(text) {
+    this.buffer += text;
+    const events = [];
+
+    for (; this.pos < this.buffer.length && !this.done; this.pos++) {
+      this.step(this.buffer[this.pos], this.pos, events);
+    }
+
+    return events;
+  }
+
+  /**
+   * Returns the complete parsed object once the closing brace has been seen
+   */
+  result() {
+    if (!this.done) return null;
+    return JSON.parse(this.buffer.slice(this.objectStart, this.pos));
+  }
+
+  step(c, i, events) {
+    if (!this.started) {
+      if (c === '{') {
+        this.started = true;
+        this.objectStart = i;
+        this.stack.push('{');
+      }
+      return;
+    }
+
+    if (this.inString) {
+      if (this.escape) {
+        this.escape = false;
+      } else if (c === '\\') {
+        this.escape = true;
+      } else if (c === '"') {
+        this.inString = false;
+        this.endString(i, events);
+      }
+      return;
+    }
+
+    const depth = this.stack.length;
+
+    if (depth === 1 && this.state === 'primitive' && (c === ',' || c === '}' || /\s/.test(c))) {
+      this.emitField(i, events);
+    }
+
+    if (/\s/.test(c)) return;
+
+    switch (c) {
+      case '"':
+        this.inString = true;
+        if (depth === 1 && this.state === 'key') {
+          this.keyStart = i;
+        } else if (depth === 1 && this.state === 'value') {
+          this.valueStart = i;
+        }
+        return;
+
+      case ':':
+        if (depth === 1 && this.state === 'colon') this.state = 'value';
+        return;
+
+      case ',':
+        if (depth === 1) this.state = 'key';
+        return;
+
+      case '{':
+      case '[':
+        if (depth === 1 && this.state === 'value') {
+          this.valueStart = i;
+          this.state = 'container';
+        } else if (depth === 2 && this.key === 'sections' && c === '{') {
+          this.elementStart = i;
+        }
+        this.stack.push(c);
+        return;
+
+      case '}':
+      case ']':
+        this.stack.pop();
+        if (this.stack.length === 2 && this.key === 'sections' && c === '}') {
+          const section = this.parse(this.elementStart, i + 1);
+          if (section !== undefined) {
+            events.push({ type: 'section', index: this.sectionIndex++, section });
+          }
+        } else if (this.stack.length === 1 && this.state === 'container') {
+          // Sections were already reported one by one
+          if (this.key !== 'sections') this.emitField(i + 1, events);
+          this.state = 'comma';
+        } else if (this.stack.length === 0) {
+          this.done = true;
+        }
+        return;
+
+      default:
+        if (depth === 1 && this.state === 'value') {
+          this.valueStart = i;
+          this.state = 'primitive';
+        }
+    }
+  }
+
+  endString(i, events) {
+    if (this.stack.length !== 1) return;
+    if (this.state === 'key') {
+      this.key = this.parse(this.keyStart, i + 1);
+      this.state = 'colon';
+    } else if (this.state === 'value') {
+      this.emitField(i + 1, events);
+    }
+  }
+
+  emitField(end, events) {
+    const value = this.parse(this.valueStart, end);
+    if (value !== undefined) {
+      events.push({ type: 'field', field: this.key, value });
+    }
+    this.state = 'comma';
+  }
+
+  parse(start, end) {
+    try {
+      return JSON.parse(this.buffer.slice(start, end));
+    } catch (error) {
+      return undefined;
+    }
+  }
+}
@@ -0,0 +1,99 @@
+/**
+ * Per-job progress event channels for /api/job-events/{jobId}
+ *
+ * Every published event gets a monotonically increasing id within its job.
+ * A bounded history is kept so a reconnecting client can resume from its
+ * Last-Event-ID; channels are dropped a while after their final event.
+ */
+
+const HISTORY_LIMIT = 100;
+const RETAIN_AFTER_FINAL = 10 * 60 * 1000; // 10 minutes
+
+const FINAL_TYPES = new Set(['complete', 'failed', 'cancelled']);
+
+class JobChannel {
+  constructor() {
+    this.nextId = 1;
+    this.history = [];
+    this.listeners = new Set();
+    this.finished = false;
+  }
+
+  publish(type, data) {
+    const event = { id: this.nextId++, type, data };
+    this.history.push(event);
+    if (this.history.length > HISTORY_LIMIT) {
+      this.history.shift();
+    }
+    this.finished = FINAL_TYPES.has(type);
+    this.listeners.forEach(listener => listener(event));
+    return event;
+  }
+
+  eventsAfter(lastEventId) {
+    return this.history.filter(event => event.id > lastEventId);
+  }
+}
+
+class JobEventBus {
+  constructor() {
+    this.channels = new Map();
+  }
+
+  channel(jobId) {
+    let channel = this.channels.get(jobId);
+    if (!channel) {
+      channel = new JobChannel();
+      this.channels.set(jobId, channel);
+    }
+    return channel;
+  }
+
+  /**
+   * Publishes an event for a job; final events schedule the channel for removal
+   */
+  publish(jobId, type, data) {
+    const channel = this.channel(jobId);
+    const event = channel.publish(type, data);
+
+    if (channel.finished) {
+      const timer = setTimeout(() => {
+        if (this.channels.get(jobId) === channel && channel.listeners.size === 0) {
+          this.channels.delete(jobId);
+        }
+      }, RETAIN_AFTER_FINAL);
+      timer.unref?.();
+    }
+
+    return event;
+  }
+
+  /**
+   * Replays events after `lastEventId` to `listener`, then delivers live ones.
+   * Returns an unsubscribe function.
+   */
+  subscribe(jobId, lastEventId, listener) {
+    const channel = this.channel(jobId);
+    channel.eventsAfter(lastEventId).forEach(listener);
+    channel.listeners.add(listener);
+    return () => channel.listeners.delete(listener);
+  }
+
+  hasChannel(jobId) {
+    return this.channels.has(jobId);
+  }
+
+  isFinished(jobId) {
+    return this.channels.get(jobId)?.finished || false;
+  }
+}
+
+/**
+ * Returns the process-wide job event bus
+ */
+export function getJobEvents() {
+  if (!globalThis.__jobEvents) {
+    globalThis.__jobEvents = new JobEventBus();
+  }
+  return globalThis.__jobEvents;
+}
@@ -0,0 +1,411 @@
+import crypto from 'crypto';
+import fs from 'fs';
+import os from 'os';
+import path from 'path';
+import { logger } from './logger';
+import { RespClient } from './respClient';
+
+/**
+ * Pluggable job store for generation jobs
+ *
+ * All backends share one async interface:
+ *   create(job)              store a new job (expires after the store TTL)
+ *   get(id)                  job record or null
+ *   update(id, patch, { ifStatus })
+ *                            atomically merge fields; null if the job is gone,
+ *                            or when `ifStatus` (a list) does not hold its status
+ *   delete(id)
+ *   listByStatus(status)     ids of live jobs with that status
+ *   countByStatus(status)    number of jobs with that status (cheap, for health)
+ *   listInterrupted()        ids of queued or running jobs whose process is gone
+ *
+ * Jobs run in the process that created them, which is recorded as `owner`.
+ * A job still queued or running when that process stops (a restart, a deploy,
+ * a crash) will never finish, so listInterrupted() lets the API fail it.
+ *
+ * Select a backend with JOB_STORE=memory|file|redis.
+ */
+
+export const JOB_STATUSES = ['queued', 'started', 'processing', 'completed', 'failed', 'cancelled'];
+export const IN_FLIGHT_STATUSES = ['queued', 'started', 'processing'];
+
+// Identifies this process as the owner of the jobs it creates; never reused
+// by a later process, even on the same host with the same pid
+export const INSTANCE_ID = `${os.hostname()}-${process.pid}-${crypto.randomBytes(4).toString('hex')}`;
+
+const log = logger.child({ component: 'job-store' });
+
+const DEFAULT_TTL = parseInt(process.env.JOB_TTL_MS || String(60 * 60 * 1000), 10); // 1 hour
+// A Redis instance whose heartbeat is this old is considered gone
+const INSTANCE_TTL = parseInt(process.env.JOB_INSTANCE_TTL_MS || '30000', 10);
+// How often counting a Redis status set also prunes its expired jobs
+const COUNT_PRUNE_INTERVAL = 60 * 1000;
+
+/**
+ * Process-local store (the original behaviour). Each job carries its own
+ * expiry timer, so there is no periodic scan over all jobs.
+ */
+export class MemoryJobStore {
+  constructor({ ttl = DEFAULT_TTL } = {}) {
+    this.ttl = ttl;
+    this.jobs = new Map();
+    this.timers = new Map();
+    this.statusIndex = new Map(JOB_STATUSES.map(status => [status, new Set()]));
+  }
+
+  async create(job) {
+    job = { ...job, owner: INSTANCE_ID };
+    this.jobs.set(job.id, job);
+    this.index(job.id, null, job.status);
+    this.scheduleExpiry(job.id);
+    return job;
+  }
+
+  async get(id) {
+    return this.jobs.get(id) || null;
+  }
+
+  async update(id, patch, { ifStatus } = {}) {
+    const current = this.jobs.get(id);
+    if (!current) return null;
+    if (ifStatus && !ifStatus.includes(current.status)) return null;
+    const job = { ...current, ...patch };
+    this.jobs.set(id, job);
+    this.index(id, current.status, job.status);
+    return job;
+  }
+
+  async delete(id) {
+    const job = this.jobs.get(id);
+    if (!job) return;
+    this.jobs.delete(id);
+    this.index(id, job.status, null);
+    clearTimeout(this.timers.get(id));
+    this.timers.delete(id);
+  }
+
+  async listByStatus(status) {
+    return [...(this.statusIndex.get(status) || [])];
+  }
+
+  async countByStatus(status) {
+    return this.statusIndex.get(status)?.size || 0;
+  }
+
+  // Jobs held only in memory end with the process that runs them
+  async listInterrupted() {
+    return [];
+  }
+
+  index(id, from, to) {
+    if (from === to) return;
+    if (from) this.statusIndex.get(from)?.delete(id);
+    if (to) {
+      if (!this.statusIndex.has(to)) this.statusIndex.set(to, new Set());
+      this.statusIndex.get(to).add(id);
+    }
+  }
+
+  scheduleExpiry(id, delay = this.ttl) {
+    clearTimeout(this.timers.get(id));
+    const timer = setTimeout(() => this.delete(id), delay);
+    timer.unref?.();
+    this.timers.set(id, timer);
+  }
+
+  async close() {
+    this.timers.forEach(timer => clearTimeout(timer));
+  }
+}
+
+/**
+ * Single-node durable store: one JSON file per job under JOB_STORE_DIR,
+ * written atomically (temp file + rename). Jobs are loaded back into memory
+ * on startup, so finished jobs survive a restart or deploy; the ones a
+ * previous process left queued or running are reported by listInterrupted().
+ */
+export class FileJobStore extends MemoryJobStore {
+  constructor({ ttl = DEFAULT_TTL, dir = process.env.JOB_STORE_DIR || path.join(process.cwd(), '.data', 'jobs') } = {}) {
+    super({ ttl });
+    this.dir = dir;
+    this.writes = new Map();
+    this.expiries = new Map();
+    this.loaded = this.load();
+  }
+
+  async load() {
+    await fs.promises.mkdir(this.dir, { recursive: true });
+    const now = Date.now();
+    for (const file of await fs.promises.readdir(this.dir)) {
+      if (!file.endsWith('.json')) continue;
+      try {
+        const { job, expiresAt } = JSON.parse(await fs.promises.readFile(path.join(this.dir, file), 'utf8'));
+        if (expiresAt <= now) {
+          await fs.promises.rm(path.join(this.dir, file), { force: true });
+          continue;
+        }
+        // Loaded as written, keeping the owner that created it
+        this.jobs.set(job.id, job);
+        this.index(job.id, null, job.status);
+        this.scheduleExpiry(job.id, expiresAt - now);
+        this.expiries.set(job.id, expiresAt);
+      } catch (error) {
+        log.warn('Skipping unreadable job file', { file, error });
+      }
+    }
+  }
+
+  async create(job) {
+    await this.loaded;
+    job = await super.create(job);
+    this.expiries.set(job.id, Date.now() + this.ttl);
+    await this.persist(job.id);
+    return job;
+  }
+
+  async get(id) {
+    await this.loaded;
+    return super.get(id);
+  }
+
+  async update(id, patch, options) {
+    await this.loaded;
+    const job = await super.update(id, patch, options);
+    if (job) await this.persist(id);
+    return job;
+  }
+
+  async delete(id) {
+    await this.loaded;
+    await super.delete(id);
+    this.expiries.delete(id);
+    await this.chain(id, () => fs.promises.rm(this.filePath(id), { force: true }));
+  }
+
+  async listByStatus(status) {
+    await this.loaded;
+    return super.listByStatus(status);
+  }
+
+  async countByStatus(status) {
+    await this.loaded;
+    return super.countByStatus(status);
+  }
+
+  // Only one process uses the directory, so jobs another process owned are orphans
+  async listInterrupted() {
+    await this.loaded;
+    return IN_FLIGHT_STATUSES
+      .flatMap(status => [...this.statusIndex.get(status)])
+      .filter(id => this.jobs.get(id).owner !== INSTANCE_ID);
+  }
+
+  filePath(id) {
+    return path.join(this.dir, `${encodeURIComponent(id)}.json`);
+  }
+
+  // Serializes writes per job so a slow write can never overwrite a newer one
+  chain(id, task) {
+    const previous = this.writes.get(id) || Promise.resolve();
+    const next = previous.then(task, task);
+    this.writes.set(id, next);
+    next.finally(() => {
+      if (this.writes.get(id) === next) this.writes.delete(id);
+    });
+    return next;
+  }
+
+  persist(id) {
+    return this.chain(id, async () => {
+      const job = this.jobs.get(id);
+      if (!job) return;
+      const target = this.filePath(id);
+      const temp = `${target}.${process.pid}.tmp`;
+      await fs.promises.writeFile(temp, JSON.stringify({ job, expiresAt: this.expiries.get(id) }));
+      await fs.promises.rename(temp, target);
+    });
+  }
+}
+
+// Merges fields into a job hash only if it still exists, so an update racing
+// the key's expiry cannot recreate it without a TTL (HSET keeps the TTL of an
+// existing key), and moves the job between status sets in the same step.
+// With a status condition, the write only happens while the job's status is
+// one of the listed ones, so a final status set elsewhere is never overwritten.
+// KEYS: job hash, then the status set to add the job to and the sets to
+// remove it from (both omitted when the status does not change).
+// ARGV: job ID, the allowed JSON-encoded statuses joined by commas (empty for
+// no condition), then field/value pairs. Returns the updated hash, or nil.
+export const UPDATE_SCRIPT = `
+if redis.call('EXISTS', KEYS[1]) == 0 then return nil end
+if ARGV[2] ~= '' then
+  local status = redis.call('HGET', KEYS[1], 'status')
+  local allowed = false
+  for candidate in string.gmatch(ARGV[2], '[^,]+') do
+    if candidate == status then allowed = true end
+  end
+  if not allowed then return nil end
+end
+if #ARGV > 2 then redis.call('HSET', KEYS[1], unpack(ARGV, 3)) end
+if #KEYS > 1 then
+  for i = 3, #KEYS do redis.call('SREM', KEYS[i], ARGV[1]) end
+  redis.call('SADD', KEYS[2], ARGV[1])
+end
+return redis.call('HGETALL', KEYS[1])
+`;
+
+/**
+ * Shared store over the Redis protocol, so several API instances see the same
+ * jobs. Each job is a hash of JSON-encoded fields with a key TTL; status sets
+ * index live jobs and are pruned lazily as their jobs expire. Every instance
+ * refreshes a heartbeat key while it runs; in-flight jobs whose owner's
+ * heartbeat has expired are reported by listInterrupted().
+ */
+export class RedisJobStore {
+  constructor({ ttl = DEFAULT_TTL, url = process.env.REDIS_URL || 'redis://127.0.0.1:6379', prefix = 'blogstudio:', instanceTtl = INSTANCE_TTL } = {}) {
+    this.ttl = ttl;
+    this.prefix = prefix;
+    this.instanceTtl = instanceTtl;
+    this.client = new RespClient(url);
+    this.prunedAt = new Map();
+    this.beating = this.heartbeat();
+    this.heartbeatTimer = setInterval(() => this.heartbeat(), Math.max(1000, Math.floor(instanceTtl / 3)));
+    this.heartbeatTimer.unref?.();
+  }
+
+  jobKey(id) {
+    return `${this.prefix}job:${id}`;
+  }
+
+  instanceKey(instanceId) {
+    return `${this.prefix}instance:${instanceId}`;
+  }
+
+  async heartbeat() {
+    try {
+      await this.client.command('SET', this.instanceKey(INSTANCE_ID), new Date().toISOString(), 'PX', this.instanceTtl);
+    } catch (error) {
+      log.warn('Job store heartbeat failed', { error });
+    }
+  }
+
+  statusKey(status) {
+    return `${this.prefix}jobs:status:${status}`;
+  }
+
+  fieldArgs(fields) {
+    return Object.entries(fields)
+      .filter(([, value]) => value !== undefined)
+      .flatMap(([field, value]) => [field, JSON.stringify(value)]);
+  }
+
+  statusCommands(id, status) {
+    // Removing from every other status set keeps the index consistent without a read
+    return JOB_STATUSES.filter(other => other !== status)
+      .map(other => ['SREM', this.statusKey(other), id])
+      .concat([['SADD', this.statusKey(status), id]]);
+  }
+
+  parseHash(reply) {
+    if (!reply || reply.length === 0) return null;
+    const job = {};
+    for (let i = 0; i < reply.length; i += 2) {
+      job[reply[i]] = JSON.parse(reply[i + 1]);
+    }
+    return job;
+  }
+
+  async create(job) {
+    job = { ...job, owner: INSTANCE_ID };
+    await this.client.transaction([
+      ['DEL', this.jobKey(job.id)],
+      ['HSET', this.jobKey(job.id), ...this.fieldArgs(job)],
+      ['PEXPIRE', this.jobKey(job.id), this.ttl],
+      ...(job.status ? this.statusCommands(job.id, job.status) : [])
+    ]);
+    return job;
+  }
+
+  async get(id) {
+    return this.parseHash(await this.client.command('HGETALL', this.jobKey(id)));
+  }
+
+  async update(id, patch, { ifStatus } = {}) {
+    // Only the changed fields are written, so concurrent writers of other fields are kept
+    const statusKeys = patch.status
+      ? [this.statusKey(patch.status), ...JOB_STATUSES.filter(other => other !== patch.status).map(other => this.statusKey(other))]
+      : [];
+    const keys = [this.jobKey(id), ...statusKeys];
+    const condition = ifStatus ? ifStatus.map(status => JSON.stringify(status)).join(',') : '';
+    return this.parseHash(await this.client.command('EVAL', UPDATE_SCRIPT, keys.length, ...keys, id, condition, ...this.fieldArgs(patch)));
+  }
+
+  async delete(id) {
+    await this.client.transaction([
+      ['DEL', this.jobKey(id)],
+      ...JOB_STATUSES.map(status => ['SREM', this.statusKey(status), id])
+    ]);
+  }
+
+  async listByStatus(status) {
+    const ids = await this.client.command('SMEMBERS', this.statusKey(status));
+    if (ids.length === 0) return [];
+    // One round trip for all the existence checks, one more to prune expired jobs
+    const exists = await this.client.pipeline(ids.map(id => ['EXISTS', this.jobKey(id)]));
+    const expired = ids.filter((id, i) => !exists[i]);
+    if (expired.length > 0) await this.client.command('SREM', this.statusKey(status), ...expired);
+    this.prunedAt.set(status, Date.now());
+    return ids.filter((id, i) => exists[i]);
+  }
+
+  // SCARD also counts jobs that expired since the set was last pruned, so the
+  // set is pruned in the background every COUNT_PRUNE_INTERVAL
+  async countByStatus(status) {
+    if (Date.now() - (this.prunedAt.get(status) || 0) > COUNT_PRUNE_INTERVAL) {
+      this.prunedAt.set(status, Date.now());
+      this.listByStatus(status).catch(error => log.warn('Job status set cleanup failed', { status, error }));
+    }
+    return this.client.command('SCARD', this.statusKey(status));
+  }
+
+  async listInterrupted() {
+    await this.beating;
+    const interrupted = [];
+    for (const status of IN_FLIGHT_STATUSES) {
+      for (const id of await this.listByStatus(status)) {
+        const owner = JSON.parse(await this.client.command('HGET', this.jobKey(id), 'owner') || 'null');
+        if (!owner || !(await this.client.command('EXISTS', this.instanceKey(owner)))) interrupted.push(id);
+      }
+    }
+    return interrupted;
+  }
+
+  async close() {
+    clearInterval(this.heartbeatTimer);
+    await this.client.command('DEL', this.instanceKey(INSTANCE_ID));
+    await this.client.quit();
+  }
+}
+
+export function createJobStore(type = process.env.JOB_STORE || 'memory', options = {}) {
+  switch (type) {
+    case 'file':
+      return new FileJobStore(options);
+    case 'redis':
+      return new RedisJobStore(options);
+    case 'memory':
+      return new MemoryJobStore(options);
+    default:
+      throw new Error(`Unknown JOB_STORE backend: ${type}`);
+  }
+}
+
+/**
+ * Returns the process-wide job store configured by JOB_STORE
+ */
+export function getJobStore() {
+  if (!globalThis.__jobStore) {
+    globalThis.__jobStore = createJobStore();
+  }
+  return globalThis.__jobStore;
+}
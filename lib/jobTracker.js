@@ -0,0 +1,82 @@
+/**
+ * Follows a generation job from the browser
+ *
+ * Listens on /api/job-events/{jobId} (Server-Sent Events) and falls back to
+ * polling /api/job-status/{jobId} when EventSource is unavailable or the event
+ * stream cannot be opened. Resolves with the final job record and rejects when
+ * the job fails, is cancelled, is not found, or the timeout elapses.
+ */
+export function trackJob(jobId, { onUpdate = () => {}, pollInterval = 1000, timeout = 120000 } = {}) {
+  return new Promise((resolve, reject) => {
+    let job = { id: jobId };
+    let settled = false;
+    let source = null;
+    let pollTimer = null;
+
+    const finish = (error, result) => {
+      if (settled) return;
+      settled = true;
+      clearTimeout(timeoutTimer);
+      clearTimeout(pollTimer);
+      source?.close();
+      error ? reject(error) : resolve(result);
+    };
+
+    const apply = (update) => {
+      job = { ...job, ...update };
+      onUpdate(job);
+      if (job.status === 'completed') {
+        finish(null, job);
+      } else if (job.status === 'failed') {
+        finish(new Error(job.error || 'Generation failed'));
+      } else if (job.status === 'cancelled') {
+        finish(new Error('Generation was cancelled'));
+      }
+    };
+
+    const poll = async () => {
+      if (settled) return;
+      try {
+        const response = await fetch(`/api/job-status/${jobId}`);
+        const data = await response.json();
+        if (response.status === 404) {
+          const error = new Error(data.error || 'Job not found');
+          error.status = 404;
+          finish(error);
+          return;
+        }
+        if (response.ok) {
+          apply(data);
+        } else {
+          console.warn('⚠️ Status check failed:', data);
+        }
+      } catch (error) {
+        console.warn('⚠️ Status polling error:', error);
+      }
+      if (!settled) {
+        pollTimer = setTimeout(poll, pollInterval);
+      }
+    };
+
+    const timeoutTimer = setTimeout(() => {
+      finish(new Error('Generation timed out. Please try again.'));
+    }, timeout);
+
+    if (typeof EventSource === 'undefined') {
+      poll();
+      return;
+    }
+
+    source = new EventSource(`/api/job-events/${jobId}`);
+    ['snapshot', 'progress', 'complete', 'failed', 'cancelled'].forEach(type => {
+      source.addEventListener(type, (event) => apply(JSON.parse(event.data)));
+    });
+    source.onerror = () => {
+      // CONNECTING means the browser is already reconnecting with Last-Event-ID
+      if (source.readyState === EventSource.CLOSED && !settled) {
+        source = null;
+        poll();
+      }
+    };
+  });
+}
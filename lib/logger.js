@@ -1,54 +1,288 @@
+import fs from 'fs';
+import path from 'path';
+import { currentTrace } from './metrics';
 
 /**
  * Centralized logging utility
- * Provides structured logging with different levels
+ *
+ * Every record is one JSON line: {"time","level","msg", ...bound fields, ...fields}.
+ * - Records below LOG_LEVEL, or dropped by sampling, cost a comparison: fields
+ *   given as functions are only called for records that are written.
+ * - Lines are buffered and written once per tick (or when LOG_BUFFER_BYTES
+ *   fills up), honouring stream backpressure. With LOG_FILE set they go to a
+ *   file stream, written off the event loop and rotated at LOG_MAX_BYTES
+ *   (LOG_MAX_FILES kept); otherwise to stdout.
+ * - LOG_SAMPLE_RATES ("debug=0.1,info=0.5") keeps a fraction of each level,
+ *   and child loggers can sample their own hot paths harder.
+ * - logger.child({ jobId }) binds fields to every record; the current trace ID
+ *   (see lib/metrics.js) is added automatically.
+ * LOG_FORMAT=pretty prints "[time] [LEVEL] msg {fields}" lines for local use.
  */
 
-const LOG_LEVELS = {
-  DEBUG: 0,
-  INFO: 1,
-  WARN: 2,
-  ERROR: 3
+const LEVELS = { debug: 20, info: 30, warn: 40, error: 50 };
+
+const OPTIONS = {
+  level: process.env.LOG_LEVEL || (process.env.NODE_ENV === 'production' ? 'info' : 'debug'),
+  format: process.env.LOG_FORMAT || 'json',
+  file: process.env.LOG_FILE || null,
+  maxBytes: parseInt(process.env.LOG_MAX_BYTES || String(50 * 1024 * 1024), 10),
+  maxFiles: parseInt(process.env.LOG_MAX_FILES || '5', 10),
+  bufferBytes: parseInt(process.env.LOG_BUFFER_BYTES || String(64 * 1024), 10),
+  // Beyond this much unwritten output (a stalled destination) new records are dropped
+  maxPendingBytes: 16 * 1024 * 1024,
+  sampling: parseSampleRates(process.env.LOG_SAMPLE_RATES || '')
 };
 
-const CURRENT_LEVEL = process.env.NODE_ENV === 'production' ? LOG_LEVELS.INFO : LOG_LEVELS.DEBUG;
+function parseSampleRates(spec) {
+  return Object.fromEntries(spec.split(',').filter(Boolean).map(pair => {
+    const [level, rate] = pair.split('=');
+    return [level.trim(), Number(rate)];
+  }));
+}
+
+let lastMillis = 0;
+let lastIso = '';
+
+// Records often share a millisecond; reuse its ISO string
+function isoTime() {
+  const now = Date.now();
+  if (now !== lastMillis) {
+    lastMillis = now;
+    lastIso = new Date(now).toISOString();
+  }
+  return lastIso;
+}
 
-function formatMessage(level, message, meta = {}) {
-  const timestamp = new Date().toISOString();
-  const metaStr = Object.keys(meta).length > 0 ? JSON.stringify(meta) : '';
-  return `[${timestamp}] [${level}] ${message} ${metaStr}`;
+function serializeError(error) {
+  if (!(error instanceof Error)) return error;
+  return { message: error.message, name: error.name, code: error.code, stack: error.stack };
 }
 
-export const logger = {
-  debug(message, meta) {
-    if (CURRENT_LEVEL <= LOG_LEVELS.DEBUG) {
-      console.log(formatMessage('DEBUG', message, meta));
+// Calls lazy fields and converts errors; plain fields are used as given
+function resolveFields(fields) {
+  let resolved = fields;
+  for (const key in fields) {
+    const value = fields[key];
+    if (typeof value === 'function' || value instanceof Error) {
+      if (resolved === fields) resolved = { ...fields };
+      resolved[key] = serializeError(typeof value === 'function' ? value() : value);
     }
-  },
-  
-  info(message, meta) {
-    if (CURRENT_LEVEL <= LOG_LEVELS.INFO) {
-      console.log(formatMessage('INFO', message, meta));
+  }
+  return resolved;
+}
+
+// JSON object body ("a":1,"b":2) for splicing into a line, or ''
+function fragment(fields) {
+  const json = JSON.stringify(fields);
+  return json.length > 2 ? json.slice(1, -1) : '';
+}
+
+/**
+ * Buffered writer for log lines, with size-based rotation for files
+ */
+export class LogDestination {
+  constructor({ file = null, maxBytes, maxFiles, bufferBytes, maxPendingBytes } = OPTIONS) {
+    this.file = file;
+    this.maxBytes = maxBytes;
+    this.maxFiles = maxFiles;
+    this.bufferBytes = bufferBytes;
+    this.maxPendingBytes = maxPendingBytes;
+    this.chunks = [];
+    this.pendingBytes = 0;
+    this.scheduled = false;
+    this.writing = null;
+    this.dropped = 0;
+    this.stream = null;
+    this.fileBytes = 0;
+  }
+
+  write(line) {
+    if (this.pendingBytes > this.maxPendingBytes) {
+      this.dropped++;
+      return;
     }
-  },
-  
-  warn(message, meta) {
-    if (CURRENT_LEVEL <= LOG_LEVELS.WARN) {
-      console.warn(formatMessage('WARN', message, meta));
+    this.chunks.push(line);
+    this.pendingBytes += line.length;
+    if (this.pendingBytes >= this.bufferBytes) {
+      this.flush();
+    } else if (!this.scheduled) {
+      this.scheduled = true;
+      setImmediate(() => this.flush());
     }
-  },
-  
-  error(message, error, meta) {
-    if (CURRENT_LEVEL <= LOG_LEVELS.ERROR) {
-      const errorMeta = {
-        ...meta,
-        error: error?.message || error,
-        stack: error?.stack
-      };
-      console.error(formatMessage('ERROR', message, errorMeta));
+  }
+
+  /**
+   * Writes out everything buffered; resolves once the destination has taken it
+   */
+  flush() {
+    this.scheduled = false;
+    if (!this.writing) {
+      this.writing = this.drain().finally(() => { this.writing = null; });
     }
+    return this.writing;
   }
-};
+
+  async drain() {
+    while (this.chunks.length > 0) {
+      if (this.dropped > 0) {
+        this.chunks.push(JSON.stringify({ time: isoTime(), level: 'warn', msg: 'Log records dropped', dropped: this.dropped }) + '\n');
+        this.dropped = 0;
+      }
+      const data = this.chunks.join('');
+      this.chunks = [];
+      this.pendingBytes -= data.length;
+      try {
+        await this.writeOut(data);
+      } catch (error) {
+        process.stderr.write(`Log write failed: ${error.message}\n`);
+      }
+    }
+  }
+
+  async writeOut(data) {
+    if (!this.file) {
+      await writeToStream(process.stdout, data);
+      return;
+    }
+    if (!this.stream) {
+      await this.open();
+    } else if (this.fileBytes > 0 && this.fileBytes + Buffer.byteLength(data) > this.maxBytes) {
+      await this.rotate();
+    }
+    this.fileBytes += Buffer.byteLength(data);
+    await writeToStream(this.stream, data);
+  }
+
+  async open() {
+    await fs.promises.mkdir(path.dirname(this.file), { recursive: true });
+    this.fileBytes = await fs.promises.stat(this.file).then(stat => stat.size, () => 0);
+    this.stream = fs.createWriteStream(this.file, { flags: 'a' });
+    this.stream.on('error', error => process.stderr.write(`Log file error: ${error.message}\n`));
+  }
+
+  // app.log -> app.log.1 -> app.log.2 ..., dropping the oldest
+  async rotate() {
+    await new Promise(resolve => this.stream.end(resolve));
+    this.stream = null;
+    for (let i = this.maxFiles - 1; i >= 1; i--) {
+      await fs.promises.rename(`${this.file}.${i}`, `${this.file}.${i + 1}`).catch(() => {});
+    }
+    await fs.promises.rm(`${this.file}.${this.maxFiles}`, { force: true });
+    await fs.promises.rename(this.file, `${this.file}.1`).catch(() => {});
+    await this.open();
+  }
+
+  /**
+   * Last-resort synchronous write of whatever is still buffered (process exit)
+   */
+  flushSync() {
+    if (this.chunks.length === 0) return;
+    const data = this.chunks.join('');
+    this.chunks = [];
+    this.pendingBytes = 0;
+    try {
+      if (this.file) {
+        fs.appendFileSync(this.file, data);
+      } else {
+        fs.writeSync(1, data);
+      }
+    } catch {
+      // Nothing left to report to
+    }
+  }
+}
+
+function writeToStream(stream, data) {
+  return new Promise((resolve, reject) => {
+    const ok = stream.write(data, error => (error ? reject(error) : ok && resolve()));
+    if (!ok) stream.once('drain', resolve);
+  });
+}
+
+export class Logger {
+  constructor({ destination, level = OPTIONS.level, format = OPTIONS.format, sampling = OPTIONS.sampling, bindings = {} }) {
+    this.destination = destination;
+    this.levelName = level;
+    this.minLevel = LEVELS[level] ?? LEVELS.info;
+    this.format = format;
+    this.sampling = sampling;
+    this.bindings = bindings;
+    this.boundFragment = fragment(bindings);
+  }
+
+  /**
+   * Logger whose records all carry `bindings`. `options.sampling` overrides
+   * the per-level sample rates (e.g. { debug: 0.01 } for a hot path).
+   */
+  child(bindings, { sampling } = {}) {
+    return new Logger({
+      destination: this.destination,
+      level: this.levelName,
+      format: this.format,
+      sampling: sampling ? { ...this.sampling, ...sampling } : this.sampling,
+      bindings: { ...this.bindings, ...bindings }
+    });
+  }
+
+  enabled(level) {
+    if (LEVELS[level] < this.minLevel) return false;
+    const rate = this.sampling[level];
+    return rate === undefined || rate >= 1 || Math.random() < rate;
+  }
+
+  write(level, message, fields) {
+    if (!this.enabled(level)) return;
+    const resolved = fields ? resolveFields(fields) : null;
+    const traceId = 'traceId' in this.bindings ? null : currentTrace()?.traceId;
+
+    if (this.format === 'pretty') {
+      const meta = { ...this.bindings, ...(traceId && { traceId }), ...resolved };
+      const metaStr = Object.keys(meta).length > 0 ? ' ' + JSON.stringify(meta) : '';
+      this.destination.write(`[${isoTime()}] [${level.toUpperCase()}] ${message}${metaStr}\n`);
+      return;
+    }
+
+    let line = `{"time":"${isoTime()}","level":"${level}","msg":${JSON.stringify(message)}`;
+    if (this.boundFragment) line += ',' + this.boundFragment;
+    if (traceId) line += `,"traceId":${JSON.stringify(traceId)}`;
+    const own = resolved ? fragment(resolved) : '';
+    if (own) line += ',' + own;
+    this.destination.write(line + '}\n');
+  }
+
+  debug(message, fields) {
+    this.write('debug', message, fields);
+  }
+
+  info(message, fields) {
+    this.write('info', message, fields);
+  }
+
+  warn(message, fields) {
+    this.write('warn', message, fields);
+  }
+
+  /**
+   * error(message, error, fields) keeps the original signature; the error is
+   * logged as { message, name, code, stack }
+   */
+  error(message, error, fields) {
+    this.write('error', message, error === undefined ? fields : { ...fields, error });
+  }
+
+  flush() {
+    return this.destination.flush();
+  }
+}
+
+function createRootLogger() {
+  const destination = new LogDestination(OPTIONS);
+  process.once('exit', () => destination.flushSync());
+  return new Logger({ destination });
+}
+
+// One destination per process, so Next.js dev reloads don't open the log file twice
+export const logger = globalThis.__rootLogger || (globalThis.__rootLogger = createRootLogger());
 
 /**
  * User-friendly error messages mapper
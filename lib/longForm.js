@@ -0,0 +1,162 @@
+import { getWorkerPool } from './pythonWorkerPool';
+import { getScheduler, mapWithConcurrency } from './scheduler';
+import { validateBlogContent } from './validation';
+import { span } from './metrics';
+import { hedged, isAbortError } from './deadline';
+import { logger } from './logger';
+
+/**
+ * Long-form generation: outline first, then every part in parallel
+ *
+ * Asking for a whole 3000-word post in one call makes latency grow with the
+ * length, and long JSON answers often fail to parse. For posts of at least
+ * LONG_FORM_MIN_WORDS words, one call plans the post (title, section headings
+ * with key points, meta description, image prompt). The introduction, each
+ * section and the conclusion are then written as separate plain-text calls,
+ * at most LONG_FORM_CONCURRENCY at a time per post (never more than the text
+ * stage's own concurrency). A part that fails twice is replaced by a
+ * placeholder and listed in `partialFailures`, so a bad call costs one
+ * section instead of the whole post.
+ *
+ * Long form makes several calls where the single-call path makes one, so it
+ * only pays off when the text stage's rate limit can start them promptly.
+ * `shouldUseLongForm` keeps a post on the single call when the extra calls
+ * would wait more than LONG_FORM_MAX_RATE_WAIT_MS for rate-limit tokens
+ * (`yarn bench:longform` compares both paths).
+ */
+
+export const LONG_FORM_MIN_WORDS = parseInt(process.env.LONG_FORM_MIN_WORDS || '1500', 10);
+// 0: as many as the text stage runs at once
+const CONCURRENCY = parseInt(process.env.LONG_FORM_CONCURRENCY || '0', 10);
+const MAX_RATE_WAIT = parseInt(process.env.LONG_FORM_MAX_RATE_WAIT_MS || '5000', 10);
+const WORDS_PER_SECTION = 350;
+const PART_ATTEMPTS = 2;
+const OUTLINE_TIMEOUT = 60000;
+
+const log = logger.child({ component: 'long-form' });
+
+/**
+ * Number of main sections for a post of `wordCount` words (3 to 12)
+ */
+export function planSectionCount(wordCount) {
+  return Math.min(12, Math.max(3, Math.round((wordCount * 0.85) / WORDS_PER_SECTION)));
+}
+
+/**
+ * Upstream calls a long-form post of `wordCount` words makes: the outline,
+ * the introduction, each section and the conclusion
+ */
+export function planCallCount(wordCount) {
+  return planSectionCount(wordCount) + 3;
+}
+
+/**
+ * Whether a post of `wordCount` words should be written as long form right
+ * now: it must be long enough, and the text stage's rate limit must be able
+ * to start all of its calls within LONG_FORM_MAX_RATE_WAIT_MS of when a
+ * single call would start
+ */
+export function shouldUseLongForm(wordCount) {
+  if (wordCount < LONG_FORM_MIN_WORDS) return false;
+  const text = getScheduler().stage('text');
+  const extraWait = text.rateWait(planCallCount(wordCount)) - text.rateWait(1);
+  if (extraWait > MAX_RATE_WAIT) {
+    log.debug('Text stage rate limit too tight for long form, using a single call', { wordCount, extraWait });
+    return false;
+  }
+  return true;
+}
+
+// Introduction and conclusion get a small share each; sections split the rest
+function planParts(outline, wordCount) {
+  const introWords = Math.max(80, Math.round(wordCount * 0.08));
+  const conclusionWords = Math.max(80, Math.round(wordCount * 0.07));
+  const sectionWords = Math.round((wordCount - introWords - conclusionWords) / outline.sections.length);
+  return [
+    { part: 'introduction', wordCount: introWords },
+    ...outline.sections.map((section, index) => ({
+      part: 'section',
+      index,
+      heading: section.heading,
+      keyPoints: Array.isArray(section.keyPoints) ? section.keyPoints : [],
+      wordCount: sectionWords
+    })),
+    { part: 'conclusion', wordCount: conclusionWords }
+  ];
+}
+
+function partLabel(part) {
+  return part.part === 'section' ? `section ${part.index + 1} (${part.heading})` : part.part;
+}
+
+/**
+ * Generates a long post part by part. `onEvent` receives the same events as
+ * the streaming single-call path ({ type: 'field' | 'section', ... }) as each
+ * part is finished. Throws when the outline itself cannot be produced.
+ */
+export async function generateLongFormPost({ title, topic, keywords = [], wordCount, tone }, { priority = 0, onEvent = () => {} } = {}) {
+  const text = getScheduler().stage('text');
+  const pool = getWorkerPool();
+  const call = (type, params, options = {}) => hedged(type, signal => text.run(
+    () => pool.run(type, params, { ...options, signal }),
+    { priority, signal }
+  ));
+  const brief = { title, topic, keywords, tone };
+
+  const outline = await span('longform.outline', () => call('outline', {
+    ...brief,
+    wordCount,
+    sectionCount: planSectionCount(wordCount)
+  }, { timeout: OUTLINE_TIMEOUT }));
+  ['title', 'metaDescription', 'imagePrompt'].forEach(field => onEvent({ type: 'field', field, value: outline[field] }));
+
+  const headings = outline.sections.map(section => section.heading);
+  const partialFailures = [];
+
+  const writePart = async part => {
+    let lastError;
+    for (let attempt = 1; attempt <= PART_ATTEMPTS; attempt++) {
+      try {
+        const { content } = await call('part', { ...brief, title: outline.title, headings, ...part });
+        return content;
+      } catch (error) {
+        // Cancelled or out of time: the whole post stops, no retry or placeholder
+        if (isAbortError(error)) throw error;
+        lastError = error;
+        log.warn('Long-form part failed', { part: partLabel(part), attempt, error });
+      }
+    }
+    partialFailures.push({ part: partLabel(part), error: lastError.message });
+    return 'This part could not be generated. Select it in the editor and use AI Edit to write it.';
+  };
+
+  const parts = planParts(outline, wordCount);
+  const concurrency = Math.min(CONCURRENCY || text.concurrency, text.concurrency);
+  const contents = await span('longform.parts', () => mapWithConcurrency(parts, concurrency, async part => {
+    const content = await span('longform.part', () => writePart(part), { part: part.part });
+    if (part.part === 'section') {
+      onEvent({ type: 'section', index: part.index, section: { heading: part.heading, content } });
+    } else {
+      onEvent({ type: 'field', field: part.part, value: content });
+    }
+    return content;
+  }), { parts: parts.length });
+
+  const post = {
+    title: outline.title,
+    introduction: contents[0],
+    sections: parts.slice(1, -1).map((part, i) => ({ heading: part.heading, content: contents[i + 1] })),
+    conclusion: contents[contents.length - 1],
+    metaDescription: outline.metaDescription,
+    imagePrompt: outline.imagePrompt
+  };
+
+  const validation = validateBlogContent(post);
+  if (!validation.valid) {
+    throw new Error(`Long-form post is incomplete: ${validation.errors.join(', ')}`);
+  }
+  if (partialFailures.length > 0) {
+    post.partialFailures = partialFailures;
+  }
+  return post;
+}
@@ -0,0 +1,246 @@
+import { AsyncLocalStorage } from 'async_hooks';
+import crypto from 'crypto';
+
+/**
+ * Metrics and tracing
+ *
+ * Counters and histograms live in process memory and are rendered in the
+ * Prometheus text format by GET /api/metrics. Observing is a Map lookup plus
+ * a short bucket scan, so the instrumentation stays on in production.
+ * Values that components already track (cache hit counts, queue depths) are
+ * copied from their stats() at scrape time instead.
+ *
+ * Tracing: runWithTrace(id, fn) binds a trace ID (the job ID for generation
+ * jobs, X-Request-Id for plain requests) to everything fn does asynchronously.
+ * span() times a piece of work under the current trace; the Python worker
+ * receives the ID with each job and reports its own sub-timings, which are
+ * added to the trace as child spans.
+ */
+
+const DEFAULT_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120];
+const MAX_SPANS_PER_TRACE = 200;
+
+function escapeLabel(value) {
+  return String(value).replace(/\\/g, '\\\\').replace(/"/g, '\\"').replace(/\n/g, '\\n');
+}
+
+function formatLabels(names, values, extra = '') {
+  const pairs = names.map((name, i) => `${name}="${escapeLabel(values[i])}"`);
+  if (extra) pairs.push(extra);
+  return pairs.length > 0 ? `{${pairs.join(',')}}` : '';
+}
+
+class Metric {
+  constructor(name, help, labelNames = []) {
+    this.name = name;
+    this.help = help;
+    this.labelNames = labelNames;
+    this.series = new Map();
+  }
+
+  values(labels) {
+    return this.labelNames.map(name => labels[name] ?? '');
+  }
+
+  entry(labels, create) {
+    const values = this.values(labels);
+    const key = values.join('\u0000');
+    let entry = this.series.get(key);
+    if (!entry) {
+      entry = create(values);
+      this.series.set(key, entry);
+    }
+    return entry;
+  }
+
+  header() {
+    return [`# HELP ${this.name} ${this.help}`, `# TYPE ${this.name} ${this.type}`];
+  }
+}
+
+export class Counter extends Metric {
+  get type() {
+    return 'counter';
+  }
+
+  inc(labels = {}, value = 1) {
+    this.entry(labels, values => ({ values, value: 0 })).value += value;
+  }
+
+  /**
+   * For totals a component already counts itself (copied at scrape time)
+   */
+  set(labels, value) {
+    this.entry(labels, values => ({ values, value: 0 })).value = value;
+  }
+
+  render() {
+    const lines = this.header();
+    this.series.forEach(({ values, value }) => {
+      lines.push(`${this.name}${formatLabels(this.labelNames, values)} ${value}`);
+    });
+    return lines;
+  }
+}
+
+export class Gauge extends Counter {
+  get type() {
+    return 'gauge';
+  }
+}
+
+export class Histogram extends Metric {
+  constructor(name, help, labelNames = [], buckets = DEFAULT_BUCKETS) {
+    super(name, help, labelNames);
+    this.buckets = buckets;
+  }
+
+  get type() {
+    return 'histogram';
+  }
+
+  /**
+   * Records one observation, in seconds
+   */
+  observe(labels, seconds) {
+    const entry = this.entry(labels, values => ({
+      values,
+      counts: new Array(this.buckets.length + 1).fill(0),
+      sum: 0,
+      count: 0
+    }));
+    let i = 0;
+    while (i < this.buckets.length && seconds > this.buckets[i]) i++;
+    entry.counts[i]++;
+    entry.sum += seconds;
+    entry.count++;
+  }
+
+  /**
+   * Returns a function that observes the time since startTimer was called
+   */
+  startTimer(labels = {}) {
+    const started = performance.now();
+    return (extraLabels = {}) => {
+      const seconds = (performance.now() - started) / 1000;
+      this.observe({ ...labels, ...extraLabels }, seconds);
+      return seconds;
+    };
+  }
+
+  render() {
+    const lines = this.header();
+    this.series.forEach(({ values, counts, sum, count }) => {
+      let cumulative = 0;
+      this.buckets.forEach((bound, i) => {
+        cumulative += counts[i];
+        lines.push(`${this.name}_bucket${formatLabels(this.labelNames, values, `le="${bound}"`)} ${cumulative}`);
+      });
+      lines.push(`${this.name}_bucket${formatLabels(this.labelNames, values, 'le="+Inf"')} ${count}`);
+      lines.push(`${this.name}_sum${formatLabels(this.labelNames, values)} ${Number(sum.toFixed(6))}`);
+      lines.push(`${this.name}_count${formatLabels(this.labelNames, values)} ${count}`);
+    });
+    return lines;
+  }
+}
+
+export class MetricsRegistry {
+  constructor() {
+    this.metrics = new Map();
+  }
+
+  register(MetricClass, name, help, labelNames, ...rest) {
+    if (!this.metrics.has(name)) {
+      this.metrics.set(name, new MetricClass(name, help, labelNames, ...rest));
+    }
+    return this.metrics.get(name);
+  }
+
+  counter(name, help, labelNames) {
+    return this.register(Counter, name, help, labelNames);
+  }
+
+  gauge(name, help, labelNames) {
+    return this.register(Gauge, name, help, labelNames);
+  }
+
+  histogram(name, help, labelNames, buckets) {
+    return this.register(Histogram, name, help, labelNames, buckets);
+  }
+
+  render() {
+    const lines = [];
+    this.metrics.forEach(metric => {
+      if (metric.series.size > 0) lines.push(...metric.render());
+    });
+    return lines.join('\n') + '\n';
+  }
+}
+
+/**
+ * Returns the process-wide metrics registry
+ */
+export function getMetrics() {
+  if (!globalThis.__metricsRegistry) {
+    globalThis.__metricsRegistry = new MetricsRegistry();
+  }
+  return globalThis.__metricsRegistry;
+}
+
+// Stored on globalThis like the registry, so dev reloads keep one context
+const traceStorage = globalThis.__traceStorage || (globalThis.__traceStorage = new AsyncLocalStorage());
+
+export function newTraceId() {
+  return crypto.randomUUID();
+}
+
+/**
+ * Runs `fn` with `traceId` as the current trace
+ */
+export function runWithTrace(traceId, fn) {
+  return traceStorage.run({ traceId, startedAt: performance.now(), spans: [] }, fn);
+}
+
+/**
+ * The current trace ({ traceId, startedAt, spans }), or null outside one
+ */
+export function currentTrace() {
+  return traceStorage.getStore() || null;
+}
+
+/**
+ * Adds a finished span to the current trace
+ */
+export function recordSpan(name, durationMs, attributes = {}, startMs) {
+  const trace = currentTrace();
+  if (!trace || trace.spans.length >= MAX_SPANS_PER_TRACE) return;
+  trace.spans.push({
+    name,
+    startMs: Math.round(startMs ?? performance.now() - trace.startedAt - durationMs),
+    durationMs: Math.round(durationMs * 100) / 100,
+    ...attributes
+  });
+}
+
+/**
+ * Times `fn` as a span of the current trace and in blogstudio_span_duration_seconds
+ */
+export async function span(name, fn, attributes = {}) {
+  const started = performance.now();
+  let status = 'ok';
+  try {
+    return await fn();
+  } catch (error) {
+    status = 'error';
+    throw error;
+  } finally {
+    const durationMs = performance.now() - started;
+    spanHistogram().observe({ span: name, status }, durationMs / 1000);
+    const trace = currentTrace();
+    if (trace) recordSpan(name, durationMs, { status, ...attributes }, started - trace.startedAt);
+  }
+}
+
+function spanHistogram() {
+  return getMetrics().histogram('blogstudio_span_duration_seconds', 'Duration of traced spans', ['span', 'status']);
+}
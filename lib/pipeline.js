@@ -0,0 +1,80 @@
+import { getMetrics, recordSpan } from './metrics';
+
+/**
+ * Minimal DAG executor for multi-stage generation jobs
+ *
+ * Stages are declared as { name: { deps: [...], run: async results => value } }.
+ * Each stage starts as soon as all of its dependencies have succeeded, so
+ * independent branches run concurrently and the total time approaches the
+ * longest path rather than the sum of all stages. A failed stage does not
+ * stop unrelated branches; stages that depend on it are skipped.
+ */
+
+const stageSeconds = getMetrics().histogram('blogstudio_pipeline_stage_duration_seconds', 'Pipeline stage durations', ['stage', 'status']);
+
+/**
+ * Runs the pipeline and resolves once every stage has finished or been skipped.
+ * `onStageDone(name, timing, results)` is awaited after each stage.
+ * Resolves to { results, errors: [{ step, error }], timings, duration }.
+ */
+export async function runPipeline(stages, { onStageDone = () => {} } = {}) {
+  const startedAt = Date.now();
+  const results = {};
+  const errors = [];
+  const timings = {};
+  const promises = new Map();
+  const visiting = new Set();
+  // Nothing runs until the whole graph has been checked for unknown stages and cycles
+  let openGate;
+  const gate = new Promise(resolve => { openGate = resolve; });
+
+  async function execute(name, stage, dependencies) {
+    await gate;
+    const succeeded = await Promise.all(dependencies);
+
+    if (succeeded.includes(false)) {
+      timings[name] = { status: 'skipped' };
+      await onStageDone(name, timings[name], results);
+      return false;
+    }
+
+    const stageStart = Date.now();
+    let ok = true;
+    try {
+      results[name] = await stage.run(results);
+    } catch (error) {
+      ok = false;
+      errors.push({ step: name, error: error.message });
+    }
+    timings[name] = {
+      status: ok ? 'completed' : 'failed',
+      startMs: stageStart - startedAt,
+      durationMs: Date.now() - stageStart
+    };
+    stageSeconds.observe({ stage: name, status: timings[name].status }, timings[name].durationMs / 1000);
+    recordSpan(`stage.${name}`, timings[name].durationMs, { status: timings[name].status });
+    await onStageDone(name, timings[name], results);
+    return ok;
+  }
+
+  function start(name) {
+    if (promises.has(name)) return promises.get(name);
+    const stage = stages[name];
+    if (!stage) throw new Error(`Unknown pipeline stage: ${name}`);
+    if (visiting.has(name)) throw new Error(`Pipeline has a dependency cycle at stage: ${name}`);
+
+    visiting.add(name);
+    const dependencies = (stage.deps || []).map(start);
+    visiting.delete(name);
+
+    const promise = execute(name, stage, dependencies);
+    promises.set(name, promise);
+    return promise;
+  }
+
+  Object.keys(stages).forEach(start);
+  openGate();
+  await Promise.all(promises.values());
+
+  return { results, errors, timings, duration: Date.now() - startedAt };
+}
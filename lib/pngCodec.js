@@ -0,0 +1,377 @@
+import zlib from 'zlib';
+import { promisify } from 'util';
+
+/**
+ * Small PNG codec used when sharp is not installed
+ *
+ * Handles what Imagen produces (8-bit greyscale/RGB with or without alpha,
+ * non-interlaced): decode, area-averaging downscale, reduction of RGB images
+ * to a 256-colour palette (median cut with Floyd-Steinberg dithering, like
+ * sharp's `palette` PNG option) and re-encode with per-row adaptive
+ * filtering. Deflate runs at level 6 (libpng's default, as level 9 costs
+ * about five times the CPU for a few percent). The pixel work is CPU-bound,
+ * so lib/imageVariants.js runs it on a worker thread.
+ */
+
+const inflate = promisify(zlib.inflate);
+const deflate = promisify(zlib.deflate);
+
+const SIGNATURE = Buffer.from([0x89, 0x50, 0x4e, 0x47, 0x0d, 0x0a, 0x1a, 0x0a]);
+const CHANNELS = { 0: 1, 2: 3, 4: 2, 6: 4 };
+const COLOR_TYPES = { 1: 0, 2: 4, 3: 2, 4: 6 };
+const INDEXED = 3;
+
+// CRC-32 as used by PNG chunks
+const CRC_TABLE = new Int32Array(256).map((_, n) => {
+  let c = n;
+  for (let k = 0; k < 8; k++) c = c & 1 ? 0xedb88320 ^ (c >>> 1) : c >>> 1;
+  return c;
+});
+
+function crc32(buffer) {
+  let crc = -1;
+  for (let i = 0; i < buffer.length; i++) crc = CRC_TABLE[(crc ^ buffer[i]) & 0xff] ^ (crc >>> 8);
+  return (crc ^ -1) >>> 0;
+}
+
+function paeth(a, b, c) {
+  const p = a + b - c;
+  const pa = Math.abs(p - a);
+  const pb = Math.abs(p - b);
+  const pc = Math.abs(p - c);
+  if (pa <= pb && pa <= pc) return a;
+  return pb <= pc ? b : c;
+}
+
+/**
+ * Decodes a PNG into { width, height, channels, pixels }
+ */
+export async function decodePng(buffer) {
+  if (!buffer.subarray(0, 8).equals(SIGNATURE)) {
+    throw new Error('Not a PNG image');
+  }
+
+  let offset = 8;
+  let header = null;
+  const idat = [];
+  while (offset < buffer.length) {
+    const length = buffer.readUInt32BE(offset);
+    const type = buffer.toString('latin1', offset + 4, offset + 8);
+    const data = buffer.subarray(offset + 8, offset + 8 + length);
+    if (type === 'IHDR') {
+      header = {
+        width: data.readUInt32BE(0),
+        height: data.readUInt32BE(4),
+        bitDepth: data[8],
+        colorType: data[9],
+        interlace: data[12]
+      };
+    } else if (type === 'IDAT') {
+      idat.push(data);
+    } else if (type === 'IEND') {
+      break;
+    }
+    offset += length + 12;
+  }
+
+  const channels = header && CHANNELS[header.colorType];
+  if (!header || header.bitDepth !== 8 || !channels || header.interlace !== 0) {
+    throw new Error('Unsupported PNG format (only 8-bit, non-interlaced, non-palette images)');
+  }
+
+  const { width, height } = header;
+  const raw = await inflate(Buffer.concat(idat));
+  const stride = width * channels;
+  const pixels = Buffer.alloc(stride * height);
+
+  for (let y = 0; y < height; y++) {
+    const filter = raw[y * (stride + 1)];
+    const line = raw.subarray(y * (stride + 1) + 1, (y + 1) * (stride + 1));
+    const row = y * stride;
+    const prev = row - stride;
+    for (let x = 0; x < stride; x++) {
+      const a = x >= channels ? pixels[row + x - channels] : 0;
+      const b = y > 0 ? pixels[prev + x] : 0;
+      const c = x >= channels && y > 0 ? pixels[prev + x - channels] : 0;
+      let value = line[x];
+      switch (filter) {
+        case 1: value += a; break;
+        case 2: value += b; break;
+        case 3: value += (a + b) >> 1; break;
+        case 4: value += paeth(a, b, c); break;
+      }
+      pixels[row + x] = value;
+    }
+  }
+
+  return { width, height, channels, pixels };
+}
+
+/**
+ * Encodes { width, height, channels, pixels } as a PNG, picking the filter per
+ * row that minimises the sum of absolute residuals (the libpng heuristic).
+ * An image with a `palette` (from quantizeImage) is written as indexed colour,
+ * unfiltered as libpng recommends for palette images.
+ */
+export async function encodePng({ width, height, channels, pixels, palette }) {
+  const stride = width * channels;
+  const filtered = Buffer.alloc((stride + 1) * height);
+  const candidates = Array.from({ length: 5 }, () => Buffer.alloc(stride));
+
+  for (let y = 0; y < height; y++) {
+    if (palette) {
+      pixels.copy(filtered, y * (stride + 1) + 1, y * stride, (y + 1) * stride);
+      continue;
+    }
+    const row = y * stride;
+    const prev = row - stride;
+    const scores = [0, 0, 0, 0, 0];
+    for (let x = 0; x < stride; x++) {
+      const value = pixels[row + x];
+      const a = x >= channels ? pixels[row + x - channels] : 0;
+      const b = y > 0 ? pixels[prev + x] : 0;
+      const c = x >= channels && y > 0 ? pixels[prev + x - channels] : 0;
+      const r0 = value;
+      const r1 = (value - a) & 0xff;
+      const r2 = (value - b) & 0xff;
+      const r3 = (value - ((a + b) >> 1)) & 0xff;
+      const r4 = (value - paeth(a, b, c)) & 0xff;
+      candidates[0][x] = r0;
+      candidates[1][x] = r1;
+      candidates[2][x] = r2;
+      candidates[3][x] = r3;
+      candidates[4][x] = r4;
+      scores[0] += r0 < 128 ? r0 : 256 - r0;
+      scores[1] += r1 < 128 ? r1 : 256 - r1;
+      scores[2] += r2 < 128 ? r2 : 256 - r2;
+      scores[3] += r3 < 128 ? r3 : 256 - r3;
+      scores[4] += r4 < 128 ? r4 : 256 - r4;
+    }
+    const best = scores.indexOf(Math.min(...scores));
+    filtered[y * (stride + 1)] = best;
+    candidates[best].copy(filtered, y * (stride + 1) + 1);
+  }
+
+  const header = Buffer.alloc(13);
+  header.writeUInt32BE(width, 0);
+  header.writeUInt32BE(height, 4);
+  header[8] = 8;
+  header[9] = palette ? INDEXED : COLOR_TYPES[channels];
+
+  const chunk = (type, data) => {
+    const body = Buffer.concat([Buffer.from(type, 'latin1'), data]);
+    const length = Buffer.alloc(4);
+    const crc = Buffer.alloc(4);
+    length.writeUInt32BE(data.length);
+    crc.writeUInt32BE(crc32(body));
+    return Buffer.concat([length, body, crc]);
+  };
+
+  return Buffer.concat([
+    SIGNATURE,
+    chunk('IHDR', header),
+    ...(palette ? [chunk('PLTE', palette)] : []),
+    chunk('IDAT', await deflate(filtered, { level: 6, memLevel: 9 })),
+    chunk('IEND', Buffer.alloc(0))
+  ]);
+}
+
+// Source spans and weights for each output position when shrinking `from` to `to`
+function contributions(from, to) {
+  const scale = from / to;
+  return Array.from({ length: to }, (_, i) => {
+    const start = i * scale;
+    const end = start + scale;
+    const spans = [];
+    for (let s = Math.floor(start); s < Math.min(from, Math.ceil(end)); s++) {
+      spans.push([s, (Math.min(end, s + 1) - Math.max(start, s)) / scale]);
+    }
+    return spans;
+  });
+}
+
+/**
+ * Downscales to `width` (keeping the aspect ratio) by area averaging
+ */
+export function resizeImage({ width, height, channels, pixels }, targetWidth) {
+  const targetHeight = Math.max(1, Math.round((height * targetWidth) / width));
+  const columns = contributions(width, targetWidth);
+  const rows = contributions(height, targetHeight);
+
+  // Horizontal pass into floats, then vertical pass back to bytes
+  const horizontal = new Float32Array(targetWidth * height * channels);
+  for (let y = 0; y < height; y++) {
+    for (let x = 0; x < targetWidth; x++) {
+      for (const [sx, weight] of columns[x]) {
+        const source = (y * width + sx) * channels;
+        const target = (y * targetWidth + x) * channels;
+        for (let c = 0; c < channels; c++) horizontal[target + c] += pixels[source + c] * weight;
+      }
+    }
+  }
+
+  const output = Buffer.alloc(targetWidth * targetHeight * channels);
+  for (let y = 0; y < targetHeight; y++) {
+    for (let x = 0; x < targetWidth; x++) {
+      const target = (y * targetWidth + x) * channels;
+      for (let c = 0; c < channels; c++) {
+        let sum = 0;
+        for (const [sy, weight] of rows[y]) sum += horizontal[(sy * targetWidth + x) * channels + c] * weight;
+        output[target + c] = Math.min(255, Math.round(sum));
+      }
+    }
+  }
+
+  return { width: targetWidth, height: targetHeight, channels, pixels: output };
+}
+
+// Colours are counted in a histogram of 5 bits per channel
+const BIN_BITS = 5;
+const BINS = 1 << (3 * BIN_BITS);
+
+function binOf(r, g, b) {
+  return ((r >> 3) << 10) | ((g >> 3) << 5) | (b >> 3);
+}
+
+/**
+ * Median cut over the colour histogram: repeatedly splits the box with the
+ * most pixels times its widest channel range at the pixel median of that
+ * channel. Returns up to `colors` RGB triples.
+ */
+function medianCut(counts, sums, colors) {
+  const used = [];
+  for (let bin = 0; bin < BINS; bin++) if (counts[bin] > 0) used.push(bin);
+  const channel = (bin, c) => (bin >> (10 - 5 * c)) & 31;
+
+  const describe = bins => {
+    let population = 0;
+    const min = [31, 31, 31];
+    const max = [0, 0, 0];
+    for (const bin of bins) {
+      population += counts[bin];
+      for (let c = 0; c < 3; c++) {
+        const value = channel(bin, c);
+        if (value < min[c]) min[c] = value;
+        if (value > max[c]) max[c] = value;
+      }
+    }
+    const ranges = [0, 1, 2].map(c => max[c] - min[c]);
+    const axis = ranges.indexOf(Math.max(...ranges));
+    return { bins, population, axis, score: ranges[axis] === 0 ? 0 : population * ranges[axis] };
+  };
+
+  const boxes = [describe(used)];
+  while (boxes.length < colors) {
+    let target = 0;
+    boxes.forEach((box, index) => { if (box.score > boxes[target].score) target = index; });
+    const box = boxes[target];
+    if (box.score === 0) break;
+
+    const sorted = box.bins.sort((a, b) => channel(a, box.axis) - channel(b, box.axis));
+    let seen = 0;
+    let cut = 1;
+    for (; cut < sorted.length - 1; cut++) {
+      seen += counts[sorted[cut - 1]];
+      if (seen >= box.population / 2) break;
+    }
+    // Never split two bins with the same value on the axis into different boxes
+    while (cut < sorted.length - 1 && channel(sorted[cut], box.axis) === channel(sorted[cut - 1], box.axis)) cut++;
+    if (channel(sorted[cut], box.axis) === channel(sorted[cut - 1], box.axis)) {
+      cut = 1;
+      while (channel(sorted[cut], box.axis) === channel(sorted[0], box.axis)) cut++;
+    }
+    boxes.splice(target, 1, describe(sorted.slice(0, cut)), describe(sorted.slice(cut)));
+  }
+
+  return boxes.map(({ bins }) => {
+    let n = 0;
+    const total = [0, 0, 0];
+    for (const bin of bins) {
+      n += counts[bin];
+      for (let c = 0; c < 3; c++) total[c] += sums[bin * 3 + c];
+    }
+    return total.map(sum => Math.round(sum / n));
+  });
+}
+
+function clampByte(value) {
+  return value < 0 ? 0 : value > 255 ? 255 : Math.round(value);
+}
+
+function spread(current, next, offset, channel, delta) {
+  current[offset + 3 + channel] += delta * 7 / 16;
+  next[offset - 3 + channel] += delta * 3 / 16;
+  next[offset + channel] += delta * 5 / 16;
+  next[offset + 3 + channel] += delta / 16;
+}
+
+/**
+ * Reduces an RGB image to at most `colors` colours. Returns an indexed image
+ * ({ channels: 1, pixels: palette indices, palette: RGB bytes }) for
+ * encodePng, or null for greyscale or transparent images, which are kept as
+ * they are.
+ */
+export function quantizeImage({ width, height, channels, pixels }, colors = 256) {
+  if (channels !== 3) return null;
+
+  const counts = new Uint32Array(BINS);
+  const sums = new Float64Array(BINS * 3);
+  for (let i = 0; i < pixels.length; i += 3) {
+    const bin = binOf(pixels[i], pixels[i + 1], pixels[i + 2]);
+    counts[bin]++;
+    sums[bin * 3] += pixels[i];
+    sums[bin * 3 + 1] += pixels[i + 1];
+    sums[bin * 3 + 2] += pixels[i + 2];
+  }
+  const palette = medianCut(counts, sums, colors);
+
+  // Nearest palette entry per histogram bin, found on first use
+  const nearest = new Int16Array(BINS).fill(-1);
+  const lookup = (r, g, b) => {
+    const bin = binOf(r, g, b);
+    if (nearest[bin] === -1) {
+      let best = 0;
+      let bestDistance = Infinity;
+      palette.forEach(([pr, pg, pb], index) => {
+        const distance = (pr - r) ** 2 + (pg - g) ** 2 + (pb - b) ** 2;
+        if (distance < bestDistance) {
+          bestDistance = distance;
+          best = index;
+        }
+      });
+      nearest[bin] = best;
+    }
+    return nearest[bin];
+  };
+
+  // Floyd-Steinberg: spread each pixel's error over its unvisited neighbours
+  const indices = Buffer.alloc(width * height);
+  let current = new Float32Array((width + 2) * 3);
+  let next = new Float32Array((width + 2) * 3);
+  for (let y = 0; y < height; y++) {
+    for (let x = 0; x < width; x++) {
+      const source = (y * width + x) * 3;
+      const error = (x + 1) * 3;
+      const r = clampByte(pixels[source] + current[error]);
+      const g = clampByte(pixels[source + 1] + current[error + 1]);
+      const b = clampByte(pixels[source + 2] + current[error + 2]);
+      const index = lookup(r, g, b);
+      indices[y * width + x] = index;
+      const color = palette[index];
+      spread(current, next, error, 0, r - color[0]);
+      spread(current, next, error, 1, g - color[1]);
+      spread(current, next, error, 2, b - color[2]);
+    }
+    [current, next] = [next, current.fill(0)];
+  }
+
+  return { width, height, channels: 1, pixels: indices, palette: Buffer.from(palette.flat()) };
+}
+
+/**
+ * Widths to produce for an image `originalWidth` pixels wide: the requested
+ * ones that are narrower, plus the original width
+ */
+export function targetWidths(originalWidth, widths) {
+  return [...new Set([...widths.filter(width => width < originalWidth), originalWidth])].sort((a, b) => a - b);
+}
@@ -0,0 +1,32 @@
+import { parentPort } from 'worker_threads';
+// With its extension: node loads this file itself when it starts the thread
+import { decodePng, encodePng, resizeImage, quantizeImage, targetWidths } from './pngCodec.js';
+
+/**
+ * Worker thread that builds the PNG variants of a hero image when sharp is
+ * not installed (see lib/imageVariants.js)
+ *
+ * Messages in:  { id, input, widths }
+ * Messages out: { id, variants: [{ width, height, buffer }] } or { id, error }
+ */
+
+async function pngVariants(input, widths) {
+  const image = await decodePng(input);
+  const variants = [];
+  for (const width of targetWidths(image.width, widths)) {
+    const resized = width === image.width ? image : resizeImage(image, width);
+    const encoded = await encodePng(quantizeImage(resized) || resized);
+    // A greyscale or transparent original may not get any smaller
+    const buffer = width === image.width && encoded.length >= input.length ? input : encoded;
+    variants.push({ width: resized.width, height: resized.height, buffer });
+  }
+  return variants;
+}
+
+parentPort.on('message', async ({ id, input, widths }) => {
+  try {
+    parentPort.postMessage({ id, variants: await pngVariants(Buffer.from(input), widths) });
+  } catch (error) {
+    parentPort.postMessage({ id, error: error.message });
+  }
+});
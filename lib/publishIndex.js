@@ -0,0 +1,156 @@
+import crypto from 'crypto';
+import fs from 'fs';
+import path from 'path';
+import { writeFileAtomic } from './assetStore';
+import { logger } from './logger';
+
+/**
+ * Record of what the app last wrote to each Storyblok story
+ *
+ * Every create or update through lib/storyblok.js stores the story ID, slug
+ * and a hash of the normalized content. Publishing a post whose hash matches
+ * its record is then answered locally, without a Management API call, and a
+ * post that changed is sent as an update of the story it was written to
+ * instead of as a new story. The index is a small JSON file, written
+ * atomically like the asset index.
+ */
+
+const DEFAULT_OPTIONS = {
+  indexPath: process.env.PUBLISH_INDEX || path.join(process.cwd(), '.cache', 'publish', 'index.json')
+};
+
+const log = logger.child({ component: 'publish-index' });
+
+function normalizeText(value) {
+  return typeof value === 'string' ? value.replace(/\r\n/g, '\n').trim() : '';
+}
+
+/**
+ * Hash of the fields of a BlogPost story content that the author controls.
+ * `body` is derived from the other fields and `published_date` is stamped on
+ * every write, so neither counts as a change.
+ */
+export function storyContentHash(name, slug, content) {
+  const normalized = {
+    name: normalizeText(name),
+    slug,
+    title: normalizeText(content.title),
+    introduction: normalizeText(content.introduction),
+    sections: (content.sections || []).map(section => ({
+      heading: normalizeText(section.heading),
+      content: normalizeText(section.content)
+    })),
+    conclusion: normalizeText(content.conclusion),
+    meta_description: normalizeText(content.meta_description),
+    hero_image: content.hero_image || '',
+    author: normalizeText(content.author),
+    tags: content.tags || []
+  };
+  return crypto.createHash('sha256').update(JSON.stringify(normalized)).digest('hex');
+}
+
+export class PublishIndex {
+  constructor(options = {}) {
+    this.options = { ...DEFAULT_OPTIONS, ...options };
+    this.byId = new Map();
+    this.bySlug = new Map();
+    this.loading = null;
+    this.persisting = null;
+    this.dirty = false;
+    this.counters = { unchanged: 0, created: 0, updated: 0 };
+  }
+
+  load() {
+    if (!this.loading) {
+      this.loading = fs.promises.readFile(this.options.indexPath, 'utf8')
+        .then(text => {
+          JSON.parse(text).stories.forEach(record => this.index(record));
+        })
+        .catch(error => {
+          if (error.code !== 'ENOENT') log.warn('Publish index unreadable, starting empty', { error });
+        });
+    }
+    return this.loading;
+  }
+
+  index(record) {
+    const previous = this.byId.get(record.storyId);
+    if (previous && this.bySlug.get(previous.slug) === record.storyId) this.bySlug.delete(previous.slug);
+    this.byId.set(record.storyId, record);
+    this.bySlug.set(record.slug, record.storyId);
+  }
+
+  /**
+   * Writes the index atomically. Calls made while a write is in flight are
+   * coalesced into one follow-up write.
+   */
+  persist() {
+    this.dirty = true;
+    if (!this.persisting) {
+      this.persisting = (async () => {
+        while (this.dirty) {
+          this.dirty = false;
+          try {
+            await fs.promises.mkdir(path.dirname(this.options.indexPath), { recursive: true });
+            await writeFileAtomic(this.options.indexPath, JSON.stringify({ stories: [...this.byId.values()] }));
+          } catch (error) {
+            log.error('Publish index write failed', error);
+          }
+        }
+      })().finally(() => { this.persisting = null; });
+    }
+    return this.persisting;
+  }
+
+  /**
+   * The record for a story ID or, without one, for a slug
+   */
+  async find({ storyId, slug }) {
+    await this.load();
+    if (storyId) return this.byId.get(Number(storyId)) || null;
+    return this.bySlug.has(slug) ? this.byId.get(this.bySlug.get(slug)) : null;
+  }
+
+  /**
+   * Remembers what was just written to a story
+   */
+  async record(story, contentHash) {
+    await this.load();
+    this.index({
+      storyId: story.id,
+      slug: story.slug,
+      contentHash,
+      heroImage: story.content?.hero_image || '',
+      publishedDate: story.content?.published_date || null,
+      writtenAt: new Date().toISOString()
+    });
+    this.persist();
+  }
+
+  async remove(storyId) {
+    await this.load();
+    const record = this.byId.get(Number(storyId));
+    if (!record) return;
+    this.byId.delete(record.storyId);
+    if (this.bySlug.get(record.slug) === record.storyId) this.bySlug.delete(record.slug);
+    this.persist();
+  }
+
+  count(outcome) {
+    this.counters[outcome]++;
+  }
+
+  stats() {
+    return { ...this.counters, stories: this.byId.size };
+  }
+}
+
+/**
+ * Returns the process-wide publish index
+ */
+export function getPublishIndex() {
+  if (!globalThis.__publishIndex) {
+    globalThis.__publishIndex = new PublishIndex();
+  }
+  return globalThis.__publishIndex;
+}
@@ -0,0 +1,564 @@
+"""
+Long-lived Gemini generation worker.
+
+Started by lib/pythonWorkerPool.js. The SDKs are imported and the clients are
+built once at startup, then jobs are read as JSON lines from stdin and answered
+as JSON lines on stdout:
+
+    -> {"id": "1", "type": "blog", "params": {...}, "traceId": "..."}
+    <- {"id": "1", "ok": true, "result": {...}, "timings": {"model_call": 812.4, ...}}
+
+Each reply carries the wall-clock sub-timings (ms) of the job, and the ready
+message carries the startup timings, so Node can attribute time to Python
+startup, SDK import, the model call, JSON extraction and so on.
+
+Stdin is read on its own thread, so a job can be cancelled while it runs:
+
+    -> {"type": "cancel", "id": "1"}
+    <- {"id": "1", "ok": false, "cancelled": true, "error": "Job cancelled"}
+
+Streaming handlers stop at their next chunk and close the upstream stream.
+
+Set GEMINI_BACKEND=stub to run without the Google SDKs (offline benchmarks).
+"""
+
+import base64
+import json
+import os
+import queue
+import re
+import struct
+import sys
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+# Keep the protocol channel clean: anything the SDKs print goes to stderr
+PROTOCOL_OUT = sys.stdout
+sys.stdout = sys.stderr
+
+TEXT_MODEL = os.getenv("GEMINI_TEXT_MODEL", "gemini-2.0-flash-exp")
+IMAGE_MODEL = os.getenv("GEMINI_IMAGE_MODEL", "imagen-3.0-generate-001")
+
+REQUIRED_FIELDS = ["title", "introduction", "sections", "conclusion", "metaDescription"]
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Cancellations:
+    """Jobs queued or running in this worker, and which of them are cancelled.
+
+    A cancel for a job that already finished (or never arrived) is ignored,
+    so the set only ever holds jobs that are still to be answered.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = set()
+        self.cancelled = set()
+
+    def queued(self, job_id):
+        with self.lock:
+            self.pending.add(job_id)
+
+    def cancel(self, job_id):
+        with self.lock:
+            if job_id in self.pending:
+                self.cancelled.add(job_id)
+
+    def __contains__(self, job_id):
+        return job_id in self.cancelled
+
+    def finished(self, job_id):
+        with self.lock:
+            self.pending.discard(job_id)
+            self.cancelled.discard(job_id)
+
+
+# The reader thread may reply too (invalid payloads)
+SEND_LOCK = threading.Lock()
+
+
+def send(message):
+    line = json.dumps(message) + "\n"
+    with SEND_LOCK:
+        PROTOCOL_OUT.write(line)
+        PROTOCOL_OUT.flush()
+
+
+class Timings:
+    """Named wall-clock phases of one job (or of startup), in milliseconds"""
+
+    def __init__(self):
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.phases[name] = round(self.phases.get(name, 0) + elapsed, 2)
+
+
+def build_blog_prompt(params):
+    return f"""Create a well-structured blog post with the following details:
+
+Title: "{params.get('title', '')}"
+Main Topic: {params.get('topic', '')}
+Keywords to include: {', '.join(params.get('keywords') or [])}
+Approximate word count: {params.get('wordCount', 800)} words
+Tone: {params.get('tone', 'professional')}
+
+Please structure the blog post with the following sections:
+1. Introduction (compelling hook and overview)
+2. 3-4 Main sections with descriptive subheadings
+3. Conclusion (key takeaways and call-to-action)
+
+Format the response as a JSON object with this exact structure:
+{{
+  "title": "The final optimized title",
+  "introduction": "Engaging introduction text...",
+  "sections": [
+    {{
+      "heading": "Section 1 Heading",
+      "content": "Section 1 content..."
+    }},
+    {{
+      "heading": "Section 2 Heading",
+      "content": "Section 2 content..."
+    }}
+  ],
+  "conclusion": "Strong conclusion text...",
+  "metaDescription": "A 150-160 character SEO meta description",
+  "imagePrompt": "A detailed prompt for generating a hero image for this blog post"
+}}
+
+Make sure the content is engaging, informative, and optimized for SEO without keyword stuffing.
+Each section should be substantial (150-250 words) and provide real value.
+Include the imagePrompt field with a detailed description for creating a relevant hero image.
+Only return the JSON object, nothing else."""
+
+
+def build_outline_prompt(params):
+    return f"""Plan a long-form blog post with the following details:
+
+Title: "{params.get('title', '')}"
+Main Topic: {params.get('topic', '')}
+Keywords to include: {', '.join(params.get('keywords') or [])}
+Approximate word count: {params.get('wordCount', 2000)} words
+Tone: {params.get('tone', 'professional')}
+
+Plan exactly {params['sectionCount']} main sections between the introduction and the conclusion.
+
+Format the response as an outline JSON object with this exact structure:
+{{
+  "title": "The final optimized title",
+  "metaDescription": "A 150-160 character SEO meta description",
+  "imagePrompt": "A detailed prompt for generating a hero image for this blog post",
+  "sections": [
+    {{
+      "heading": "Section heading",
+      "keyPoints": ["Point the section must cover", "Another point"]
+    }}
+  ]
+}}
+
+Headings should build on each other without overlapping.
+Only return the JSON object, nothing else."""
+
+
+def build_part_prompt(params):
+    outline = "\n".join(f"{i + 1}. {heading}" for i, heading in enumerate(params.get("headings") or []))
+    part = params["part"]
+    if part == "introduction":
+        task = "Write the introduction: a compelling hook and an overview of what the post covers."
+    elif part == "conclusion":
+        task = "Write the conclusion: the key takeaways and a call-to-action."
+    else:
+        points = "\n".join(f"- {point}" for point in params.get("keyPoints") or [])
+        task = f'Write the section "{params["heading"]}". Cover these points:\n{points}'
+    return f"""You are writing one part of a blog post titled "{params.get('title', '')}" about {params.get('topic', '')}.
+Keywords to include where natural: {', '.join(params.get('keywords') or [])}
+Tone: {params.get('tone', 'professional')}
+
+The post's sections are:
+{outline}
+
+{task}
+Length: about {params.get('wordCount', 250)} words. Do not repeat what the other sections cover.
+
+Only return the text of this part: no heading, no markdown formatting, no explanations."""
+
+
+def build_edit_batch_prompt(params):
+    edits = "\n\n".join(
+        f'### Edit {edit["id"]} ({edit.get("label", "Section")})\n'
+        f'Instruction: {edit["instruction"]}\n'
+        f'Text:\n"""\n{edit["content"]}\n"""'
+        for edit in params["edits"]
+    )
+    return f"""You are revising parts of one blog post. Context about the whole post (do not rewrite it):
+{params.get('context', '')}
+
+Apply each edit below to its own text only, keeping it consistent with the context.
+
+{edits}
+
+Return one JSON object mapping each edit id to its revised text, in the order given, e.g. {{"e1": "..."}}.
+Values are plain text: no markdown formatting, no explanations. Only return the JSON object."""
+
+
+def extract_json(response_text):
+    """Extract JSON from a model response (handles markdown code blocks)"""
+    if "```json" in response_text:
+        return response_text.split("```json")[1].split("```")[0].strip()
+    if "```" in response_text:
+        for part in response_text.split("```"):
+            part = part.strip()
+            if part.startswith("json"):
+                return part[4:].strip()
+            if part.startswith("{"):
+                return part
+        return response_text
+    return response_text.strip()
+
+
+def fallback_blog(params, error):
+    topic = params.get("topic", "")
+    return {
+        "error": str(error),
+        "title": params.get("title", ""),
+        "introduction": "We apologize, but we encountered an issue generating the full content. Please try again.",
+        "sections": [
+            {
+                "heading": "Content Generation Issue",
+                "content": "The AI content generation encountered an error. Please try again in a few moments."
+            }
+        ],
+        "conclusion": "Thank you for your patience. Please try generating this content again.",
+        "metaDescription": f"Information about {topic}",
+        "imagePrompt": f"Abstract professional image related to {topic}"
+    }
+
+
+class GeminiBackend:
+    name = "gemini"
+
+    def __init__(self, timings):
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise ValueError("No GEMINI_API_KEY found in environment variables")
+
+        with timings.phase("sdk_import"):
+            import google.generativeai as genai_text
+        with timings.phase("client_init"):
+            genai_text.configure(api_key=api_key)
+            self.text_model = genai_text.GenerativeModel(TEXT_MODEL)
+
+        # Imagen lives in the newer google-genai SDK; keep text usable without it
+        try:
+            with timings.phase("sdk_import"):
+                from google import genai
+                from google.genai import types
+            with timings.phase("client_init"):
+                self.image_client = genai.Client(api_key=api_key)
+                self.image_types = types
+        except ImportError:
+            self.image_client = None
+            self.image_types = None
+
+    def generate_text(self, prompt):
+        return self.text_model.generate_content(prompt).text
+
+    def stream_text(self, prompt):
+        response = self.text_model.generate_content(prompt, stream=True)
+        try:
+            for chunk in response:
+                if chunk.text:
+                    yield chunk.text
+        finally:
+            # Runs when the consumer stops early (a cancelled job): end the upstream stream
+            cancel = getattr(getattr(response, "_iterator", None), "cancel", None)
+            if cancel is not None:
+                cancel()
+
+    def generate_image(self, prompt):
+        if self.image_client is None:
+            raise RuntimeError("google-genai is not installed; image generation unavailable")
+        response = self.image_client.models.generate_images(
+            model=IMAGE_MODEL,
+            prompt=prompt,
+            config=self.image_types.GenerateImagesConfig(
+                number_of_images=1,
+                aspect_ratio="16:9",
+            )
+        )
+        return response.generated_images[0].image.image_bytes
+
+
+class StubBackend:
+    """Deterministic offline model with configurable latency"""
+
+    name = "stub"
+
+    def __init__(self, timings):
+        self.latency = int(os.getenv("GEMINI_STUB_LATENCY_MS", "50")) / 1000.0
+        self.per_word = float(os.getenv("GEMINI_STUB_MS_PER_WORD", "0")) / 1000.0
+
+    def output_words(self, prompt):
+        """Words a real model would write for this prompt, for per-word latency"""
+        if "outline JSON object" in prompt:
+            return 25 * int(re.search(r"Plan exactly (\d+) main sections", prompt).group(1))
+        match = re.search(r"(?:Approximate word count:|Length: about) (\d+) words", prompt)
+        return int(match.group(1)) if match else 0
+
+    def generate_text(self, prompt):
+        time.sleep(self.latency + self.per_word * self.output_words(prompt))
+        if "mapping each edit id to its revised text" in prompt:
+            edits = re.findall(r"^### Edit (\w+) .*\nInstruction: (.*)$", prompt, re.MULTILINE)
+            return json.dumps({edit_id: f"Stub edit ({instruction[:60]})" for edit_id, instruction in edits})
+        if "outline JSON object" in prompt:
+            count = int(re.search(r"Plan exactly (\d+) main sections", prompt).group(1))
+            title = prompt.split('Title: "', 1)[-1].split('"', 1)[0]
+            return json.dumps({
+                "title": title,
+                "metaDescription": f"Stub meta description for {title}.",
+                "imagePrompt": f"Stub hero image for {title}",
+                "sections": [
+                    {"heading": f"Stub Section {i}", "keyPoints": [f"Stub point {i}.1", f"Stub point {i}.2"]}
+                    for i in range(1, count + 1)
+                ]
+            })
+        if "You are writing one part of a blog post" in prompt:
+            task = prompt.split("\n\n")[2].splitlines()[0]
+            return f"Stub text for: {task}"
+        if "Format the response as a JSON object" in prompt:
+            title = prompt.split('Title: "', 1)[-1].split('"', 1)[0] if 'Title: "' in prompt else "Stub Post"
+            return "```json\n" + json.dumps({
+                "title": title,
+                "introduction": f"Stub introduction for {title}.",
+                "sections": [
+                    {"heading": f"Stub Section {i}", "content": f"Stub content {i} for {title}."}
+                    for i in range(1, 4)
+                ],
+                "conclusion": "Stub conclusion.",
+                "metaDescription": f"Stub meta description for {title}.",
+                "imagePrompt": f"Stub hero image for {title}"
+            }) + "\n```"
+        return "Stub edit: " + prompt.strip().splitlines()[0][:200]
+
+    def stream_text(self, prompt):
+        text = self.generate_text(prompt)
+        step = 40
+        for start in range(0, len(text), step):
+            yield text[start:start + step]
+
+    def generate_image(self, prompt):
+        time.sleep(self.latency)
+        return solid_png(64, 36, zlib.crc32(prompt.encode()) & 0xFFFFFF)
+
+
+def solid_png(width, height, rgb):
+    def chunk(tag, data):
+        body = tag + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body) & 0xFFFFFFFF)
+
+    pixel = bytes([(rgb >> 16) & 0xFF, (rgb >> 8) & 0xFF, rgb & 0xFF])
+    raw = b"".join(b"\x00" + pixel * width for _ in range(height))
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b"")
+
+
+def handle_blog(backend, params, emit, timings):
+    try:
+        with timings.phase("prompt_build"):
+            prompt = build_blog_prompt(params)
+        with timings.phase("model_call"):
+            if params.get("stream"):
+                # Forward raw model text as it arrives; the caller parses it incrementally
+                chunks = []
+                for text in backend.stream_text(prompt):
+                    chunks.append(text)
+                    emit({"event": "chunk", "text": text})
+                response_text = "".join(chunks)
+            else:
+                response_text = backend.generate_text(prompt)
+        with timings.phase("json_extract"):
+            blog_content = json.loads(extract_json(response_text))
+            for field in REQUIRED_FIELDS:
+                if field not in blog_content:
+                    raise ValueError(f"Missing required field: {field}")
+        return blog_content
+    except JobCancelled:
+        # Not a model failure: the caller gets the cancelled reply, not fallback content
+        raise
+    except Exception as e:
+        return fallback_blog(params, e)
+
+
+def handle_image(backend, params, emit, timings):
+    with timings.phase("model_call"):
+        image_bytes = backend.generate_image(params["prompt"])
+    output_path = params.get("outputPath")
+    if output_path is None:
+        # Hand the bytes back so the caller can post-process them in memory
+        with timings.phase("encode"):
+            data = base64.b64encode(image_bytes).decode("ascii")
+        return {"data": data, "size": len(image_bytes)}
+    with timings.phase("image_write"):
+        with open(output_path, "wb") as f:
+            f.write(image_bytes)
+    return {"path": output_path, "size": len(image_bytes)}
+
+
+def handle_outline(backend, params, emit, timings):
+    with timings.phase("prompt_build"):
+        prompt = build_outline_prompt(params)
+    with timings.phase("model_call"):
+        response_text = backend.generate_text(prompt)
+    with timings.phase("json_extract"):
+        outline = json.loads(extract_json(response_text))
+    sections = outline.get("sections")
+    if not isinstance(sections, list) or not sections or not all(isinstance(s, dict) and s.get("heading") for s in sections):
+        raise ValueError("Outline has no usable sections")
+    for field in ("title", "metaDescription", "imagePrompt"):
+        if not isinstance(outline.get(field), str):
+            raise ValueError(f"Outline is missing {field}")
+    return outline
+
+
+def handle_part(backend, params, emit, timings):
+    """One part (introduction, section or conclusion) of a long-form post, as plain text"""
+    with timings.phase("prompt_build"):
+        prompt = build_part_prompt(params)
+    with timings.phase("model_call"):
+        content = backend.generate_text(prompt).strip()
+    if not content:
+        raise ValueError("The model returned no text")
+    return {"content": content}
+
+
+def handle_edit(backend, params, emit, timings):
+    prompt = params["prompt"] + """
+
+Only return the improved content, nothing else. No explanations, no markdown formatting, just the pure text."""
+    with timings.phase("model_call"):
+        content = backend.generate_text(prompt).strip()
+    return {"content": content}
+
+
+def handle_edit_batch(backend, params, emit, timings):
+    """Several section edits in one model call; the chunks are streamed so
+    Node can hand each section back as soon as its value is complete"""
+    with timings.phase("prompt_build"):
+        prompt = build_edit_batch_prompt(params)
+    with timings.phase("model_call"):
+        chunks = []
+        for text in backend.stream_text(prompt):
+            chunks.append(text)
+            emit({"event": "chunk", "text": text})
+    with timings.phase("json_extract"):
+        edits = json.loads(extract_json("".join(chunks)))
+    if not isinstance(edits, dict):
+        raise ValueError("Edit response is not a JSON object")
+    return {"edits": {edit_id: str(content).strip() for edit_id, content in edits.items()}}
+
+
+HANDLERS = {
+    "blog": handle_blog,
+    "image": handle_image,
+    "edit": handle_edit,
+    "edit_batch": handle_edit_batch,
+    "outline": handle_outline,
+    "part": handle_part,
+}
+
+
+def create_backend(timings):
+    if os.getenv("GEMINI_BACKEND", "gemini").lower() == "stub":
+        return StubBackend(timings)
+    return GeminiBackend(timings)
+
+
+def main():
+    startup = Timings()
+    try:
+        backend = create_backend(startup)
+    except Exception as e:
+        send({"type": "fatal", "error": str(e)})
+        return 1
+
+    send({"type": "ready", "backend": backend.name, "pid": os.getpid(), "startup": startup.phases})
+
+    jobs = queue.Queue()
+    cancelled = Cancellations()
+    threading.Thread(target=read_jobs, args=(jobs, cancelled), daemon=True).start()
+
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+
+        job_id = job.get("id")
+        job_type = job.get("type")
+
+        if job_type == "ping":
+            cancelled.finished(job_id)
+            send({"id": job_id, "ok": True, "result": {"pong": True, "backend": backend.name}})
+            continue
+
+        handler = HANDLERS.get(job_type)
+        if handler is None:
+            cancelled.finished(job_id)
+            send({"id": job_id, "ok": False, "error": f"Unknown job type: {job_type}"})
+            continue
+
+        def emit(message):
+            if job_id in cancelled:
+                raise JobCancelled()
+            send({"id": job_id, **message})
+
+        timings = Timings()
+        try:
+            if job_id in cancelled:
+                raise JobCancelled()
+            result = handler(backend, job.get("params") or {}, emit, timings)
+            send({"id": job_id, "ok": True, "result": result, "timings": timings.phases})
+        except JobCancelled:
+            send({"id": job_id, "ok": False, "cancelled": True, "error": "Job cancelled", "timings": timings.phases})
+        except Exception as e:
+            trace_id = job.get("traceId")
+            print(f"Job {job_id} failed{f' (trace {trace_id})' if trace_id else ''}: {e}")
+            send({"id": job_id, "ok": False, "error": str(e), "timings": timings.phases})
+        finally:
+            cancelled.finished(job_id)
+
+    return 0
+
+
+def read_jobs(jobs, cancelled):
+    """Reader thread: queues jobs and applies cancellations immediately"""
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            job = json.loads(line)
+        except ValueError as e:
+            send({"id": None, "ok": False, "error": f"Invalid job payload: {e}"})
+            continue
+        if job.get("type") == "cancel":
+            cancelled.cancel(job.get("id"))
+        else:
+            cancelled.queued(job.get("id"))
+            jobs.put(job)
+    jobs.put(None)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
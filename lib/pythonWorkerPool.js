@@ -0,0 +1,400 @@
+import { spawn } from 'child_process';
+import path from 'path';
+import readline from 'readline';
+import { logger } from './logger';
+import { getMetrics, currentTrace, recordSpan } from './metrics';
+import { withDeadlineSignal } from './deadline';
+
+/**
+ * Pool of long-lived Python generation workers (lib/python/gemini_worker.py)
+ *
+ * Each worker imports the Gemini SDKs and builds its clients once, then serves
+ * JSON-line jobs over stdin/stdout. The pool dispatches one job per worker at a
+ * time, restarts crashed workers, pings idle ones and kills any worker whose job
+ * exceeds its timeout. Jobs can be aborted with an AbortSignal: queued jobs are
+ * dropped, running ones are cancelled in the worker (streaming jobs stop at
+ * their next chunk) and the worker is reused once it confirms. A worker that
+ * has not confirmed within PYTHON_WORKER_CANCEL_GRACE_MS (a blocking model
+ * call cannot be interrupted) is killed and restarted. Inside a deadline
+ * (lib/deadline.js) every job is also aborted with the deadline.
+ */
+
+const WORKER_SCRIPT = path.join(process.cwd(), 'lib', 'python', 'gemini_worker.py');
+
+const DEFAULT_OPTIONS = {
+  size: parseInt(process.env.PYTHON_WORKER_POOL_SIZE || '2', 10),
+  jobTimeout: parseInt(process.env.PYTHON_WORKER_JOB_TIMEOUT_MS || '120000', 10),
+  healthInterval: parseInt(process.env.PYTHON_WORKER_HEALTH_INTERVAL_MS || '30000', 10),
+  healthTimeout: 5000,
+  cancelGrace: parseInt(process.env.PYTHON_WORKER_CANCEL_GRACE_MS || '2000', 10),
+  maxRestartDelay: 30000
+};
+
+const log = logger.child({ component: 'python-worker' });
+
+let nextJobId = 1;
+
+const metrics = getMetrics();
+const startupSeconds = metrics.histogram('blogstudio_worker_startup_seconds', 'Python worker startup, by phase (spawn_to_ready covers all of it)', ['phase']);
+const jobSeconds = metrics.histogram('blogstudio_worker_job_duration_seconds', 'Worker job round trip as seen from Node, including queueing', ['type', 'outcome']);
+const phaseSeconds = metrics.histogram('blogstudio_worker_phase_duration_seconds', 'Sub-timings reported by the Python worker', ['type', 'phase']);
+const upstreamSeconds = metrics.histogram('blogstudio_upstream_request_duration_seconds', 'Upstream API calls', ['upstream', 'operation', 'outcome']);
+const queueWaitSeconds = metrics.histogram('blogstudio_queue_wait_seconds', 'Time spent waiting for a slot', ['queue']);
+
+class PythonWorker {
+  constructor(pool, index) {
+    this.pool = pool;
+    this.index = index;
+    this.log = log.child({ worker: index });
+    this.state = 'starting';
+    this.job = null;
+    this.restarts = 0;
+    this.jobsCompleted = 0;
+    this.start();
+  }
+
+  start() {
+    const { pythonPath, script, env } = this.pool.options;
+
+    this.state = 'starting';
+    this.backend = null;
+    this.spawnedAt = performance.now();
+    this.process = spawn(pythonPath, [script], {
+      env,
+      cwd: process.cwd(),
+      stdio: ['pipe', 'pipe', 'pipe']
+    });
+
+    const child = this.process;
+    readline.createInterface({ input: child.stdout }).on('line', line => this.onLine(child, line));
+    child.stderr.on('data', chunk => {
+      const text = chunk.toString().trim();
+      if (text && !text.includes('WARNING')) {
+        this.log.warn('Worker stderr', { output: text });
+      }
+    });
+    child.stdin.on('error', () => {});  // surfaced through the 'exit' handler
+    child.on('error', error => this.onExit(child, error));
+    child.on('exit', (code, signal) => this.onExit(child, new Error(`Python worker exited (code ${code}, signal ${signal})`)));
+  }
+
+  onLine(child, line) {
+    if (child !== this.process) return;
+
+    let message;
+    try {
+      message = JSON.parse(line);
+    } catch (error) {
+      this.log.error('Unparseable worker output', undefined, { line });
+      return;
+    }
+
+    if (message.type === 'ready') {
+      startupSeconds.observe({ phase: 'spawn_to_ready' }, (performance.now() - this.spawnedAt) / 1000);
+      Object.entries(message.startup || {}).forEach(([phase, ms]) => startupSeconds.observe({ phase }, ms / 1000));
+      this.state = 'idle';
+      this.backend = message.backend;
+      this.pool.restartDelay = 0;
+      this.pool.dispatch();
+      return;
+    }
+
+    if (message.type === 'fatal') {
+      this.fatalError = message.error;
+      return;
+    }
+
+    const job = this.job;
+    if (!job || message.id !== job.id) return;
+
+    // Intermediate events (e.g. streamed model output) don't finish the job
+    if (message.event) {
+      job.onEvent?.(message);
+      return;
+    }
+
+    this.finishJob();
+    job.onReply?.(message);
+    job.cleanup?.();
+    if (message.ok) {
+      this.jobsCompleted++;
+      job.resolve(message.result);
+    } else {
+      job.reject(new Error(message.error || 'Python worker job failed'));
+    }
+    this.pool.dispatch();
+  }
+
+  onExit(child, error) {
+    if (child !== this.process || this.state === 'dead') return;
+
+    const reason = this.fatalError ? new Error(this.fatalError) : error;
+    const failedToStart = this.state === 'starting';
+    this.state = 'dead';
+    this.fatalError = null;
+
+    if (this.job) {
+      const job = this.job;
+      this.finishJob();
+      job.cleanup?.();
+      job.reject(reason);
+    }
+
+    if (this.pool.closed) return;
+
+    // A worker that dies before it is ready cannot serve queued jobs either
+    if (failedToStart && !this.pool.workers.some(worker => worker.state === 'idle' || worker.state === 'busy')) {
+      this.pool.rejectQueued(reason);
+    }
+
+    const delay = this.pool.nextRestartDelay();
+    this.restarts++;
+    this.restartTimer = setTimeout(() => this.start(), delay);
+  }
+
+  run(job) {
+    this.state = 'busy';
+    this.job = job;
+    job.startedAt = Date.now();
+    job.timer = setTimeout(() => {
+      this.kill(new Error(`Python worker job timed out after ${job.timeout}ms`));
+    }, job.timeout);
+    job.timer.unref?.();
+    this.process.stdin.write(JSON.stringify({ id: job.id, type: job.type, params: job.params, traceId: job.traceId }) + '\n');
+  }
+
+  /**
+   * Asks the worker to stop the running job. The worker stays busy until it
+   * replies, so the next job never shares its output stream; without a reply
+   * within the grace period it is killed.
+   */
+  cancel(job) {
+    if (this.job !== job) return;
+    this.process.stdin.write(JSON.stringify({ type: 'cancel', id: job.id }) + '\n');
+    job.cancelTimer = setTimeout(() => {
+      if (this.job !== job) return;
+      this.log.warn('Worker did not stop a cancelled job, killing it', { type: job.type });
+      this.kill(new Error('Python worker job was cancelled'));
+    }, this.pool.options.cancelGrace);
+    job.cancelTimer.unref?.();
+  }
+
+  finishJob() {
+    clearTimeout(this.job?.timer);
+    clearTimeout(this.job?.cancelTimer);
+    this.job = null;
+    if (this.state === 'busy') this.state = 'idle';
+  }
+
+  async ping() {
+    if (this.state !== 'idle') return;
+    try {
+      await this.pool.enqueue('ping', {}, { timeout: this.pool.options.healthTimeout, worker: this });
+    } catch (error) {
+      this.log.warn('Health check failed', { error });
+    }
+  }
+
+  kill(reason) {
+    if (this.job) {
+      const job = this.job;
+      this.finishJob();
+      job.cleanup?.();
+      job.reject(reason);
+    }
+    // Not dispatchable again until the replacement process reports ready
+    this.state = 'stopping';
+    this.process.kill('SIGKILL');
+  }
+
+  stats() {
+    return {
+      index: this.index,
+      pid: this.process?.pid,
+      state: this.state,
+      backend: this.backend,
+      restarts: this.restarts,
+      jobsCompleted: this.jobsCompleted
+    };
+  }
+}
+
+export class PythonWorkerPool {
+  constructor(options = {}) {
+    this.options = {
+      ...DEFAULT_OPTIONS,
+      pythonPath: process.env.PYTHON_PATH || 'python3',
+      script: WORKER_SCRIPT,
+      env: { ...process.env, GEMINI_API_KEY: process.env.GEMINI_API_KEY },
+      ...options
+    };
+    this.queue = [];
+    this.closed = false;
+    this.restartDelay = 0;
+    this.workers = Array.from({ length: Math.max(1, this.options.size) }, (_, i) => new PythonWorker(this, i));
+
+    if (this.options.healthInterval > 0) {
+      this.healthTimer = setInterval(() => this.workers.forEach(worker => worker.ping()), this.options.healthInterval);
+      this.healthTimer.unref?.();
+    }
+  }
+
+  /**
+   * Runs a job on the next free worker and resolves with its result.
+   * `onEvent` receives intermediate messages such as streamed text chunks.
+   * Aborting `signal` (or the current deadline) rejects with its reason and
+   * cancels the job. The current trace ID goes to the worker, and the
+   * sub-timings it reports are recorded as metrics and as child spans of the trace.
+   */
+  async run(type, params = {}, { timeout, onEvent, signal } = {}) {
+    const started = performance.now();
+    signal = withDeadlineSignal(signal);
+    let job = null;
+    let reply = null;
+    let outcome = 'error';
+    try {
+      const result = await this.enqueue(type, params, {
+        timeout,
+        onEvent,
+        signal,
+        traceId: currentTrace()?.traceId,
+        onQueued: queued => { job = queued; },
+        onReply: message => { reply = message; }
+      });
+      outcome = 'ok';
+      return result;
+    } catch (error) {
+      if (signal?.aborted) outcome = 'cancelled';
+      throw error;
+    } finally {
+      const durationMs = performance.now() - started;
+      const queuedMs = job?.startedAt ? job.startedAt - job.queuedAt : 0;
+      jobSeconds.observe({ type, outcome }, durationMs / 1000);
+      queueWaitSeconds.observe({ queue: 'python_worker' }, queuedMs / 1000);
+      recordSpan(`python.${type}`, durationMs, { status: outcome, queuedMs });
+      this.recordTimings(type, reply, outcome, started + queuedMs);
+    }
+  }
+
+  recordTimings(type, reply, outcome, startedAt) {
+    const trace = currentTrace();
+    let offset = startedAt;
+    Object.entries(reply?.timings || {}).forEach(([phase, ms]) => {
+      phaseSeconds.observe({ type, phase }, ms / 1000);
+      if (phase === 'model_call') {
+        upstreamSeconds.observe({ upstream: 'gemini', operation: type, outcome }, ms / 1000);
+      }
+      // Phases run one after another, so their offsets are cumulative
+      if (trace) recordSpan(`python.${type}.${phase}`, ms, {}, offset - trace.startedAt);
+      offset += ms;
+    });
+  }
+
+  enqueue(type, params, { timeout, onEvent, signal, traceId, onQueued, onReply, worker = null } = {}) {
+    if (this.closed) {
+      return Promise.reject(new Error('Python worker pool is closed'));
+    }
+    if (signal?.aborted) {
+      return Promise.reject(signal.reason);
+    }
+
+    return new Promise((resolve, reject) => {
+      const job = {
+        id: String(nextJobId++),
+        type,
+        params,
+        timeout: timeout || this.options.jobTimeout,
+        onEvent,
+        onReply,
+        traceId,
+        worker,
+        resolve,
+        reject,
+        queuedAt: Date.now()
+      };
+      if (signal) {
+        const onAbort = () => this.abort(job, signal.reason);
+        signal.addEventListener('abort', onAbort, { once: true });
+        job.cleanup = () => signal.removeEventListener('abort', onAbort);
+      }
+      onQueued?.(job);
+
+      if (worker) {
+        // Health checks target one specific idle worker
+        worker.run(job);
+      } else {
+        this.queue.push(job);
+        this.dispatch();
+      }
+    });
+  }
+
+  abort(job, reason) {
+    const index = this.queue.indexOf(job);
+    if (index !== -1) {
+      this.queue.splice(index, 1);
+    } else {
+      this.workers.find(worker => worker.job === job)?.cancel(job);
+    }
+    job.cleanup();
+    job.reject(reason);
+  }
+
+  dispatch() {
+    while (this.queue.length > 0) {
+      const worker = this.workers.find(w => w.state === 'idle');
+      if (!worker) return;
+      worker.run(this.queue.shift());
+    }
+  }
+
+  rejectQueued(error) {
+    const queued = this.queue.splice(0);
+    queued.forEach(job => {
+      job.cleanup?.();
+      job.reject(error);
+    });
+  }
+
+  nextRestartDelay() {
+    const delay = this.restartDelay;
+    this.restartDelay = Math.min(Math.max(this.restartDelay * 2, 250), this.options.maxRestartDelay);
+    return delay;
+  }
+
+  stats() {
+    return {
+      size: this.workers.length,
+      queued: this.queue.length,
+      workers: this.workers.map(worker => worker.stats())
+    };
+  }
+
+  async shutdown() {
+    this.closed = true;
+    clearInterval(this.healthTimer);
+    this.rejectQueued(new Error('Python worker pool is shutting down'));
+    this.workers.forEach(worker => {
+      clearTimeout(worker.restartTimer);
+      worker.kill(new Error('Python worker pool is shutting down'));
+    });
+  }
+}
+
+/**
+ * Returns the process-wide worker pool, creating it on first use.
+ * Stored on globalThis so Next.js dev reloads don't orphan Python processes.
+ */
+export function getWorkerPool() {
+  if (!globalThis.__pythonWorkerPool) {
+    globalThis.__pythonWorkerPool = new PythonWorkerPool();
+  }
+  return globalThis.__pythonWorkerPool;
+}
+
+/**
+ * Pool stats for the health endpoint (null until the pool has been started)
+ */
+export function getWorkerPoolStats() {
+  return globalThis.__pythonWorkerPool ? globalThis.__pythonWorkerPool.stats() : null;
+}
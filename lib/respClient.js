@@ -0,0 +1,193 @@
+import net from 'net';
+
+/**
+ * Minimal Redis protocol (RESP2) client
+ *
+ * Just enough for the job store: pipelined commands over one connection,
+ * lazy (re)connect, optional AUTH/SELECT from the URL. Works against Redis,
+ * Valkey, KeyDB or the local stand-in in scripts/redis-standin.mjs.
+ */
+
+class RespError extends Error {
+  constructor(message) {
+    super(message);
+    this.name = 'RespError';
+  }
+}
+
+function encodeCommand(args) {
+  let out = `*${args.length}\r\n`;
+  for (const arg of args) {
+    const value = String(arg);
+    out += `$${Buffer.byteLength(value)}\r\n${value}\r\n`;
+  }
+  return out;
+}
+
+/**
+ * Parses one reply starting at `offset`; returns [value, nextOffset] or null if incomplete
+ */
+export function parseReply(buffer, offset = 0) {
+  if (offset >= buffer.length) return null;
+  const lineEnd = buffer.indexOf('\r\n', offset);
+  if (lineEnd === -1) return null;
+
+  const type = String.fromCharCode(buffer[offset]);
+  const line = buffer.toString('utf8', offset + 1, lineEnd);
+  const next = lineEnd + 2;
+
+  switch (type) {
+    case '+':
+      return [line, next];
+    case '-':
+      return [new RespError(line), next];
+    case ':':
+      return [parseInt(line, 10), next];
+    case '$': {
+      const length = parseInt(line, 10);
+      if (length === -1) return [null, next];
+      if (buffer.length < next + length + 2) return null;
+      return [buffer.toString('utf8', next, next + length), next + length + 2];
+    }
+    case '*': {
+      const count = parseInt(line, 10);
+      if (count === -1) return [null, next];
+      const items = [];
+      let position = next;
+      for (let i = 0; i < count; i++) {
+        const parsed = parseReply(buffer, position);
+        if (!parsed) return null;
+        items.push(parsed[0]);
+        position = parsed[1];
+      }
+      return [items, position];
+    }
+    default:
+      throw new RespError(`Unexpected RESP type byte: ${type}`);
+  }
+}
+
+export class RespClient {
+  constructor(url = 'redis://127.0.0.1:6379', { connectTimeout = 5000 } = {}) {
+    const parsed = new URL(url);
+    this.host = parsed.hostname || '127.0.0.1';
+    this.port = parseInt(parsed.port || '6379', 10);
+    this.password = parsed.password ? decodeURIComponent(parsed.password) : null;
+    this.username = parsed.username ? decodeURIComponent(parsed.username) : null;
+    this.db = parsed.pathname && parsed.pathname.length > 1 ? parseInt(parsed.pathname.slice(1), 10) : 0;
+    this.connectTimeout = connectTimeout;
+    this.socket = null;
+    this.connecting = null;
+    this.pending = [];
+    this.buffer = Buffer.alloc(0);
+  }
+
+  connect() {
+    if (this.socket) return Promise.resolve();
+    if (this.connecting) return this.connecting;
+
+    this.connecting = new Promise((resolve, reject) => {
+      const socket = net.createConnection({ host: this.host, port: this.port });
+      socket.setNoDelay(true);
+      socket.setTimeout(this.connectTimeout, () => socket.destroy(new Error('Redis connection timed out')));
+
+      socket.once('connect', async () => {
+        socket.setTimeout(0);
+        this.socket = socket;
+        this.connecting = null;
+        try {
+          if (this.password) {
+            await this.send(this.username ? ['AUTH', this.username, this.password] : ['AUTH', this.password]);
+          }
+          if (this.db) {
+            await this.send(['SELECT', this.db]);
+          }
+          resolve();
+        } catch (error) {
+          socket.destroy();
+          reject(error);
+        }
+      });
+
+      socket.on('data', chunk => this.onData(chunk));
+      socket.on('error', error => this.onClose(error));
+      socket.on('close', () => this.onClose(new Error('Redis connection closed')));
+      socket.once('error', error => {
+        if (this.connecting) {
+          this.connecting = null;
+          reject(error);
+        }
+      });
+    });
+
+    return this.connecting;
+  }
+
+  onData(chunk) {
+    this.buffer = this.buffer.length ? Buffer.concat([this.buffer, chunk]) : chunk;
+    let offset = 0;
+    let parsed;
+    while (this.pending.length > 0 && (parsed = parseReply(this.buffer, offset))) {
+      const [value, next] = parsed;
+      offset = next;
+      const { resolve, reject } = this.pending.shift();
+      value instanceof RespError ? reject(value) : resolve(value);
+    }
+    this.buffer = this.buffer.subarray(offset);
+  }
+
+  onClose(error) {
+    if (!this.socket) return;
+    this.socket = null;
+    this.buffer = Buffer.alloc(0);
+    const pending = this.pending.splice(0);
+    pending.forEach(({ reject }) => reject(error));
+  }
+
+  send(args) {
+    return new Promise((resolve, reject) => {
+      this.pending.push({ resolve, reject });
+      this.socket.write(encodeCommand(args));
+    });
+  }
+
+  /**
+   * Sends one command, connecting first if needed
+   */
+  async command(...args) {
+    await this.connect();
+    return this.send(args);
+  }
+
+  /**
+   * Sends commands in one write and one round trip (not atomically) and
+   * returns their replies
+   */
+  async pipeline(commands) {
+    await this.connect();
+    const replies = commands.map(() => new Promise((resolve, reject) => this.pending.push({ resolve, reject })));
+    this.socket.write(commands.map(encodeCommand).join(''));
+    return Promise.all(replies);
+  }
+
+  /**
+   * Runs commands atomically inside MULTI/EXEC and returns their replies
+   */
+  async transaction(commands) {
+    await this.connect();
+    const replies = [this.send(['MULTI'])];
+    commands.forEach(args => replies.push(this.send(args)));
+    replies.push(this.send(['EXEC']));
+    const results = await Promise.all(replies);
+    return results[results.length - 1];
+  }
+
+  async quit() {
+    if (!this.socket) return;
+    try {
+      await this.send(['QUIT']);
+    } finally {
+      this.socket?.destroy();
+    }
+  }
+}
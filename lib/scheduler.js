@@ -0,0 +1,301 @@
+import { getMetrics } from './metrics';
+import { withDeadlineSignal, sleep, CancelledError } from './deadline';
+
+/**
+ * Bounded scheduling for generation work
+ *
+ * - JobScheduler admits generate-complete jobs into a priority queue (FIFO
+ *   within a priority), runs at most `maxActive` at once and rejects new
+ *   submissions once `maxQueue` jobs are waiting.
+ * - Stages (text, image, storyblok) cap how many upstream calls of each kind
+ *   run concurrently, whichever job or endpoint they come from.
+ * - Each stage draws from a token bucket so bursts are smoothed to the
+ *   upstream's rate limit instead of tripping it.
+ */
+
+const queueWaitSeconds = getMetrics().histogram('blogstudio_queue_wait_seconds', 'Time spent waiting for a slot', ['queue']);
+
+export class QueueFullError extends Error {
+  constructor(retryAfterSeconds) {
+    super('Generation queue is full');
+    this.name = 'QueueFullError';
+    this.retryAfter = retryAfterSeconds;
+  }
+}
+
+/**
+ * Token bucket: `rate` tokens per second, holding at most `burst`
+ */
+export class TokenBucket {
+  constructor({ rate, burst = Math.max(1, Math.ceil(rate)) }) {
+    this.rate = rate;
+    this.burst = burst;
+    this.tokens = burst;
+    this.updatedAt = Date.now();
+  }
+
+  refill() {
+    const now = Date.now();
+    this.tokens = Math.min(this.burst, this.tokens + ((now - this.updatedAt) / 1000) * this.rate);
+    this.updatedAt = now;
+  }
+
+  /**
+   * Resolves once a token has been taken. Aborting `signal` stops the wait
+   * and rejects with its reason, without taking a token.
+   */
+  async take(signal) {
+    for (;;) {
+      this.refill();
+      if (this.tokens >= 1) {
+        this.tokens -= 1;
+        return;
+      }
+      const wait = Math.ceil(((1 - this.tokens) / this.rate) * 1000);
+      await sleep(wait, signal);
+    }
+  }
+
+  /**
+   * Milliseconds until `count` tokens could all have been taken, if nothing
+   * else takes any first
+   */
+  waitFor(count) {
+    this.refill();
+    return Math.max(0, Math.ceil(((count - this.tokens) / this.rate) * 1000));
+  }
+}
+
+/**
+ * Runs `task` over `items` with at most `limit` in flight
+ */
+export async function mapWithConcurrency(items, limit, task) {
+  const results = new Array(items.length);
+  let next = 0;
+  async function lane() {
+    while (next < items.length) {
+      const index = next++;
+      results[index] = await task(items[index], index);
+    }
+  }
+  await Promise.all(Array.from({ length: Math.min(limit, items.length) }, lane));
+  return results;
+}
+
+/**
+ * Inserts `entry` after every entry of equal or higher priority (stable FIFO)
+ */
+function enqueueByPriority(queue, entry) {
+  const index = queue.findIndex(other => other.priority < entry.priority);
+  if (index === -1) {
+    queue.push(entry);
+  } else {
+    queue.splice(index, 0, entry);
+  }
+}
+
+/**
+ * Concurrency limit plus optional rate limit for one kind of upstream call
+ */
+export class Stage {
+  constructor(name, { concurrency = 1, ratePerMinute = 0 } = {}) {
+    this.name = name;
+    this.concurrency = concurrency;
+    this.bucket = ratePerMinute > 0 ? new TokenBucket({ rate: ratePerMinute / 60, burst: Math.max(1, Math.ceil(ratePerMinute / 60 * 5)) }) : null;
+    this.active = 0;
+    this.waiting = [];
+    this.completed = 0;
+  }
+
+  /**
+   * Runs `task` once a slot (and a rate-limit token) is available. Aborting
+   * `signal` (or the current deadline) while waiting gives up the place in
+   * line, or the slot when it is already held and only the token is awaited.
+   */
+  async run(task, { priority = 0, signal } = {}) {
+    const waitStarted = performance.now();
+    signal = withDeadlineSignal(signal);
+    if (signal?.aborted) throw signal.reason;
+    if (this.active >= this.concurrency || this.waiting.length > 0) {
+      await new Promise((resolve, reject) => {
+        const entry = { priority, resolve };
+        if (signal) {
+          const onAbort = () => {
+            this.waiting.splice(this.waiting.indexOf(entry), 1);
+            reject(signal.reason);
+          };
+          signal.addEventListener('abort', onAbort, { once: true });
+          entry.resolve = () => {
+            signal.removeEventListener('abort', onAbort);
+            resolve();
+          };
+        }
+        enqueueByPriority(this.waiting, entry);
+      });
+      // The finishing task handed its slot over without releasing it
+    } else {
+      this.active++;
+    }
+
+    try {
+      // Aborting while waiting for the token releases the slot below
+      if (this.bucket) await this.bucket.take(signal);
+      // Covers both the concurrency slot and the rate-limit token
+      queueWaitSeconds.observe({ queue: `stage_${this.name}` }, (performance.now() - waitStarted) / 1000);
+      return await task();
+    } finally {
+      this.completed++;
+      // Hand the slot straight to the next waiter: releasing it first would let
+      // a caller arriving before the waiter resumes take it too
+      const next = this.waiting.shift();
+      if (next) {
+        next.resolve();
+      } else {
+        this.active--;
+      }
+    }
+  }
+
+  /**
+   * Rate-limit wait, in milliseconds, before `calls` more calls could all
+   * start behind the calls already waiting for this stage
+   */
+  rateWait(calls) {
+    return this.bucket ? this.bucket.waitFor(this.waiting.length + calls) : 0;
+  }
+
+  stats() {
+    return {
+      concurrency: this.concurrency,
+      active: this.active,
+      waiting: this.waiting.length,
+      completed: this.completed
+    };
+  }
+}
+
+export class JobScheduler {
+  constructor({
+    maxActive = parseInt(process.env.SCHEDULER_MAX_ACTIVE_JOBS || '4', 10),
+    maxQueue = parseInt(process.env.SCHEDULER_MAX_QUEUE || '50', 10),
+    stages = {
+      text: { concurrency: parseInt(process.env.STAGE_TEXT_CONCURRENCY || '2', 10), ratePerMinute: parseInt(process.env.GEMINI_TEXT_RATE_PER_MIN || '15', 10) },
+      image: { concurrency: parseInt(process.env.STAGE_IMAGE_CONCURRENCY || '1', 10), ratePerMinute: parseInt(process.env.GEMINI_IMAGE_RATE_PER_MIN || '10', 10) },
+      storyblok: { concurrency: parseInt(process.env.STAGE_STORYBLOK_CONCURRENCY || '2', 10), ratePerMinute: parseInt(process.env.STORYBLOK_RATE_PER_MIN || '180', 10) }
+    }
+  } = {}) {
+    this.maxActive = maxActive;
+    this.maxQueue = maxQueue;
+    this.stages = Object.fromEntries(Object.entries(stages).map(([name, options]) => [name, new Stage(name, options)]));
+    this.queue = [];
+    this.active = new Set();
+    this.averageDuration = 30000;
+  }
+
+  stage(name) {
+    const stage = this.stages[name];
+    if (!stage) throw new Error(`Unknown scheduler stage: ${name}`);
+    return stage;
+  }
+
+  isFull() {
+    return this.queue.length >= this.maxQueue;
+  }
+
+  /**
+   * Seconds until a queue slot is likely to free up, for Retry-After
+   */
+  retryAfter() {
+    const waves = Math.ceil((this.queue.length + 1) / Math.max(1, this.maxActive));
+    return Math.max(1, Math.ceil((waves * this.averageDuration) / 1000));
+  }
+
+  /**
+   * Queues a job. `onPosition(position)` is called whenever its place in the
+   * queue changes (0 once it starts). Throws QueueFullError when full.
+   */
+  submit(jobId, task, { priority = 0, onPosition = () => {} } = {}) {
+    if (this.isFull()) {
+      throw new QueueFullError(this.retryAfter());
+    }
+
+    return new Promise((resolve, reject) => {
+      enqueueByPriority(this.queue, { jobId, task, priority, onPosition, resolve, reject, queuedAt: Date.now() });
+      this.drain();
+      this.notifyPositions();
+    });
+  }
+
+  /**
+   * Removes a job that has not started yet; its submit() promise rejects
+   * with CancelledError. Returns false when the job is not queued.
+   */
+  cancel(jobId) {
+    const index = this.queue.findIndex(entry => entry.jobId === jobId);
+    if (index === -1) return false;
+    const [entry] = this.queue.splice(index, 1);
+    entry.reject(new CancelledError('Job cancelled before it started'));
+    this.notifyPositions();
+    return true;
+  }
+
+  position(jobId) {
+    return this.queue.findIndex(entry => entry.jobId === jobId) + 1;
+  }
+
+  drain() {
+    let started = false;
+    while (this.active.size < this.maxActive && this.queue.length > 0) {
+      const entry = this.queue.shift();
+      this.active.add(entry.jobId);
+      started = true;
+      entry.onPosition(0);
+      this.runEntry(entry);
+    }
+    if (started) this.notifyPositions();
+  }
+
+  async runEntry(entry) {
+    const startedAt = Date.now();
+    queueWaitSeconds.observe({ queue: 'jobs' }, (startedAt - entry.queuedAt) / 1000);
+    try {
+      entry.resolve(await entry.task());
+    } catch (error) {
+      entry.reject(error);
+    } finally {
+      // Exponentially weighted average of job duration feeds Retry-After
+      this.averageDuration = this.averageDuration * 0.8 + (Date.now() - startedAt) * 0.2;
+      this.active.delete(entry.jobId);
+      this.drain();
+    }
+  }
+
+  notifyPositions() {
+    this.queue.forEach((entry, index) => {
+      if (entry.lastPosition !== index + 1) {
+        entry.lastPosition = index + 1;
+        entry.onPosition(index + 1);
+      }
+    });
+  }
+
+  stats() {
+    return {
+      active: this.active.size,
+      maxActive: this.maxActive,
+      queued: this.queue.length,
+      maxQueue: this.maxQueue,
+      stages: Object.fromEntries(Object.entries(this.stages).map(([name, stage]) => [name, stage.stats()]))
+    };
+  }
+}
+
+/**
+ * Returns the process-wide scheduler
+ */
+export function getScheduler() {
+  if (!globalThis.__jobScheduler) {
+    globalThis.__jobScheduler = new JobScheduler();
+  }
+  return globalThis.__jobScheduler;
+}
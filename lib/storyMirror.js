@@ -0,0 +1,265 @@
+import { logger } from './logger';
+import { getStoryblokClient } from './storyblokClient';
+import { mapWithConcurrency } from './scheduler';
+
+/**
+ * Local mirror of the blog stories in Storyblok
+ *
+ * - A full sync walks every page of /stories concurrently (bounded fan-out)
+ *   instead of stopping after the first 100 stories.
+ * - Each page's ETag is kept; revalidation sends If-None-Match so unchanged
+ *   pages come back as 304 and are reused.
+ * - Writes made through lib/storyblok.js update the mirror directly, so the
+ *   app's own creates, publishes and deletes show up immediately.
+ * - Queries are answered from in-memory indexes by slug, tag and status.
+ *   Once loaded, a stale mirror is served while it revalidates in the background.
+ */
+
+const log = logger.child({ component: 'story-mirror' });
+
+const STORIES_PREFIX = 'blog/';
+const PAGE_SIZE = 100; // Management API maximum
+const MAX_PER_PAGE = 500;
+
+// Newest first; id breaks ties so the order (and cursors) are stable
+function compareStories(a, b) {
+  if (a.created_at !== b.created_at) return a.created_at < b.created_at ? 1 : -1;
+  return b.id - a.id;
+}
+
+function encodeCursor(story) {
+  return Buffer.from(JSON.stringify([story.created_at, story.id])).toString('base64url');
+}
+
+function decodeCursor(cursor) {
+  try {
+    const [created_at, id] = JSON.parse(Buffer.from(cursor, 'base64url').toString());
+    return { created_at, id };
+  } catch {
+    return null;
+  }
+}
+
+// Index of the first story that sorts after `key` (binary search)
+function firstAfter(sorted, key) {
+  let low = 0;
+  let high = sorted.length;
+  while (low < high) {
+    const mid = (low + high) >> 1;
+    if (compareStories(sorted[mid], key) > 0) {
+      high = mid;
+    } else {
+      low = mid + 1;
+    }
+  }
+  return low;
+}
+
+export function storyStatus(story) {
+  return story.published ? 'published' : 'draft';
+}
+
+export class StoryMirror {
+  constructor({
+    client = getStoryblokClient(),
+    ttl = parseInt(process.env.STORY_MIRROR_TTL_MS || '60000', 10),
+    concurrency = parseInt(process.env.STORY_MIRROR_CONCURRENCY || '4', 10)
+  } = {}) {
+    this.client = client;
+    this.ttl = ttl;
+    this.concurrency = concurrency;
+    this.stories = new Map();
+    this.bySlug = new Map();
+    this.byTag = new Map();
+    this.byStatus = new Map([['published', new Set()], ['draft', new Set()]]);
+    this.pages = [];       // [{ etag, ids }] from the last sync
+    this.sorted = null;    // cached newest-first list, rebuilt after changes
+    this.syncedAt = 0;
+    this.syncing = null;
+    this.writesDuringSync = null; // id -> story | null, replayed over a sync's snapshot
+  }
+
+  /**
+   * Loads the mirror on first use; afterwards revalidates in the background once stale
+   */
+  async ensureFresh({ force = false } = {}) {
+    const stale = Date.now() - this.syncedAt > this.ttl;
+    if (this.syncedAt === 0 || force) {
+      await this.sync();
+    } else if (stale) {
+      this.sync().catch(error => log.error('Story mirror revalidation failed', error));
+    }
+  }
+
+  sync() {
+    if (!this.syncing) {
+      this.syncing = this.fetchAll().finally(() => { this.syncing = null; });
+    }
+    return this.syncing;
+  }
+
+  async fetchPage(page) {
+    const previous = this.pages[page - 1];
+    const response = await this.client.get('/stories', {
+      params: {
+        per_page: PAGE_SIZE,
+        page,
+        starts_with: STORIES_PREFIX,
+        sort_by: 'created_at:desc'
+      },
+      headers: previous?.etag ? { 'If-None-Match': previous.etag } : {},
+      validateStatus: status => (status >= 200 && status < 300) || status === 304
+    });
+
+    const total = parseInt(response.headers?.total || '0', 10);
+    if (response.status === 304) {
+      return { etag: previous.etag, stories: previous.ids.map(id => this.stories.get(id)).filter(Boolean), total };
+    }
+    return { etag: response.headers?.etag || null, stories: response.data.stories || [], total };
+  }
+
+  async fetchAll() {
+    const started = Date.now();
+    this.writesDuringSync = new Map();
+    let pages;
+    try {
+      const first = await this.fetchPage(1);
+      const pageCount = Math.max(1, Math.ceil(first.total / PAGE_SIZE));
+      const rest = await mapWithConcurrency(
+        Array.from({ length: pageCount - 1 }, (_, i) => i + 2),
+        this.concurrency,
+        page => this.fetchPage(page)
+      );
+      pages = [first, ...rest];
+    } catch (error) {
+      this.writesDuringSync = null;
+      throw error;
+    }
+    const writes = this.writesDuringSync;
+    this.writesDuringSync = null;
+
+    this.clear();
+    pages.forEach(page => page.stories.forEach(story => this.index(story)));
+    this.pages = pages.map(page => ({ etag: page.etag, ids: page.stories.map(story => story.id) }));
+    // Our own writes may be newer than the pages fetched while they happened
+    writes.forEach((story, id) => (story ? this.upsert(story) : this.remove(id)));
+    this.syncedAt = Date.now();
+    log.info('Story mirror synced', { stories: this.stories.size, pages: pages.length, durationMs: Date.now() - started });
+  }
+
+  clear() {
+    this.stories.clear();
+    this.bySlug.clear();
+    this.byTag.clear();
+    this.byStatus.forEach(ids => ids.clear());
+    this.sorted = null;
+  }
+
+  index(story) {
+    this.stories.set(story.id, story);
+    this.bySlug.set(story.slug, story.id);
+    this.byStatus.get(storyStatus(story)).add(story.id);
+    (story.tag_list || story.content?.tags || []).forEach(tag => {
+      if (!this.byTag.has(tag)) this.byTag.set(tag, new Set());
+      this.byTag.get(tag).add(story.id);
+    });
+    this.sorted = null;
+  }
+
+  unindex(id) {
+    const story = this.stories.get(id);
+    if (!story) return;
+    this.stories.delete(id);
+    if (this.bySlug.get(story.slug) === id) this.bySlug.delete(story.slug);
+    this.byStatus.forEach(ids => ids.delete(id));
+    this.byTag.forEach((ids, tag) => {
+      ids.delete(id);
+      if (ids.size === 0) this.byTag.delete(tag);
+    });
+    this.sorted = null;
+  }
+
+  /**
+   * Applies a story returned by a create, update or publish call
+   */
+  upsert(story) {
+    if (!story?.id) return;
+    this.writesDuringSync?.set(story.id, story);
+    const existing = this.stories.get(story.id);
+    this.unindex(story.id);
+    if (story.full_slug && !story.full_slug.startsWith(STORIES_PREFIX)) return;
+    this.index({ ...existing, ...story });
+    // Page ETags no longer describe what we hold; the next revalidation refetches
+    this.pages.forEach(page => { page.etag = null; });
+  }
+
+  remove(id) {
+    this.writesDuringSync?.set(Number(id), null);
+    this.unindex(Number(id));
+    this.pages.forEach(page => { page.etag = null; });
+  }
+
+  sortedStories() {
+    if (!this.sorted) {
+      this.sorted = [...this.stories.values()].sort(compareStories);
+    }
+    return this.sorted;
+  }
+
+  /**
+   * Filtered, paginated listing. Pass either `page` or the `nextCursor` of a
+   * previous result as `cursor`.
+   */
+  async query({ slug, tag, status, page = 1, perPage = PAGE_SIZE, cursor, refresh = false } = {}) {
+    await this.ensureFresh({ force: refresh });
+    perPage = Math.min(Math.max(1, perPage), MAX_PER_PAGE);
+
+    let candidates = null;
+    const narrow = ids => {
+      candidates = candidates ? new Set([...candidates].filter(id => ids.has(id))) : new Set(ids);
+    };
+    if (slug) narrow(new Set(this.bySlug.has(slug) ? [this.bySlug.get(slug)] : []));
+    if (tag) narrow(this.byTag.get(tag) || new Set());
+    if (status) narrow(this.byStatus.get(status) || new Set());
+
+    const matches = candidates
+      ? this.sortedStories().filter(story => candidates.has(story.id))
+      : this.sortedStories();
+
+    let start = (Math.max(1, page) - 1) * perPage;
+    if (cursor) {
+      const after = decodeCursor(cursor);
+      start = after ? firstAfter(matches, after) : 0;
+    }
+
+    const stories = matches.slice(start, start + perPage);
+    const hasMore = start + perPage < matches.length;
+    return {
+      stories,
+      total: matches.length,
+      page: cursor ? undefined : Math.max(1, page),
+      perPage,
+      nextCursor: hasMore && stories.length > 0 ? encodeCursor(stories[stories.length - 1]) : null,
+      syncedAt: new Date(this.syncedAt).toISOString()
+    };
+  }
+
+  stats() {
+    return {
+      stories: this.stories.size,
+      tags: this.byTag.size,
+      pages: this.pages.length,
+      syncedAt: this.syncedAt ? new Date(this.syncedAt).toISOString() : null
+    };
+  }
+}
+
+/**
+ * Returns the process-wide story mirror
+ */
+export function getStoryMirror() {
+  if (!globalThis.__storyMirror) {
+    globalThis.__storyMirror = new StoryMirror();
+  }
+  return globalThis.__storyMirror;
+}
@@ -1,17 +1,41 @@
-import axios from 'axios';
+import { getStoryblokClient } from './storyblokClient';
+import { getStoryMirror } from './storyMirror';
+import { getAssetStore } from './assetStore';
+import { getPublishIndex, storyContentHash } from './publishIndex';
+import { logger } from './logger';
+
+const log = logger.child({ component: 'storyblok' });
 
 /**
- * Helper to format authorization header
- * Personal Access Tokens: Use token directly without "Bearer"
- * OAuth Tokens: Use "Bearer <token>"
+ * Slug for a post: its own, or one derived from the title
  */
-function getAuthHeader(token) {
-  // If token already has Bearer, use as-is
-  if (token.startsWith('Bearer ')) {
-    return token;
-  }
-  // Otherwise, use token directly (Personal Access Token format)
-  return token;
+export function storySlug(blogData) {
+  return blogData.slug || blogData.title
+    .toLowerCase()
+    .replace(/[^\w\s-]/g, '')
+    .replace(/\s+/g, '-')
+    .replace(/--+/g, '-')
+    .trim();
+}
+
+/**
+ * The BlogPost content of a story, as sent to the Management API
+ */
+function buildStoryContent(blogData) {
+  return {
+    component: 'BlogPost', // This should match your Storyblok component name
+    title: blogData.title,
+    introduction: blogData.introduction,
+    sections: blogData.sections || [],
+    conclusion: blogData.conclusion,
+    meta_description: blogData.metaDescription,
+    hero_image: blogData.heroImage || '',
+    author: blogData.author || 'AI Blog Studio',
+    published_date: blogData.publishedDate || new Date().toISOString(),
+    tags: blogData.tags || [],
+    // Add any custom fields your Storyblok component requires
+    body: generateFullContent(blogData)
+  };
 }
 
 /**
@@ -19,55 +43,60 @@ function getAuthHeader(token) {
  */
 export async function createStoryblokBlogPost(blogData) {
   try {
-    const SPACE_ID = process.env.NEXT_PUBLIC_STORYBLOK_SPACE_ID;
-    const ACCESS_TOKEN = process.env.STORYBLOK_MANAGEMENT_TOKEN;
+    log.debug('Creating blog post in Storyblok');
     
-    if (!SPACE_ID || !ACCESS_TOKEN) {
-      throw new Error('Missing Storyblok credentials');
-    }
-    
-    console.log('Creating blog post in Storyblok...');
-    
-    // Generate slug from title if not provided
-    const slug = blogData.slug || blogData.title
-      .toLowerCase()
-      .replace(/[^\w\s-]/g, '')
-      .replace(/\s+/g, '-')
-      .replace(/--+/g, '-')
-      .trim();
+    const slug = storySlug(blogData);
     
     // Prepare the story data structure for Storyblok
     const storyData = {
       story: {
         name: blogData.title,
         slug: slug,
-        content: {
-          component: 'BlogPost', // This should match your Storyblok component name
-          title: blogData.title,
-          introduction: blogData.introduction,
-          sections: blogData.sections || [],
-          conclusion: blogData.conclusion,
-          meta_description: blogData.metaDescription,
-          hero_image: blogData.heroImage || '',
-          author: blogData.author || 'AI Blog Studio',
-          published_date: blogData.publishedDate || new Date().toISOString(),
-          tags: blogData.tags || [],
-          // Add any custom fields your Storyblok component requires
-          body: generateFullContent(blogData)
-        },
+        content: buildStoryContent(blogData),
         // Set to 'draft' initially
         published: false
       }
     };
 
-    const response = await axios.post(`https://mapi.storyblok.com/v1/spaces/${SPACE_ID}/stories`, storyData, {
-      headers: {
-        'Authorization': getAuthHeader(ACCESS_TOKEN),
-        'Content-Type': 'application/json'
-      }
+    const response = await getStoryblokClient().post('/stories', storyData);
+    const story = response.data.story;
+    
+    log.info('Blog post created in Storyblok', { storyId: story.id });
+    getStoryMirror().upsert(story);
+    const publishIndex = getPublishIndex();
+    await publishIndex.record(story, storyContentHash(storyData.story.name, slug, storyData.story.content));
+    publishIndex.count('created');
+    return {
+      success: true,
+      story,
+      storyId: story.id
+    };
+    
+  } catch (error) {
+    log.error('Error creating blog post in Storyblok', error, { response: error.response?.data });
+    throw new Error(`Storyblok creation failed: ${error.response?.data?.error || error.message}`);
+  }
+}
+
+/**
+ * Updates an existing story in Storyblok (e.g. to attach a hero image to a draft)
+ * `contentPatch` is merged into the story's current content.
+ */
+export async function updateStoryblokBlogPost(story, contentPatch) {
+  try {
+    log.debug('Updating blog post in Storyblok', { storyId: story.id });
+    
+    // The Management API replaces content wholesale, so send the merged content
+    const content = { ...story.content, ...contentPatch };
+    const response = await getStoryblokClient().put(`/stories/${story.id}`, {
+      story: { content }
     });
     
-    console.log('Blog post created in Storyblok successfully');
+    log.info('Blog post updated in Storyblok', { storyId: story.id });
+    getStoryMirror().upsert(response.data.story);
+    const publishIndex = getPublishIndex();
+    await publishIndex.record({ ...story, content }, storyContentHash(story.name, story.slug, content));
+    publishIndex.count('updated');
     return {
       success: true,
       story: response.data.story,
@@ -75,91 +104,184 @@ export async function createStoryblokBlogPost(blogData) {
     };
     
   } catch (error) {
-    console.error('Error creating blog post in Storyblok:', error.response?.data || error.message);
-    throw new Error(`Storyblok creation failed: ${error.response?.data?.error || error.message}`);
+    log.error('Error updating blog post in Storyblok', error, { storyId: story.id, response: error.response?.data });
+    throw new Error(`Storyblok update failed: ${error.response?.data?.error || error.message}`);
   }
 }
 
 /**
- * Publishes a blog post in Storyblok
+ * Creates or updates the story for a post, by `storyId` or else by slug.
+ * Nothing is sent when the post is unchanged since the app last wrote it
+ * (see lib/publishIndex.js); the result then has `unchanged: true` and
+ * only the `storyId`, with no `story`.
  */
-export async function publishStoryblokBlogPost(storyId) {
+export async function upsertStoryblokBlogPost(blogData, { storyId } = {}) {
+  const publishIndex = getPublishIndex();
+  const slug = storySlug(blogData);
+  const record = await publishIndex.find({ storyId, slug });
+  
+  // Keep what the previous write set unless the post says otherwise
+  const content = buildStoryContent({
+    ...blogData,
+    heroImage: blogData.heroImage || record?.heroImage || '',
+    publishedDate: blogData.publishedDate || record?.publishedDate
+  });
+  const contentHash = storyContentHash(blogData.title, slug, content);
+  
+  if (record?.contentHash === contentHash) {
+    publishIndex.count('unchanged');
+    log.debug('Blog post unchanged since last write, skipping Storyblok', { storyId: record.storyId });
+    // No story object: nothing was fetched, and the mirror does not hold the
+    // root-level stories the app creates
+    return {
+      success: true,
+      storyId: record.storyId,
+      unchanged: true
+    };
+  }
+  
+  const existingId = record?.storyId || storyId || await findStoryIdBySlug(slug);
+  if (!existingId) {
+    return createStoryblokBlogPost({ ...blogData, heroImage: content.hero_image, publishedDate: content.published_date });
+  }
+  
   try {
-    const SPACE_ID = process.env.NEXT_PUBLIC_STORYBLOK_SPACE_ID;
-    const ACCESS_TOKEN = process.env.STORYBLOK_MANAGEMENT_TOKEN;
+    log.debug('Updating blog post in Storyblok', { storyId: existingId });
+    const response = await getStoryblokClient().put(`/stories/${existingId}`, {
+      story: { name: blogData.title, slug, content }
+    });
+    const story = response.data.story;
     
-    if (!SPACE_ID || !ACCESS_TOKEN) {
-      throw new Error('Missing Storyblok credentials');
-    }
+    log.info('Blog post updated in Storyblok', { storyId: story.id });
+    getStoryMirror().upsert(story);
+    await publishIndex.record({ ...story, slug, content }, contentHash);
+    publishIndex.count('updated');
+    return {
+      success: true,
+      story,
+      storyId: story.id
+    };
     
-    console.log(`Publishing blog post ${storyId} in Storyblok...`);
+  } catch (error) {
+    // Deleted outside the app: forget it and create a new story
+    if (error.response?.status === 404) {
+      log.warn('Story to update no longer exists, creating it again', { storyId: existingId });
+      await publishIndex.remove(existingId);
+      getStoryMirror().remove(existingId);
+      return createStoryblokBlogPost({ ...blogData, heroImage: content.hero_image, publishedDate: content.published_date });
+    }
+    log.error('Error updating blog post in Storyblok', error, { storyId: existingId, response: error.response?.data });
+    throw new Error(`Storyblok update failed: ${error.response?.data?.error || error.message}`);
+  }
+}
+
+// A story the app has no record of, e.g. written before the publish index existed.
+// Asks Storyblok directly: the mirror only holds stories under blog/, and the
+// app creates its stories at the root, where full_slug is the slug itself.
+async function findStoryIdBySlug(slug) {
+  const response = await getStoryblokClient().get('/stories', {
+    params: { with_slug: slug, per_page: 1 }
+  });
+  return response.data.stories?.[0]?.id || null;
+}
+
+/**
+ * Publishes a blog post in Storyblok
+ */
+export async function publishStoryblokBlogPost(storyId) {
+  try {
+    log.debug('Publishing blog post in Storyblok', { storyId });
     
     // Storyblok publish endpoint uses GET request (not PUT)
     // https://www.storyblok.com/docs/api/management/stories/publish-a-story
-    const response = await axios.get(
-      `https://mapi.storyblok.com/v1/spaces/${SPACE_ID}/stories/${storyId}/publish`,
-      {
-        headers: {
-          'Authorization': getAuthHeader(ACCESS_TOKEN),
-          'Content-Type': 'application/json'
-        }
-      }
-    );
+    const response = await getStoryblokClient().get(`/stories/${storyId}/publish`);
     
-    console.log('Blog post published in Storyblok successfully');
+    log.info('Blog post published in Storyblok', { storyId });
+    getStoryMirror().upsert(response.data.story);
     return {
       success: true,
       story: response.data.story
     };
     
   } catch (error) {
-    console.error('Error publishing blog post in Storyblok:', error.response?.data || error.message);
+    log.error('Error publishing blog post in Storyblok', error, { storyId, response: error.response?.data });
     throw new Error(`Storyblok publishing failed: ${error.response?.data?.error || error.message}`);
   }
 }
 
+// Uploads in flight by content hash, so concurrent publishes share one upload
+const pendingUploads = new Map();
+
 /**
- * Uploads an image to Storyblok assets
+ * Uploads a generated asset (by its /generated URL) unless the same content
+ * is already in Storyblok. Pass `buffer` when the bytes are still in memory.
  */
-export async function uploadImageToStoryblok(imagePath, filename) {
-  try {
-    const SPACE_ID = process.env.NEXT_PUBLIC_STORYBLOK_SPACE_ID;
-    const ACCESS_TOKEN = process.env.STORYBLOK_MANAGEMENT_TOKEN;
-    
-    if (!SPACE_ID || !ACCESS_TOKEN) {
-      throw new Error('Missing Storyblok credentials');
+export async function uploadGeneratedAsset(url, filename, buffer) {
+  const store = getAssetStore();
+  const asset = await store.findByUrl(url);
+  if (asset?.storyblokUrl) {
+    store.noteSkippedUpload();
+    return { success: true, url: asset.storyblokUrl, assetId: asset.storyblokAssetId, reused: true };
+  }
+  if (asset && pendingUploads.has(asset.hash)) {
+    return pendingUploads.get(asset.hash);
+  }
+
+  const upload = (async () => {
+    const source = buffer || `public/${url.replace(/^\//, '')}`;
+    const result = await uploadImageToStoryblok(source, filename, asset?.mimeType);
+    if (result.success && asset) {
+      await store.recordUpload(asset.hash, { id: result.asset?.id, url: result.url });
     }
-    
-    console.log('Uploading image to Storyblok assets...');
+    return result;
+  })();
+  if (!asset) return upload;
+
+  pendingUploads.set(asset.hash, upload);
+  try {
+    return await upload;
+  } finally {
+    pendingUploads.delete(asset.hash);
+  }
+}
+
+/**
+ * Uploads an image to the Storyblok asset library. `source` is either a path
+ * under the project root or a Buffer already in memory (no disk round-trip).
+ */
+export async function uploadImageToStoryblok(source, filename, contentType = 'image/png') {
+  try {
+    log.debug('Uploading image to Storyblok assets', { filename });
     
     const fs = await import('fs');
     const path = await import('path');
     const FormData = require('form-data');
     
-    // Resolve the absolute file path
-    const absolutePath = path.resolve(process.cwd(), imagePath.replace(/^\//, ''));
-    
-    // Check if the image file exists
-    if (!fs.existsSync(absolutePath)) {
-      throw new Error(`Image file not found: ${absolutePath}`);
+    let fileField;
+    if (Buffer.isBuffer(source)) {
+      fileField = () => [source, { filename, contentType, knownLength: source.length }];
+    } else {
+      // Resolve the absolute file path
+      const absolutePath = path.resolve(process.cwd(), source.replace(/^\//, ''));
+      
+      // Check if the image file exists
+      if (!fs.existsSync(absolutePath)) {
+        throw new Error(`Image file not found: ${absolutePath}`);
+      }
+      fileField = () => [fs.createReadStream(absolutePath)];
     }
     
-    const form = new FormData();
-    form.append('file', fs.createReadStream(absolutePath));
-    form.append('filename', filename);
+    // A fresh form per attempt: a consumed file stream cannot be resent on retry
+    const buildForm = () => {
+      const form = new FormData();
+      form.append('file', ...fileField());
+      form.append('filename', filename);
+      return form;
+    };
     
-    const response = await axios.post(
-      `https://mapi.storyblok.com/v1/spaces/${SPACE_ID}/assets`,
-      form,
-      {
-        headers: {
-          ...form.getHeaders(),
-          'Authorization': ACCESS_TOKEN,
-        }
-      }
-    );
+    const response = await getStoryblokClient().post('/assets', buildForm);
     
-    console.log('Image uploaded to Storyblok successfully');
+    log.info('Image uploaded to Storyblok', { filename, assetId: response.data.id });
     return {
       success: true,
       asset: response.data,
@@ -167,7 +289,7 @@ export async function uploadImageToStoryblok(imagePath, filename) {
     };
     
   } catch (error) {
-    console.error('Error uploading image to Storyblok:', error.response?.data || error.message);
+    log.error('Error uploading image to Storyblok', error, { filename, response: error.response?.data });
     return {
       success: false,
       error: error.response?.data?.error || error.message
@@ -176,38 +298,20 @@ export async function uploadImageToStoryblok(imagePath, filename) {
 }
 
 /**
- * Gets all blog posts from Storyblok
+ * Lists blog posts from the local mirror of Storyblok (see lib/storyMirror.js)
+ * Accepts { slug, tag, status, page, perPage, cursor, refresh }
  */
-export async function getStoryblokBlogPosts() {
+export async function getStoryblokBlogPosts(query = {}) {
   try {
-    const SPACE_ID = process.env.NEXT_PUBLIC_STORYBLOK_SPACE_ID;
-    const ACCESS_TOKEN = process.env.STORYBLOK_MANAGEMENT_TOKEN;
-    
-    if (!SPACE_ID || !ACCESS_TOKEN) {
-      throw new Error('Missing Storyblok credentials');
-    }
-    
-    console.log('Fetching blog posts from Storyblok...');
-    
-    const response = await axios.get(`https://mapi.storyblok.com/v1/spaces/${SPACE_ID}/stories`, {
-      headers: {
-        'Authorization': ACCESS_TOKEN,
-        'Content-Type': 'application/json'
-      },
-      params: {
-        per_page: 100,
-        starts_with: 'blog/', // Adjust this path based on your folder structure
-        sort_by: 'created_at:desc'
-      }
-    });
+    const result = await getStoryMirror().query(query);
     
     return {
       success: true,
-      stories: response.data.stories
+      ...result
     };
     
   } catch (error) {
-    console.error('Error fetching blog posts from Storyblok:', error.response?.data || error.message);
+    log.error('Error fetching blog posts from Storyblok', error, { response: error.response?.data });
     return {
       success: false,
       error: error.response?.data?.error || error.message
@@ -220,30 +324,21 @@ export async function getStoryblokBlogPosts() {
  */
 export async function deleteStoryblokBlogPost(storyId) {
   try {
-    const SPACE_ID = process.env.NEXT_PUBLIC_STORYBLOK_SPACE_ID;
-    const ACCESS_TOKEN = process.env.STORYBLOK_MANAGEMENT_TOKEN;
+    log.debug('Deleting blog post from Storyblok', { storyId });
     
-    if (!SPACE_ID || !ACCESS_TOKEN) {
-      throw new Error('Missing Storyblok credentials');
-    }
-    
-    console.log(`Deleting blog post ${storyId} from Storyblok...`);
-    
-    const response = await axios.delete(`https://mapi.storyblok.com/v1/spaces/${SPACE_ID}/stories/${storyId}`, {
-      headers: {
-        'Authorization': ACCESS_TOKEN,
-        'Content-Type': 'application/json'
-      }
-    });
+    const response = await getStoryblokClient().delete(`/stories/${storyId}`);
     
-    console.log('Blog post deleted from Storyblok successfully');
+    log.info('Blog post deleted from Storyblok', { storyId });
+    getStoryMirror().remove(storyId);
+    await getPublishIndex().remove(storyId);
+    await getAssetStore().release(`story:${storyId}`);
     return {
       success: true,
       story: response.data.story
     };
     
   } catch (error) {
-    console.error('Error deleting blog post from Storyblok:', error.response?.data || error.message);
+    log.error('Error deleting blog post from Storyblok', error, { storyId, response: error.response?.data });
     throw new Error(`Storyblok deletion failed: ${error.response?.data?.error || error.message}`);
   }
 }
@@ -0,0 +1,215 @@
+import http from 'http';
+import https from 'https';
+import axios from 'axios';
+import { logger } from './logger';
+import { getMetrics } from './metrics';
+import { currentDeadline, sleep } from './deadline';
+
+/**
+ * Shared Storyblok Management API client
+ *
+ * - One keep-alive agent per process, so consecutive calls reuse sockets
+ *   (and TLS sessions) instead of handshaking every time.
+ * - Request timeouts, and retries with jittered exponential backoff for
+ *   idempotent calls. 429 responses are retried for every method (Storyblok
+ *   rejects them before doing any work) and their Retry-After is honoured.
+ * - Per-endpoint latency and error counters, exposed through stats().
+ * - Inside a deadline (lib/deadline.js) requests and retry back-offs are
+ *   aborted with it, and a retry is skipped when its back-off would outlast
+ *   the time left.
+ *
+ * STORYBLOK_API_URL points the client at another server, e.g. the local mock
+ * in scripts/storyblok-mock.mjs.
+ */
+
+const IDEMPOTENT_METHODS = new Set(['GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS']);
+const RETRYABLE_CODES = new Set(['ECONNRESET', 'ECONNREFUSED', 'ETIMEDOUT', 'ECONNABORTED', 'EPIPE', 'EAI_AGAIN']);
+const LATENCY_SAMPLES = 200;
+
+const log = logger.child({ component: 'storyblok-client' });
+const upstreamSeconds = getMetrics().histogram('blogstudio_upstream_request_duration_seconds', 'Upstream API calls', ['upstream', 'operation', 'outcome']);
+
+export class StoryblokCredentialsError extends Error {
+  constructor() {
+    super('Missing Storyblok credentials');
+    this.name = 'StoryblokCredentialsError';
+  }
+}
+
+/**
+ * Parses a Retry-After header (delta seconds or HTTP date) into milliseconds
+ */
+function retryAfterMs(value) {
+  if (!value) return null;
+  const seconds = Number(value);
+  if (!Number.isNaN(seconds)) return Math.max(0, seconds * 1000);
+  const date = Date.parse(value);
+  return Number.isNaN(date) ? null : Math.max(0, date - Date.now());
+}
+
+// "/stories/123/publish" -> "/stories/:id/publish"
+function endpointLabel(method, url) {
+  return `${method} ${url.split('?')[0].replace(/\/\d+(?=\/|$)/g, '/:id')}`;
+}
+
+function percentile(sorted, p) {
+  if (sorted.length === 0) return 0;
+  return sorted[Math.min(sorted.length - 1, Math.floor((p / 100) * sorted.length))];
+}
+
+export class StoryblokClient {
+  constructor({
+    baseURL = process.env.STORYBLOK_API_URL || 'https://mapi.storyblok.com/v1',
+    spaceId = process.env.NEXT_PUBLIC_STORYBLOK_SPACE_ID,
+    token = process.env.STORYBLOK_MANAGEMENT_TOKEN,
+    maxSockets = parseInt(process.env.STORYBLOK_MAX_SOCKETS || '10', 10),
+    timeout = parseInt(process.env.STORYBLOK_TIMEOUT_MS || '15000', 10),
+    maxRetries = parseInt(process.env.STORYBLOK_MAX_RETRIES || '3', 10),
+    retryBaseDelay = parseInt(process.env.STORYBLOK_RETRY_BASE_MS || '250', 10),
+    maxRetryDelay = 30000,
+    keepAlive = true
+  } = {}) {
+    this.spaceId = spaceId;
+    this.token = token;
+    this.maxRetries = maxRetries;
+    this.retryBaseDelay = retryBaseDelay;
+    this.maxRetryDelay = maxRetryDelay;
+    this.metrics = new Map();
+
+    const agentOptions = { keepAlive, maxSockets, maxFreeSockets: maxSockets };
+    this.http = axios.create({
+      baseURL: baseURL.replace(/\/$/, ''),
+      timeout,
+      httpAgent: new http.Agent(agentOptions),
+      httpsAgent: new https.Agent(agentOptions),
+      maxBodyLength: Infinity,
+      maxContentLength: Infinity
+    });
+  }
+
+  hasCredentials() {
+    return Boolean(this.spaceId && this.token);
+  }
+
+  /**
+   * Sends a request relative to /spaces/{spaceId}. `data` may be a function,
+   * called once per attempt, for bodies that cannot be replayed (streams, forms).
+   */
+  async request(method, url, { data, params, headers = {}, retry, validateStatus } = {}) {
+    if (!this.hasCredentials()) {
+      throw new StoryblokCredentialsError();
+    }
+
+    method = method.toUpperCase();
+    const label = endpointLabel(method, url);
+    const canRetry = retry ?? IDEMPOTENT_METHODS.has(method);
+    const deadline = currentDeadline();
+
+    for (let attempt = 0; ; attempt++) {
+      if (deadline?.signal.aborted) throw deadline.signal.reason;
+      const body = typeof data === 'function' ? data() : data;
+      const started = Date.now();
+      try {
+        const response = await this.http.request({
+          method,
+          url: `/spaces/${this.spaceId}${url}`,
+          data: body,
+          params,
+          ...(deadline && { signal: deadline.signal }),
+          ...(validateStatus && { validateStatus }),
+          headers: {
+            'Authorization': this.token,
+            ...(body && typeof body.getHeaders === 'function' ? body.getHeaders() : { 'Content-Type': 'application/json' }),
+            ...headers
+          }
+        });
+        this.record(label, Date.now() - started, attempt, false);
+        return response;
+      } catch (error) {
+        if (deadline?.signal.aborted) {
+          this.record(label, Date.now() - started, attempt, true);
+          throw deadline.signal.reason;
+        }
+        let delay = this.retryDelay(error, attempt, canRetry);
+        // The deadline would expire before the retry could even start
+        if (delay !== null && deadline && deadline.remaining() < delay) delay = null;
+        this.record(label, Date.now() - started, attempt, delay === null);
+        if (delay === null) throw error;
+        log.warn('Storyblok request failed, retrying', { operation: label, status: error.response?.status, code: error.code, delayMs: delay });
+        await sleep(delay, deadline?.signal);
+      }
+    }
+  }
+
+  get(url, options) { return this.request('GET', url, options); }
+  post(url, data, options) { return this.request('POST', url, { ...options, data }); }
+  put(url, data, options) { return this.request('PUT', url, { ...options, data }); }
+  delete(url, options) { return this.request('DELETE', url, options); }
+
+  /**
+   * Milliseconds to wait before the next attempt, or null to give up
+   */
+  retryDelay(error, attempt, canRetry) {
+    if (attempt >= this.maxRetries) return null;
+    const status = error.response?.status;
+
+    if (status === 429) {
+      const hinted = retryAfterMs(error.response.headers?.['retry-after']);
+      if (hinted !== null) return Math.min(hinted, this.maxRetryDelay);
+    } else if (!canRetry) {
+      // Connection refused means the request never reached the server
+      if (error.code !== 'ECONNREFUSED') return null;
+    } else if (status ? status < 500 : !RETRYABLE_CODES.has(error.code)) {
+      return null;
+    }
+
+    // Full jitter: uniform between 0 and the exponential ceiling
+    const ceiling = Math.min(this.maxRetryDelay, this.retryBaseDelay * 2 ** attempt);
+    return Math.round(Math.random() * ceiling);
+  }
+
+  record(label, latency, attempt, failed) {
+    upstreamSeconds.observe({ upstream: 'storyblok', operation: label, outcome: failed ? 'error' : 'ok' }, latency / 1000);
+    let metric = this.metrics.get(label);
+    if (!metric) {
+      metric = { requests: 0, errors: 0, retries: 0, totalMs: 0, samples: [] };
+      this.metrics.set(label, metric);
+    }
+    metric.requests++;
+    metric.totalMs += latency;
+    if (attempt > 0) metric.retries++;
+    if (failed) metric.errors++;
+    metric.samples.push(latency);
+    if (metric.samples.length > LATENCY_SAMPLES) metric.samples.shift();
+  }
+
+  /**
+   * Per-endpoint request counts and latency percentiles (over recent requests)
+   */
+  stats() {
+    const endpoints = {};
+    this.metrics.forEach((metric, label) => {
+      const sorted = [...metric.samples].sort((a, b) => a - b);
+      endpoints[label] = {
+        requests: metric.requests,
+        errors: metric.errors,
+        retries: metric.retries,
+        avgMs: Math.round(metric.totalMs / metric.requests),
+        p50Ms: percentile(sorted, 50),
+        p95Ms: percentile(sorted, 95),
+        p99Ms: percentile(sorted, 99)
+      };
+    });
+    return endpoints;
+  }
+}
+
+/**
+ * Returns the process-wide Storyblok client
+ */
+export function getStoryblokClient() {
+  if (!globalThis.__storyblokClient) {
+    globalThis.__storyblokClient = new StoryblokClient();
+  }
+  return globalThis.__storyblokClient;
+}
@@ -98,6 +98,32 @@ export function validateBlogInput({ title, topic, keywords, wordCount, tone }) {
   };
 }
 
+/**
+ * Checks generated content against the blog post schema (the fields the
+ * worker requires of single-call output, with non-empty sections)
+ */
+export function validateBlogContent(content) {
+  const errors = [];
+  
+  ['title', 'introduction', 'conclusion', 'metaDescription'].forEach(field => {
+    if (typeof content?.[field] !== 'string' || !content[field].trim()) {
+      errors.push(`${field} is missing`);
+    }
+  });
+  
+  if (!Array.isArray(content?.sections) || content.sections.length === 0) {
+    errors.push('sections are missing');
+  } else {
+    content.sections.forEach((section, i) => {
+      if (typeof section?.heading !== 'string' || typeof section?.content !== 'string' || !section.content.trim()) {
+        errors.push(`section ${i + 1} is incomplete`);
+      }
+    });
+  }
+  
+  return errors.length > 0 ? { valid: false, errors } : { valid: true, data: content };
+}
+
 /**
  * Validates image prompt
  */
@@ -143,3 +169,86 @@ export function validateStoryId(storyId) {
   
   return { valid: true, data: storyId };
 }
+
+/**
+ * Validates an optional job priority (0 = normal, up to 9 = most urgent)
+ */
+export function validatePriority(priority) {
+  if (priority === undefined || priority === null || priority === '') {
+    return { valid: true, data: 0 };
+  }
+  
+  const value = parseInt(priority);
+  if (isNaN(value) || value < 0 || value > 9) {
+    return { valid: false, errors: ['Priority must be between 0 and 9'] };
+  }
+  
+  return { valid: true, data: value };
+}
+
+export const EDIT_ACTIONS = ['regenerate', 'shorter', 'longer', 'casual', 'professional', 'seo', 'custom'];
+const MAX_EDITS_PER_REQUEST = 10;
+
+/**
+ * Validates a section-scoped AI edit request:
+ *   { documentId, post, edits: [{ sectionId, action, instruction }] }
+ * A single edit may be given as top-level sectionId/action/instruction.
+ * Section IDs are 'title', 'intro', 'conclusion' or a section index.
+ */
+export function validateEditRequest({ documentId, post, edits, sectionId, action, instruction }) {
+  const errors = [];
+  
+  if (!post || typeof post !== 'object' || !Array.isArray(post.sections)) {
+    errors.push('Post with title and sections is required');
+    return { valid: false, errors };
+  }
+  
+  const requested = Array.isArray(edits) ? edits : [{ sectionId, action, instruction }];
+  if (requested.length === 0 || requested.length > MAX_EDITS_PER_REQUEST) {
+    errors.push(`Between 1 and ${MAX_EDITS_PER_REQUEST} edits are allowed per request`);
+  }
+  
+  const sanitizedEdits = requested.slice(0, MAX_EDITS_PER_REQUEST).map((edit, i) => {
+    const label = requested.length > 1 ? `Edit ${i + 1}: ` : '';
+    const id = edit?.sectionId;
+    const validSection = ['title', 'intro', 'conclusion'].includes(id) ||
+      (Number.isInteger(id) && id >= 0 && id < post.sections.length);
+    if (!validSection) {
+      errors.push(`${label}Unknown section`);
+    }
+    
+    const editAction = edit?.action || 'custom';
+    if (!EDIT_ACTIONS.includes(editAction)) {
+      errors.push(`${label}Action must be one of: ${EDIT_ACTIONS.join(', ')}`);
+    }
+    
+    const text = sanitizeText(edit?.instruction || '', 1000);
+    if (editAction === 'custom' && text.length === 0) {
+      errors.push(`${label}Instruction is required for custom edits`);
+    }
+    
+    return { sectionId: id, action: editAction, instruction: text };
+  });
+  
+  if (errors.length > 0) {
+    return { valid: false, errors };
+  }
+  
+  return {
+    valid: true,
+    data: {
+      documentId: typeof documentId === 'string' ? sanitizeText(documentId, 100) || null : null,
+      post: {
+        title: sanitizeText(post.title || '', 200),
+        introduction: sanitizeText(post.introduction || '', 20000),
+        sections: post.sections.map(section => ({
+          heading: sanitizeText(section?.heading || '', 300),
+          content: sanitizeText(section?.content || '', 20000)
+        })),
+        conclusion: sanitizeText(post.conclusion || '', 20000),
+        metaDescription: sanitizeText(post.metaDescription || '', 500)
+      },
+      edits: sanitizedEdits
+    }
+  };
+}
@@ -0,0 +1,78 @@
+/**
+ * Micro-benchmark: per-call cost of the structured logger (lib/logger.js)
+ * against the console logger it replaced.
+ *
+ * Both write to a temporary file, so the numbers do not depend on the terminal:
+ *   node --import ./scripts/resolve-lib.mjs scripts/bench-logger.mjs --calls 200000
+ */
+import fs from 'fs';
+import os from 'os';
+import path from 'path';
+import { Logger, LogDestination } from '../lib/logger.js';
+
+function arg(name, fallback) {
+  const index = process.argv.indexOf(`--${name}`);
+  return index === -1 ? fallback : process.argv[index + 1];
+}
+
+const CALLS = parseInt(arg('calls', '200000'), 10);
+const dir = fs.mkdtempSync(path.join(os.tmpdir(), 'bench-logger-'));
+const fields = i => ({ jobId: 'job_123', stage: 'image_upload', durationMs: i, attempt: 1 });
+
+// The previous logger: timestamp and JSON.stringify on every call, then a
+// synchronous console write (console.log to a file or pipe is a write(2) per call)
+function legacyLogger(file) {
+  const fd = fs.openSync(file, 'a');
+  return {
+    info(message, data = {}) {
+      const metaStr = Object.keys(data).length > 0 ? ` ${JSON.stringify(data)}` : '';
+      fs.writeSync(fd, `[${new Date().toISOString()}] [INFO] ${message}${metaStr}\n`);
+    },
+    close: () => fs.closeSync(fd)
+  };
+}
+
+function structuredLogger(file, options = {}) {
+  const destination = new LogDestination({
+    file,
+    maxBytes: 1024 * 1024 * 1024,
+    maxFiles: 1,
+    bufferBytes: 64 * 1024,
+    maxPendingBytes: 1024 * 1024 * 1024
+  });
+  return new Logger({ destination, level: 'info', ...options });
+}
+
+// Times the calls themselves (what a request handler pays) in batches of 1000,
+// yielding between batches so buffered writes go out as they would between requests
+async function measure(label, log, call) {
+  let callNs = 0n;
+  const started = process.hrtime.bigint();
+  for (let i = 0; i < CALLS; i += 1000) {
+    const batchStart = process.hrtime.bigint();
+    for (let j = i; j < Math.min(CALLS, i + 1000); j++) call(log, j);
+    callNs += process.hrtime.bigint() - batchStart;
+    await new Promise(resolve => setImmediate(resolve));
+  }
+  await log.flush?.();
+  const wallMs = Number(process.hrtime.bigint() - started) / 1e6;
+  console.log(`${label.padEnd(40)} ${(Number(callNs) / CALLS).toFixed(0).padStart(7)} ns/call   (${wallMs.toFixed(0)}ms wall incl. flushing)`);
+}
+
+console.log(`calls=${CALLS}`);
+
+const legacy = legacyLogger(path.join(dir, 'legacy.log'));
+await measure('console-style, info with fields', legacy, (log, i) => log.info('Stage finished', fields(i)));
+legacy.close();
+
+const structured = structuredLogger(path.join(dir, 'structured.log'));
+const child = structured.child({ component: 'bench', jobId: 'job_123' });
+await measure('structured, info with fields', structured, (log, i) => log.info('Stage finished', fields(i)));
+await measure('structured child, info with fields', child, (log, i) => log.info('Stage finished', { stage: 'image_upload', durationMs: i, attempt: 1 }));
+await measure('structured, debug (filtered)', structured, (log, i) => log.debug('Cache hit', fields(i)));
+await measure('structured, lazy field (filtered)', structured, log => log.debug('Cache hit', { entries: () => JSON.stringify(fields(0)) }));
+
+const sampled = structuredLogger(path.join(dir, 'sampled.log'), { sampling: { info: 0.01 } });
+await measure('structured, info sampled at 1%', sampled, (log, i) => log.info('Stage finished', fields(i)));
+
+fs.rmSync(dir, { recursive: true, force: true });
@@ -0,0 +1,74 @@
+/**
+ * Offline benchmark: long-form generation (outline + parallel parts) vs. one
+ * single call per post, behind the text stage's concurrency and rate limit.
+ *
+ * The stub model's latency grows with the words it is asked for, like a real
+ * model's. Compare the default free-tier rate with a paid-tier one:
+ *   node --import ./scripts/resolve-lib.mjs scripts/bench-long-form.mjs --words 2000 --rate 15 --concurrency 2
+ *   node --import ./scripts/resolve-lib.mjs scripts/bench-long-form.mjs --words 2000 --rate 1000 --concurrency 4
+ */
+
+function arg(name, fallback) {
+  const index = process.argv.indexOf(`--${name}`);
+  return index === -1 ? fallback : process.argv[index + 1];
+}
+
+const WORDS = parseInt(arg('words', '2000'), 10);
+const POSTS = parseInt(arg('posts', '1'), 10);
+const RATE = arg('rate', '15');
+const CONCURRENCY = arg('concurrency', '2');
+const LATENCY = arg('latency', '300');
+const MS_PER_WORD = arg('ms-per-word', '10');
+
+// Read when the modules below load, so set before importing them
+Object.assign(process.env, {
+  GEMINI_BACKEND: 'stub',
+  GEMINI_STUB_LATENCY_MS: LATENCY,
+  GEMINI_STUB_MS_PER_WORD: MS_PER_WORD,
+  GEMINI_TEXT_RATE_PER_MIN: RATE,
+  STAGE_TEXT_CONCURRENCY: CONCURRENCY,
+  PYTHON_WORKER_POOL_SIZE: String(Math.max(2, parseInt(CONCURRENCY, 10))),
+  PYTHON_WORKER_HEALTH_INTERVAL_MS: '0',
+  LOG_LEVEL: process.env.LOG_LEVEL || 'warn'
+});
+
+const { getWorkerPool } = await import('../lib/pythonWorkerPool.js');
+const { JobScheduler } = await import('../lib/scheduler.js');
+const { generateLongFormPost, shouldUseLongForm, planCallCount } = await import('../lib/longForm.js');
+
+const params = { title: 'Benchmark Post', topic: 'Long-form benchmarking', keywords: ['bench'], wordCount: WORDS, tone: 'professional' };
+const pool = getWorkerPool();
+
+function singleCall() {
+  return globalThis.__jobScheduler.stage('text').run(() => pool.run('blog', params));
+}
+
+function longForm() {
+  return generateLongFormPost(params);
+}
+
+async function runBatch(label, generate) {
+  // A fresh scheduler per run, so each starts with a full token bucket
+  globalThis.__jobScheduler = new JobScheduler();
+  const latencies = [];
+  const started = performance.now();
+  await Promise.all(Array.from({ length: POSTS }, async () => {
+    const t0 = performance.now();
+    await generate();
+    latencies.push(performance.now() - t0);
+  }));
+  const elapsed = performance.now() - started;
+  latencies.sort((a, b) => a - b);
+  const seconds = ms => `${(ms / 1000).toFixed(1)}s`;
+  console.log(`${label.padEnd(12)} total ${seconds(elapsed).padStart(6)}   per post p50 ${seconds(latencies[Math.floor(latencies.length / 2)])}   max ${seconds(latencies[latencies.length - 1])}`);
+}
+
+console.log(`words=${WORDS} posts=${POSTS} text rate=${RATE}/min concurrency=${CONCURRENCY} stub latency=${LATENCY}ms + ${MS_PER_WORD}ms/word, ${planCallCount(WORDS)} calls per long-form post`);
+
+await Promise.all(pool.workers.map(() => pool.run('ping')));
+await runBatch('single-call', singleCall);
+await runBatch('long-form', longForm);
+
+globalThis.__jobScheduler = new JobScheduler();
+console.log(`shouldUseLongForm(${WORDS}) with a full bucket: ${shouldUseLongForm(WORDS)}`);
+await pool.shutdown();
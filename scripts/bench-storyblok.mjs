@@ -0,0 +1,72 @@
+/**
+ * Offline load test for the Storyblok client against scripts/storyblok-mock.mjs.
+ *
+ * Starts the mock, then creates, reads and deletes stories with and without
+ * keep-alive, reporting throughput, latency and how many TCP connections
+ * each run opened:
+ *   node --import ./scripts/resolve-lib.mjs scripts/bench-storyblok.mjs --requests 300 --concurrency 8 --latency 20 --rate 0
+ */
+import { spawn } from 'child_process';
+import { StoryblokClient } from '../lib/storyblokClient.js';
+
+function arg(name, fallback) {
+  const index = process.argv.indexOf(`--${name}`);
+  return index === -1 ? fallback : process.argv[index + 1];
+}
+
+const REQUESTS = parseInt(arg('requests', '300'), 10);
+const CONCURRENCY = parseInt(arg('concurrency', '8'), 10);
+const PORT = arg('port', '4011');
+const BASE_URL = `http://127.0.0.1:${PORT}`;
+
+const mock = spawn(process.execPath, [
+  'scripts/storyblok-mock.mjs', '--port', PORT,
+  '--latency', arg('latency', '20'), '--rate', arg('rate', '0'), '--fail-rate', arg('fail-rate', '0')
+], { stdio: ['ignore', 'pipe', 'inherit'] });
+await new Promise(resolve => mock.stdout.once('data', resolve));
+
+async function mockStats() {
+  return (await new StoryblokClient({ baseURL: BASE_URL, spaceId: '_', token: '_' }).http.get('/_stats')).data;
+}
+
+async function runBatch(label, client) {
+  const before = await mockStats();
+  const latencies = [];
+  let next = 0;
+  let failures = 0;
+
+  async function lane() {
+    while (next < REQUESTS) {
+      const index = next++;
+      const started = Date.now();
+      try {
+        const { data } = await client.post('/stories', { story: { name: `Bench ${index}`, slug: `bench-${index}`, content: {} } });
+        await client.get(`/stories/${data.story.id}`);
+        await client.delete(`/stories/${data.story.id}`);
+      } catch (error) {
+        failures++;
+      }
+      latencies.push(Date.now() - started);
+    }
+  }
+
+  const started = Date.now();
+  await Promise.all(Array.from({ length: CONCURRENCY }, lane));
+  const elapsed = (Date.now() - started) / 1000;
+  const after = await mockStats();
+
+  latencies.sort((a, b) => a - b);
+  console.log(`\n${label}`);
+  console.log(`  ${REQUESTS} create/get/delete rounds in ${elapsed.toFixed(2)}s (${(REQUESTS / elapsed).toFixed(1)} rounds/s), ${failures} failed`);
+  console.log(`  p50 ${latencies[Math.floor(latencies.length * 0.5)]}ms  p95 ${latencies[Math.floor(latencies.length * 0.95)]}ms`);
+  console.log(`  TCP connections opened: ${after.connections - before.connections}, 429s: ${after.rateLimited - before.rateLimited}`);
+  console.table(client.stats());
+}
+
+try {
+  const options = { baseURL: `${BASE_URL}/v1`, spaceId: '12345', token: 'bench-token', maxSockets: CONCURRENCY };
+  await runBatch('Without keep-alive', new StoryblokClient({ ...options, keepAlive: false }));
+  await runBatch('With keep-alive', new StoryblokClient(options));
+} finally {
+  mock.kill();
+}
@@ -0,0 +1,66 @@
+/**
+ * Offline benchmark: persistent Python worker pool vs. one python3 process per job.
+ *
+ * Runs against the stub model so no API key or network is needed:
+ *   node --import ./scripts/resolve-lib.mjs scripts/bench-worker-pool.mjs --jobs 50 --concurrency 4 --latency 50
+ */
+import { spawn } from 'child_process';
+import path from 'path';
+import { PythonWorkerPool } from '../lib/pythonWorkerPool.js';
+
+function arg(name, fallback) {
+  const index = process.argv.indexOf(`--${name}`);
+  return index === -1 ? fallback : process.argv[index + 1];
+}
+
+const JOBS = parseInt(arg('jobs', '40'), 10);
+const CONCURRENCY = parseInt(arg('concurrency', '4'), 10);
+const LATENCY = arg('latency', '50');
+const SCRIPT = path.join(process.cwd(), 'lib', 'python', 'gemini_worker.py');
+const PYTHON = process.env.PYTHON_PATH || 'python3';
+
+const env = { ...process.env, GEMINI_BACKEND: 'stub', GEMINI_STUB_LATENCY_MS: LATENCY };
+const params = { title: 'Benchmark Post', topic: 'Worker pool benchmarking', keywords: ['bench'], wordCount: 800, tone: 'professional' };
+
+function spawnPerJob() {
+  return new Promise((resolve, reject) => {
+    const child = spawn(PYTHON, [SCRIPT], { env });
+    let output = '';
+    child.stdout.on('data', chunk => { output += chunk; });
+    child.on('error', reject);
+    child.on('exit', () => {
+      const reply = output.split('\n').filter(Boolean).map(line => JSON.parse(line)).find(message => message.id === '1');
+      reply?.ok ? resolve(reply.result) : reject(new Error(reply?.error || 'no reply'));
+    });
+    child.stdin.end(JSON.stringify({ id: '1', type: 'blog', params }) + '\n');
+  });
+}
+
+async function runBatch(label, runJob) {
+  const latencies = [];
+  let next = 0;
+  const started = performance.now();
+
+  await Promise.all(Array.from({ length: CONCURRENCY }, async () => {
+    while (next < JOBS) {
+      next++;
+      const t0 = performance.now();
+      await runJob();
+      latencies.push(performance.now() - t0);
+    }
+  }));
+
+  const elapsed = performance.now() - started;
+  latencies.sort((a, b) => a - b);
+  const pct = p => latencies[Math.min(latencies.length - 1, Math.floor(p * latencies.length))].toFixed(1);
+  console.log(`${label.padEnd(16)} ${(JOBS / (elapsed / 1000)).toFixed(1).padStart(7)} jobs/s   p50 ${pct(0.5)}ms   p95 ${pct(0.95)}ms   p99 ${pct(0.99)}ms`);
+}
+
+console.log(`jobs=${JOBS} concurrency=${CONCURRENCY} stub latency=${LATENCY}ms`);
+
+await runBatch('spawn-per-job', spawnPerJob);
+
+const pool = new PythonWorkerPool({ size: CONCURRENCY, env, healthInterval: 0 });
+await Promise.all(pool.workers.map(() => pool.run('ping')));
+await runBatch('worker-pool', () => pool.run('blog', params));
+await pool.shutdown();
@@ -0,0 +1,189 @@
+/**
+ * Local Redis stand-in for testing the Redis job store without a Redis server.
+ *
+ * Implements the subset of commands the app uses (strings, hashes, sets, key
+ * expiry, MULTI/EXEC, and EVAL of the job store's scripts) in memory over
+ * the real RESP protocol:
+ *   node --import ./scripts/resolve-lib.mjs scripts/redis-standin.mjs --port 6380
+ *   JOB_STORE=redis REDIS_URL=redis://127.0.0.1:6380 yarn dev
+ */
+import net from 'net';
+import { parseReply } from '../lib/respClient.js';
+import { UPDATE_SCRIPT } from '../lib/jobStore.js';
+
+const portIndex = process.argv.indexOf('--port');
+const PORT = portIndex === -1 ? 6379 : parseInt(process.argv[portIndex + 1], 10);
+
+const data = new Map();     // key -> string | Map | Set
+const expiries = new Map(); // key -> epoch ms
+
+function live(key) {
+  const expiresAt = expiries.get(key);
+  if (expiresAt !== undefined && expiresAt <= Date.now()) {
+    data.delete(key);
+    expiries.delete(key);
+  }
+  return data.get(key);
+}
+
+function typed(key, Type) {
+  let value = live(key);
+  if (value === undefined) {
+    value = new Type();
+    data.set(key, value);
+  }
+  if (!(value instanceof Type)) {
+    throw new Error('WRONGTYPE Operation against a key holding the wrong kind of value');
+  }
+  return value;
+}
+
+const COMMANDS = {
+  PING: () => ({ simple: 'PONG' }),
+  QUIT: () => ({ simple: 'OK' }),
+  AUTH: () => ({ simple: 'OK' }),
+  SELECT: () => ({ simple: 'OK' }),
+  GET: ([key]) => {
+    const value = live(key);
+    return typeof value === 'string' ? value : null;
+  },
+  SET: ([key, value, ...options]) => {
+    data.set(key, value);
+    expiries.delete(key);
+    const px = options.findIndex(option => option.toUpperCase() === 'PX');
+    if (px !== -1) expiries.set(key, Date.now() + parseInt(options[px + 1], 10));
+    return { simple: 'OK' };
+  },
+  DEL: (keys) => keys.reduce((count, key) => {
+    const existed = live(key) !== undefined;
+    data.delete(key);
+    expiries.delete(key);
+    return count + (existed ? 1 : 0);
+  }, 0),
+  EXISTS: (keys) => keys.filter(key => live(key) !== undefined).length,
+  PEXPIRE: ([key, ms]) => {
+    if (live(key) === undefined) return 0;
+    expiries.set(key, Date.now() + parseInt(ms, 10));
+    return 1;
+  },
+  EXPIRE: ([key, seconds]) => COMMANDS.PEXPIRE([key, String(parseInt(seconds, 10) * 1000)]),
+  HSET: ([key, ...pairs]) => {
+    const hash = typed(key, Map);
+    let added = 0;
+    for (let i = 0; i < pairs.length; i += 2) {
+      if (!hash.has(pairs[i])) added++;
+      hash.set(pairs[i], pairs[i + 1]);
+    }
+    return added;
+  },
+  HGET: ([key, field]) => {
+    const hash = live(key);
+    return hash instanceof Map ? hash.get(field) ?? null : null;
+  },
+  HGETALL: ([key]) => {
+    const hash = live(key);
+    return hash instanceof Map ? [...hash.entries()].flat() : [];
+  },
+  SADD: ([key, ...members]) => {
+    const set = typed(key, Set);
+    return members.filter(member => !set.has(member) && set.add(member)).length;
+  },
+  SREM: ([key, ...members]) => {
+    const set = live(key);
+    if (!(set instanceof Set)) return 0;
+    const removed = members.filter(member => set.delete(member)).length;
+    if (set.size === 0) data.delete(key);
+    return removed;
+  },
+  SMEMBERS: ([key]) => {
+    const set = live(key);
+    return set instanceof Set ? [...set] : [];
+  },
+  SCARD: ([key]) => {
+    const set = live(key);
+    return set instanceof Set ? set.size : 0;
+  },
+  EVAL: ([script, numKeys, ...rest]) => {
+    const run = SCRIPTS.get(script);
+    if (!run) throw new Error('the stand-in only runs the job store scripts');
+    const count = parseInt(numKeys, 10);
+    return run(rest.slice(0, count), rest.slice(count));
+  }
+};
+
+// No Lua here: each script the app sends maps to the same steps in JS
+const SCRIPTS = new Map([
+  [UPDATE_SCRIPT, ([jobKey, addTo, ...removeFrom], [id, condition, ...pairs]) => {
+    if (live(jobKey) === undefined) return null;
+    if (condition && !condition.split(',').includes(COMMANDS.HGET([jobKey, 'status']))) return null;
+    if (pairs.length > 0) COMMANDS.HSET([jobKey, ...pairs]);
+    if (addTo) {
+      removeFrom.forEach(key => COMMANDS.SREM([key, id]));
+      COMMANDS.SADD([addTo, id]);
+    }
+    return COMMANDS.HGETALL([jobKey]);
+  }]
+]);
+
+function encode(reply) {
+  if (reply === null || reply === undefined) return '$-1\r\n';
+  if (reply instanceof Error) return `-${reply.message.startsWith('WRONGTYPE') ? '' : 'ERR '}${reply.message}\r\n`;
+  if (typeof reply === 'number') return `:${reply}\r\n`;
+  if (reply.simple) return `+${reply.simple}\r\n`;
+  if (Array.isArray(reply)) return `*${reply.length}\r\n${reply.map(encode).join('')}`;
+  const text = String(reply);
+  return `$${Buffer.byteLength(text)}\r\n${text}\r\n`;
+}
+
+function execute([name, ...args]) {
+  const handler = COMMANDS[String(name).toUpperCase()];
+  if (!handler) return new Error(`unknown command '${name}'`);
+  try {
+    return handler(args);
+  } catch (error) {
+    return error;
+  }
+}
+
+net.createServer(socket => {
+  let buffer = Buffer.alloc(0);
+  let queued = null;
+
+  socket.on('data', chunk => {
+    buffer = Buffer.concat([buffer, chunk]);
+    let parsed;
+    let offset = 0;
+    // Replies to pipelined commands go out together, as Redis sends them
+    socket.cork();
+    while ((parsed = parseReply(buffer, offset))) {
+      const [command, next] = parsed;
+      offset = next;
+      const name = String(command[0]).toUpperCase();
+
+      if (name === 'MULTI') {
+        queued = [];
+        socket.write(encode({ simple: 'OK' }));
+      } else if (name === 'EXEC') {
+        // Single-threaded event loop: the queued commands run without interleaving
+        const replies = (queued || []).map(execute);
+        queued = null;
+        socket.write(encode(replies));
+      } else if (name === 'DISCARD') {
+        queued = null;
+        socket.write(encode({ simple: 'OK' }));
+      } else if (queued) {
+        queued.push(command);
+        socket.write(encode({ simple: 'QUEUED' }));
+      } else {
+        socket.write(encode(execute(command)));
+        if (name === 'QUIT') socket.end();
+      }
+    }
+    buffer = buffer.subarray(offset);
+    socket.uncork();
+  });
+
+  socket.on('error', () => {});
+}).listen(PORT, '127.0.0.1', () => {
+  console.log(`Redis stand-in listening on redis://127.0.0.1:${PORT}`);
+});
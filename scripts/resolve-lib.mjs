@@ -0,0 +1,32 @@
+/**
+ * Lets plain node load lib/ modules the way Next's bundler resolves them.
+ *
+ * The app imports its own modules without extensions ('./metrics'), which
+ * Next accepts and node's ESM loader does not. Preloading this file adds a
+ * resolve hook that retries such specifiers with `.js` and `/index.js`:
+ *   node --import ./scripts/resolve-lib.mjs scripts/bench-logger.mjs
+ */
+import { register } from 'node:module';
+import { isMainThread } from 'node:worker_threads';
+
+const CANDIDATES = ['.js', '/index.js'];
+
+export async function resolve(specifier, context, nextResolve) {
+  try {
+    return await nextResolve(specifier, context);
+  } catch (error) {
+    const relative = specifier.startsWith('./') || specifier.startsWith('../');
+    if (error.code !== 'ERR_MODULE_NOT_FOUND' || !relative || /\.[cm]?js$/.test(specifier)) throw error;
+    for (const suffix of CANDIDATES) {
+      try {
+        return await nextResolve(specifier + suffix, context);
+      } catch {
+        // Try the next candidate
+      }
+    }
+    throw error;
+  }
+}
+
+// Hooks run on their own loader thread, which loads this file again
+if (isMainThread) register(import.meta.url);
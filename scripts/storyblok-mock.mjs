@@ -0,0 +1,203 @@
+/**
+ * Local mock of the Storyblok Management API, for offline development and
+ * load tests of the Storyblok client.
+ *
+ * Implements the endpoints the app uses (stories CRUD, publish, asset upload)
+ * in memory, with optional latency, rate limiting and injected failures:
+ *   node scripts/storyblok-mock.mjs --port 4010 --latency 80 --rate 6 --fail-rate 0.05 --seed 2000
+ *   STORYBLOK_API_URL=http://127.0.0.1:4010/v1 yarn dev
+ *
+ * --rate is requests per second per space (Storyblok's own limit is a few
+ * per second on smaller plans); excess requests get 429 with Retry-After.
+ */
+import crypto from 'crypto';
+import http from 'http';
+
+function option(name, fallback) {
+  const index = process.argv.indexOf(`--${name}`);
+  return index === -1 ? fallback : Number(process.argv[index + 1]);
+}
+
+const PORT = option('port', 4010);
+const LATENCY_MS = option('latency', 50);
+const RATE_PER_SECOND = option('rate', 0);
+const FAIL_RATE = option('fail-rate', 0);
+const SEED = option('seed', 0);
+
+const stories = new Map();
+// Seeded stories live in a "blog" folder; stories created without a parent_id
+// sit at the root, where Storyblok sets full_slug to the slug itself
+const BLOG_FOLDER_ID = 1;
+let nextId = 1000;
+let windowStart = Date.now();
+let windowCount = 0;
+let connections = 0;
+const stats = { requests: 0, rateLimited: 0, failed: 0, notModified: 0 };
+
+function fullSlug(story) {
+  return story.parent_id === BLOG_FOLDER_ID ? `blog/${story.slug}` : story.slug;
+}
+
+function createStory(story, createdAt = new Date().toISOString()) {
+  const created = {
+    ...story,
+    id: nextId++,
+    parent_id: story.parent_id || 0,
+    full_slug: fullSlug(story),
+    tag_list: story.content?.tags || [],
+    published: false,
+    created_at: createdAt,
+    updated_at: createdAt
+  };
+  stories.set(created.id, created);
+  return created;
+}
+
+for (let i = 0; i < SEED; i++) {
+  const story = createStory({
+    name: `Seeded post ${i}`,
+    slug: `seeded-post-${i}`,
+    parent_id: BLOG_FOLDER_ID,
+    content: { component: 'BlogPost', tags: [`tag-${i % 10}`] }
+  }, new Date(Date.UTC(2024, 0, 1) + i * 60000).toISOString());
+  story.published = i % 3 !== 0;
+}
+
+function send(res, status, body, headers = {}) {
+  res.writeHead(status, { 'Content-Type': 'application/json', ...headers });
+  res.end(JSON.stringify(body));
+}
+
+function readBody(req) {
+  return new Promise(resolve => {
+    const chunks = [];
+    req.on('data', chunk => chunks.push(chunk));
+    req.on('end', () => resolve(Buffer.concat(chunks)));
+  });
+}
+
+function rateLimited() {
+  if (!RATE_PER_SECOND) return false;
+  const now = Date.now();
+  if (now - windowStart >= 1000) {
+    windowStart = now;
+    windowCount = 0;
+  }
+  return ++windowCount > RATE_PER_SECOND;
+}
+
+async function route(req, res) {
+  const url = new URL(req.url, `http://${req.headers.host}`);
+  const match = url.pathname.match(/^\/v1\/spaces\/([^/]+)\/(stories|assets)(?:\/(\d+))?(?:\/(publish))?\/?$/);
+
+  if (url.pathname === '/_stats') {
+    return send(res, 200, { ...stats, stories: stories.size, connections });
+  }
+  if (!match) {
+    return send(res, 404, { error: 'Not found' });
+  }
+  if (!req.headers.authorization) {
+    return send(res, 401, { error: 'Unauthorized' });
+  }
+
+  const [, , collection, id, action] = match;
+  const body = await readBody(req);
+
+  if (collection === 'assets' && req.method === 'POST') {
+    const assetId = nextId++;
+    return send(res, 201, {
+      id: assetId,
+      filename: `https://a.storyblok.com/f/mock/${assetId}.png`,
+      pretty_url: `//a.storyblok.com/f/mock/${assetId}.png`,
+      size: body.length
+    });
+  }
+
+  if (collection !== 'stories') {
+    return send(res, 404, { error: 'Not found' });
+  }
+
+  if (!id) {
+    if (req.method === 'GET') {
+      const perPage = parseInt(url.searchParams.get('per_page') || '25', 10);
+      const page = parseInt(url.searchParams.get('page') || '1', 10);
+      const startsWith = url.searchParams.get('starts_with') || '';
+      const withSlug = url.searchParams.get('with_slug');
+      const all = [...stories.values()]
+        .filter(story => story.full_slug.startsWith(startsWith) && (!withSlug || story.full_slug === withSlug))
+        .sort((a, b) => b.created_at.localeCompare(a.created_at) || b.id - a.id);
+      // Listings omit story content, like the real Management API
+      const payload = {
+        stories: all.slice((page - 1) * perPage, page * perPage).map(({ content, ...story }) => story)
+      };
+      const etag = `W/"${crypto.createHash('sha1').update(JSON.stringify(payload)).digest('hex')}"`;
+      const headers = { 'Total': String(all.length), 'Per-Page': String(perPage), 'ETag': etag };
+      if (req.headers['if-none-match'] === etag) {
+        stats.notModified++;
+        res.writeHead(304, headers);
+        return res.end();
+      }
+      return send(res, 200, payload, headers);
+    }
+    if (req.method === 'POST') {
+      const { story } = JSON.parse(body.toString() || '{}');
+      // Slugs are unique within a folder, as in Storyblok
+      if ([...stories.values()].some(existing => existing.slug === story.slug && existing.parent_id === (story.parent_id || 0))) {
+        return send(res, 422, { slug: ['has already been taken'] });
+      }
+      return send(res, 201, { story: createStory(story) });
+    }
+  }
+
+  const story = stories.get(Number(id));
+  if (!story) {
+    return send(res, 404, { error: 'This record could not be found' });
+  }
+
+  if (action === 'publish' && req.method === 'GET') {
+    Object.assign(story, { published: true, published_at: new Date().toISOString() });
+    return send(res, 200, { story });
+  }
+  switch (req.method) {
+    case 'GET':
+      return send(res, 200, { story });
+    case 'PUT': {
+      const { story: patch = {} } = JSON.parse(body.toString() || '{}');
+      Object.assign(story, patch, { updated_at: new Date().toISOString() });
+      story.full_slug = fullSlug(story);
+      return send(res, 200, { story });
+    }
+    case 'DELETE':
+      stories.delete(story.id);
+      return send(res, 200, { story });
+    default:
+      return send(res, 405, { error: 'Method not allowed' });
+  }
+}
+
+const server = http.createServer(async (req, res) => {
+  stats.requests++;
+  if (rateLimited()) {
+    stats.rateLimited++;
+    req.resume();
+    return send(res, 429, { error: 'Too Many Requests' }, { 'Retry-After': '1' });
+  }
+  await new Promise(resolve => setTimeout(resolve, LATENCY_MS));
+  if (FAIL_RATE && Math.random() < FAIL_RATE) {
+    stats.failed++;
+    req.resume();
+    return send(res, 502, { error: 'Bad Gateway' });
+  }
+  try {
+    await route(req, res);
+  } catch (error) {
+    send(res, 500, { error: error.message });
+  }
+});
+
+// Counts TCP connections, to confirm the client reuses sockets
+server.on('connection', () => connections++);
+
+server.listen(PORT, '127.0.0.1', () => {
+  console.log(`Storyblok mock listening on http://127.0.0.1:${PORT}/v1 (stats at /_stats)`);
+});
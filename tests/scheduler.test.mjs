@@ -0,0 +1,39 @@
+/**
+ * Scheduler tests, on node's built-in runner:
+ *   yarn test
+ */
+import test from 'node:test';
+import assert from 'node:assert/strict';
+import { Stage, TokenBucket } from '../lib/scheduler.js';
+import { CancelledError } from '../lib/deadline.js';
+
+test('aborting a token wait rejects at once without taking a token', async () => {
+  const bucket = new TokenBucket({ rate: 1, burst: 1 });
+  await bucket.take();
+  const controller = new AbortController();
+  const started = Date.now();
+  setTimeout(() => controller.abort(new CancelledError('Job cancelled')), 50);
+  await assert.rejects(bucket.take(controller.signal), CancelledError);
+  assert.ok(Date.now() - started < 500);
+  bucket.refill();
+  assert.ok(bucket.tokens < 1);
+});
+
+test('a call aborted during the rate wait gives its slot to the next caller', async () => {
+  const stage = new Stage('test', { concurrency: 1, ratePerMinute: 600 }); // 10/s, burst 50
+  stage.bucket.tokens = 0;
+  const controller = new AbortController();
+  let ran = false;
+  const aborted = stage.run(async () => { ran = true; }, { signal: controller.signal });
+  const next = stage.run(async () => 'next');
+  assert.deepEqual({ active: stage.active, waiting: stage.waiting.length }, { active: 1, waiting: 1 });
+
+  controller.abort(new CancelledError('Job cancelled'));
+  await assert.rejects(aborted, CancelledError);
+  assert.equal(ran, false);
+  // The waiter now holds the slot and waits for its own token
+  assert.deepEqual({ active: stage.active, waiting: stage.waiting.length }, { active: 1, waiting: 0 });
+
+  assert.equal(await next, 'next');
+  assert.equal(stage.active, 0);
+});